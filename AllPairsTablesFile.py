@@ -0,0 +1,173 @@
+from typing import Dict, List, Optional
+import os
+
+import numpy
+
+from RoutingEngineFile import RoutingEngine, Edge_Data, SearchMetric
+from SearchProgressFile import SearchProgress
+
+ALL_PAIRS_TABLES_FILENAME = "all_pairs_tables.npz"
+FORMAT_VERSION = 2  # (version 1 tables could include closed connections, so they are rebuilt.)
+
+
+class AllPairsTables:
+    """
+    The cost of the shortest path between every pair of cities, for both distance and time, plus a "last edge" table
+    that lets us rebuild any of those paths in time proportional to its length. Building the tables takes O(V^3) work
+    and O(V^2) memory, so this is meant for small, static city sets like ours; once built they are saved next to the
+    data files and reloaded as long as the data in those files has not changed.
+    """
+
+    def __init__(self, edges: List[Edge_Data], fingerprint: str, costs: Dict[SearchMetric, numpy.ndarray],
+                 last_edges: Dict[SearchMetric, numpy.ndarray]):
+        """
+        :param edges: the edge list the tables were built from. (last_edges holds indices into this list.)
+        :param fingerprint: identifies the versions of the data files the tables were built from.
+        :param costs: metric -> V x V array; costs[m][a, b] is the cheapest cost from city a to city b (inf if none).
+        :param last_edges: metric -> V x V array; last_edges[m][a, b] is the index of the final edge on the cheapest
+        path from a to b, or -1 if there is no such path (or a == b).
+        """
+        self.edges = edges
+        self.fingerprint = fingerprint
+        self.costs = costs
+        self.last_edges = last_edges
+
+    @staticmethod
+    def default_cache_path(engine: RoutingEngine) -> str:
+        """
+        :param engine: the engine whose tables we want to save or load
+        :return: where to keep the tables - in the same folder as the connection file.
+        """
+        return os.path.join(os.path.dirname(os.path.abspath(engine.connection_file_path)), ALL_PAIRS_TABLES_FILENAME)
+
+    @classmethod
+    def build(cls, engine: RoutingEngine, progress: Optional[SearchProgress] = None) -> Optional["AllPairsTables"]:
+        """
+        runs a vectorized Floyd-Warshall over the engine's cities and open connections, once per metric.
+        :param engine: the engine whose graph to use
+        :param progress: if given, building gives up as soon as progress.cancel() is called
+        :return: the new tables, or None if building was cancelled
+        """
+        num_cities = len(engine.neighbor_offsets) - 1
+        costs = {}
+        last_edges = {}
+        for metric in SearchMetric:
+            cost = numpy.full((num_cities, num_cities), numpy.inf)
+            last = numpy.full((num_cities, num_cities), -1, dtype=numpy.int32)
+            numpy.fill_diagonal(cost, 0.0)
+            for edge_id, edge in enumerate(engine.edges):
+                a, b, weight = edge[0], edge[1], engine.edge_cost(edge_id, metric)  # (infinite if it is closed.)
+                if a != b and weight < cost[a, b]:
+                    cost[a, b] = cost[b, a] = weight
+                    last[a, b] = last[b, a] = edge_id
+
+            for k in range(num_cities):
+                if progress is not None and progress.cancelled:
+                    return None
+                # can we do better by going from i to k, and then from k to j? (Row and column k themselves can't
+                # change during this step, since cost[k, k] is zero.)
+                via_k = cost[:, k, None] + cost[None, k, :]
+                better = via_k < cost
+                cost = numpy.where(better, via_k, cost)
+                # if so, the last edge on the way from i to j is the last edge on the way from k to j.
+                last = numpy.where(better, last[None, k, :], last)
+            costs[metric] = cost
+            last_edges[metric] = last
+        return cls(engine.edges, engine.data_fingerprint(), costs, last_edges)
+
+    def save(self, path: str):
+        """
+        writes the tables to disk, replacing any older copy in one step so a reader never sees a half-written file.
+        :param path: the file to write
+        :return: None
+        """
+        arrays = {"version": numpy.array(FORMAT_VERSION), "fingerprint": numpy.array(self.fingerprint)}
+        for metric in SearchMetric:
+            arrays[f"{metric.name.lower()}_costs"] = self.costs[metric]
+            arrays[f"{metric.name.lower()}_last_edges"] = self.last_edges[metric]
+        temp_path = f"{path}.{os.getpid()}.tmp"  # (one per process: pool workers may all save at once.)
+        with open(temp_path, "wb") as table_file:
+            numpy.savez(table_file, **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, engine: RoutingEngine, path: str) -> Optional["AllPairsTables"]:
+        """
+        reads tables saved by save(), as long as they were built from the data files the engine uses now.
+        :param engine: the engine the tables are for
+        :param path: the file to read
+        :return: the tables, or None if the file is missing, unreadable or out of date.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with numpy.load(path) as saved:
+                fingerprint = str(saved["fingerprint"])
+                if "version" not in saved.files or int(saved["version"]) != FORMAT_VERSION or \
+                        fingerprint != engine.data_fingerprint():
+                    return None
+                costs = {metric: saved[f"{metric.name.lower()}_costs"] for metric in SearchMetric}
+                last_edges = {metric: saved[f"{metric.name.lower()}_last_edges"] for metric in SearchMetric}
+        except (OSError, KeyError, ValueError) as err:
+            print(f"Couldn't read the all-pairs tables, so they will be rebuilt: {err}")
+            return None
+        return cls(engine.edges, fingerprint, costs, last_edges)
+
+    @classmethod
+    def load_or_build(cls, engine: RoutingEngine, path: Optional[str] = None,
+                      progress: Optional[SearchProgress] = None) -> Optional["AllPairsTables"]:
+        """
+        loads the saved tables for this engine's data, or builds (and saves) fresh ones if there are none yet or the
+        data files have changed since they were built.
+        :param engine: the engine the tables are for
+        :param path: where to keep the tables; defaults to default_cache_path(engine)
+        :param progress: if given, building (but not loading) gives up as soon as progress.cancel() is called
+        :return: the tables, or None if building them was cancelled
+        """
+        if path is None:
+            path = cls.default_cache_path(engine)
+        tables = cls.load(engine, path)
+        if tables is None:
+            tables = cls.build(engine, progress)
+            if tables is None:
+                return None
+            try:
+                tables.save(path)
+            except OSError as osErr:
+                print(f"Couldn't save the all-pairs tables: {osErr}")
+        return tables
+
+    def path_cost(self, first_city_id: int, second_city_id: int,
+                  metric: SearchMetric = SearchMetric.DISTANCE) -> float:
+        """
+        :return: the cost of the cheapest path between the two cities (inf if they are not connected).
+        """
+        return float(self.costs[metric][first_city_id, second_city_id])
+
+    def find_path(self, first_city_id: int, second_city_id: int,
+                  metric: SearchMetric = SearchMetric.DISTANCE) -> Optional[List[Edge_Data]]:
+        """
+        rebuilds the cheapest path between the two cities from the last-edge table.
+        :return: the edges from first_city_id to second_city_id in travel order, or None if there is no path.
+        """
+        edge_ids = self.path_edge_ids(first_city_id, second_city_id, metric)
+        return None if edge_ids is None else [self.edges[edge_id] for edge_id in edge_ids]
+
+    def path_edge_ids(self, first_city_id: int, second_city_id: int,
+                      metric: SearchMetric = SearchMetric.DISTANCE) -> Optional[List[int]]:
+        """
+        :return: the indices (in edges) of the connections on the cheapest path between the two cities, in travel
+        order, or None if there is no path.
+        """
+        if numpy.isinf(self.costs[metric][first_city_id, second_city_id]):
+            return None
+        last = self.last_edges[metric]
+        edge_ids: List[int] = []
+        city = second_city_id
+        while city != first_city_id:
+            edge_id = int(last[first_city_id, city])
+            edge = self.edges[edge_id]
+            edge_ids.append(edge_id)
+            city = edge[0] if edge[1] == city else edge[1]
+        edge_ids.reverse()
+        return edge_ids
@@ -0,0 +1,247 @@
+from typing import Dict, List, Optional, Set, Tuple
+import heapq
+import math
+import time
+
+from RoutingEngineFile import RoutingEngine, Edge_Data, SearchMetric, SearchMode
+
+Route = Tuple[float, List[int], List[int], int]  # (cost, cities in travel order, edge ids, deviation position)
+
+
+class AlternativeRoutes:
+    """
+    Finds the k cheapest loopless routes between two cities (Yen's algorithm), for offering alternatives to the single
+    shortest path. Each new route is the cheapest "deviation" from a route already found: follow it as far as some
+    spur city, then take the cheapest way on to the goal that neither turns back onto the part already followed nor
+    repeats how an earlier route left the spur city.
+
+    That is a lot of little searches, so they share their work:
+      * one shortest-path tree is grown backwards from the goal, up front. Its costs are exact lower bounds on the
+        cost from any city to the goal, however many cities and connections a spur search has to avoid, so every spur
+        search is an A* search with a perfect estimate wherever nothing is in the way. Better still, if the cheapest
+        way to leave the spur city and then follow the tree avoids everything blocked, that IS the cheapest spur, and
+        no search is needed at all.
+      * each route only deviates from its parent after the point where the parent itself deviated (Lawler's
+        refinement), since the earlier spurs were already tried when the parent was found.
+    So k routes usually cost one full search plus a little, rather than k (or k times the path length) searches.
+    """
+
+    def __init__(self, engine: RoutingEngine, start: int, goal: int, metric: SearchMetric = SearchMetric.DISTANCE):
+        """
+        :param engine: the engine to search in
+        :param start: the city to travel from
+        :param goal: the city to travel to
+        :param metric: whether to minimize distance or time
+        """
+        self.engine = engine
+        self.start = start
+        self.goal = goal
+        self.metric = metric
+        self.neighbor_costs = engine.neighbor_distances if metric == SearchMetric.DISTANCE else engine.neighbor_times
+        # the tree from the goal: city id -> cheapest cost to the goal, and the edge that leads one step toward it.
+        self.cost_to_goal: Dict[int, float] = {}
+        self.step_to_goal: Dict[int, int] = {}
+        self.cities_settled = 0  # cities settled by the backward tree and all the spur searches together
+        self.spur_searches = 0  # how many spurs needed a search
+        self.spurs_from_tree = 0  # how many were read straight off the backward tree
+
+    def find(self, k: int, max_overlap: Optional[float] = None, max_detour: Optional[float] = None,
+             max_examined: Optional[int] = None) -> List[List[Edge_Data]]:
+        """
+        finds up to k routes, cheapest first.
+        :param k: how many routes to return
+        :param max_overlap: if given, skip any route for which more than this fraction of its cost is spent on
+        roads (pairs of connected cities) that a route already returned also uses (0.5 = at least half of it must be
+        new road)
+        :param max_detour: if given, stop at routes costing more than this multiple of the cheapest (1.3 = up to 30%
+        more)
+        :param max_examined: the most routes to look at, counting any skipped for overlapping; by default 20 * k
+        :return: the routes, each a list of edges in travel order (for describe_path() or display_path()), cheapest
+        first. Fewer than k if there aren't that many (acceptable) loopless routes.
+        """
+        engine = self.engine
+        offsets = engine.neighbor_offsets
+        if k <= 0 or not (0 <= self.start < len(offsets) - 1) or not (0 <= self.goal < len(offsets) - 1):
+            return []
+        if max_examined is None:
+            max_examined = 20 * k
+        self.cost_to_goal, self.step_to_goal = engine.shortest_path_tree(self.goal, self.metric)
+        self.cities_settled = len(self.cost_to_goal)
+        if self.start not in self.cost_to_goal:
+            return []
+
+        first_cities, first_edges = self.tree_route(self.start)
+        candidates: List[Tuple[float, int, List[int], List[int], int]] = \
+            [(self.cost_to_goal[self.start], 0, first_cities, first_edges, 0)]
+        seen: Set[Tuple[int, ...]] = {tuple(first_edges)}
+        examined: List[Route] = []  # every route taken off the queue, returned or not
+        accepted: List[Route] = []
+        accepted_roads: List[Set[Tuple[int, int]]] = []
+        tie_breaker = 1
+        while candidates and len(accepted) < k and len(examined) < max_examined:
+            cost, _, cities, edge_ids, deviation = heapq.heappop(candidates)
+            if max_detour is not None and accepted and cost > max_detour * accepted[0][0] * (1 + 1e-12):
+                break
+            route: Route = (cost, cities, edge_ids, deviation)
+            examined.append(route)
+            if max_overlap is None or not accepted or self.overlap(edge_ids, cost, accepted_roads) <= max_overlap:
+                accepted.append(route)
+                accepted_roads.append({self.road(edge_id) for edge_id in edge_ids})
+
+            # the spurs of this route, from its deviation point on.
+            root_cost = sum(self.edge_cost(edge_id) for edge_id in edge_ids[:deviation])
+            for position in range(deviation, len(edge_ids)):
+                spur_city = cities[position]
+                blocked_edges = {other[2][position] for other in examined
+                                 if len(other[2]) > position and other[1][:position + 1] == cities[:position + 1]}
+                blocked_cities = set(cities[:position])
+                spur = self.spur_route(spur_city, blocked_cities, blocked_edges)
+                if spur is not None:
+                    spur_cost, spur_cities, spur_edges = spur
+                    new_edges = edge_ids[:position] + spur_edges
+                    key = tuple(new_edges)
+                    if key not in seen:
+                        seen.add(key)
+                        heapq.heappush(candidates, (root_cost + spur_cost, tie_breaker,
+                                                    cities[:position] + spur_cities, new_edges, position))
+                        tie_breaker += 1
+                root_cost += self.edge_cost(edge_ids[position])
+
+        return [[engine.edges[edge_id] for edge_id in route[2]] for route in accepted]
+
+    def edge_cost(self, edge_id: int) -> float:
+        return self.engine.edge_cost(edge_id, self.metric)
+
+    def tree_route(self, city: int) -> Tuple[List[int], List[int]]:
+        """
+        :return: the backward tree's route from city to the goal, as (cities, edge ids).
+        """
+        edges = self.engine.edges
+        cities = [city]
+        edge_ids = []
+        while city != self.goal:
+            edge_id = self.step_to_goal[city]
+            edge = edges[edge_id]
+            city = edge[0] if edge[1] == city else edge[1]
+            cities.append(city)
+            edge_ids.append(edge_id)
+        return cities, edge_ids
+
+    def spur_route(self, spur_city: int, blocked_cities: Set[int], blocked_edges: Set[int]) \
+            -> Optional[Tuple[float, List[int], List[int]]]:
+        """
+        finds the cheapest route from spur_city to the goal that avoids the blocked cities, and doesn't leave
+        spur_city along any of the blocked edges.
+        :return: (its cost, its cities, its edge ids), or None if there is no such route.
+        """
+        if spur_city not in self.cost_to_goal:
+            return None
+        engine = self.engine
+        offsets = engine.neighbor_offsets
+        neighbor_cities = engine.neighbor_cities
+        neighbor_edge_ids = engine.neighbor_edge_ids
+        neighbor_costs = self.neighbor_costs
+        cost_to_goal = self.cost_to_goal
+
+        # no spur can cost less than its first connection plus the tree's cost from the far end of it. So if the
+        # tree's route from the far end of the best such connection is clear of the blocked cities, that's the spur.
+        best_bound = math.inf
+        best_slot = -1
+        for slot in range(offsets[spur_city], offsets[spur_city + 1]):
+            neighbor = neighbor_cities[slot]
+            if neighbor in blocked_cities or neighbor not in cost_to_goal or neighbor_edge_ids[slot] in blocked_edges:
+                continue
+            bound = neighbor_costs[slot] + cost_to_goal[neighbor]
+            if bound < best_bound:
+                best_bound = bound
+                best_slot = slot
+        if best_slot < 0 or math.isinf(best_bound):
+            return None
+        cities, edge_ids = self.tree_route(neighbor_cities[best_slot])
+        if spur_city not in cities and blocked_cities.isdisjoint(cities):
+            self.spurs_from_tree += 1
+            return best_bound, [spur_city] + cities, [neighbor_edge_ids[best_slot]] + edge_ids
+
+        # otherwise, A* with the tree's costs as the estimate (cities that can't reach the goal at all are skipped).
+        self.spur_searches += 1
+        best_cost = {spur_city: 0.0}
+        arrived_by = {spur_city: -1}
+        finished = set()
+        frontier = [(cost_to_goal[spur_city], 0.0, spur_city)]
+        while frontier:
+            _, cost, city = heapq.heappop(frontier)
+            if city in finished:
+                continue
+            if city == self.goal:
+                cities = [city]
+                edge_ids = []
+                while city != spur_city:
+                    edge = engine.edges[arrived_by[city]]
+                    edge_ids.append(arrived_by[city])
+                    city = edge[0] if edge[1] == city else edge[1]
+                    cities.append(city)
+                cities.reverse()
+                edge_ids.reverse()
+                return cost, cities, edge_ids
+            finished.add(city)
+            self.cities_settled += 1
+            for slot in range(offsets[city], offsets[city + 1]):
+                neighbor = neighbor_cities[slot]
+                edge_id = neighbor_edge_ids[slot]
+                if neighbor in blocked_cities or neighbor in finished or neighbor not in cost_to_goal or \
+                        (city == spur_city and edge_id in blocked_edges):
+                    continue
+                new_cost = cost + neighbor_costs[slot]
+                if new_cost < best_cost.get(neighbor, math.inf):
+                    best_cost[neighbor] = new_cost
+                    arrived_by[neighbor] = edge_id
+                    heapq.heappush(frontier, (new_cost + cost_to_goal[neighbor], new_cost, neighbor))
+        return None
+
+    def road(self, edge_id: int) -> Tuple[int, int]:
+        """
+        :return: the two cities a connection joins, smaller id first - so that parallel connections between the same
+        two cities count as the same road when comparing routes.
+        """
+        edge = self.engine.edges[edge_id]
+        return (edge[0], edge[1]) if edge[0] <= edge[1] else (edge[1], edge[0])
+
+    def overlap(self, edge_ids: List[int], cost: float, accepted_roads: List[Set[Tuple[int, int]]]) -> float:
+        """
+        :return: the largest fraction of the route's cost spent on roads shared with any one accepted route.
+        """
+        if cost <= 0:
+            return 1.0
+        return max(sum(self.edge_cost(edge_id) for edge_id in edge_ids if self.road(edge_id) in others) / cost
+                   for others in accepted_roads)
+
+
+def run_comparison(engine: RoutingEngine, k: int = 5, queries: int = 100, metric: SearchMetric = SearchMetric.TIME,
+                   seed: int = 0):
+    """
+    prints how long finding k routes takes, next to one ordinary search, for random pairs of cities, along with how
+    many of the spurs were read straight off the backward tree rather than searched for.
+    """
+    import random
+    generator = random.Random(seed)
+    num_cities = len(engine.neighbor_offsets) - 1
+    single_time = k_time = 0.0
+    from_tree = searched = 0
+    for _ in range(queries):
+        engine.first_city_id = generator.randrange(num_cities)
+        engine.second_city_id = generator.randrange(num_cities)
+        start_time = time.perf_counter()
+        engine.perform_search(metric, SearchMode.DIJKSTRA)
+        single_time += time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        alternatives = AlternativeRoutes(engine, engine.first_city_id, engine.second_city_id, metric)
+        alternatives.find(k)
+        k_time += time.perf_counter() - start_time
+        from_tree += alternatives.spurs_from_tree
+        searched += alternatives.spur_searches
+    print(f"one search: {1000 * single_time / queries:.3f} ms; {k} routes: {1000 * k_time / queries:.3f} ms "
+          f"({k_time / max(single_time, 1e-12):.1f}x); spurs from the tree: {from_tree}, searched: {searched}")
+
+
+if __name__ == '__main__':
+    run_comparison(RoutingEngine())
@@ -0,0 +1,84 @@
+import unittest
+from AlternativeRoutesFile import AlternativeRoutes
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
+
+
+class AlternativeRoutesTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = RoutingEngine()
+        self.neighbors = {}
+        for edge_id, edge in enumerate(self.engine.edges):
+            self.neighbors.setdefault(edge[0], []).append((edge[1], edge_id))
+            self.neighbors.setdefault(edge[1], []).append((edge[0], edge_id))
+
+    def loopless_costs(self, start, goal, metric, limit):
+        # every loopless path from start to goal costing no more than limit, by brute force.
+        costs = []
+
+        def extend(city, visited, cost):
+            if cost > limit:
+                return
+            if city == goal:
+                costs.append(cost)
+                return
+            for neighbor, edge_id in self.neighbors.get(city, []):
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    extend(neighbor, visited, cost + self.engine.edges[edge_id][metric.value])
+                    visited.discard(neighbor)
+        extend(start, {start}, 0.0)
+        return sorted(costs)
+
+    def path_cost(self, path, metric):
+        return sum(edge[metric.value] for edge in path)
+
+    def test_0_k_cheapest(self):
+        for first, second in [(53, 79), (21, 93), (4, 9), (28, 81)]:
+            self.engine.first_city_id = first
+            self.engine.second_city_id = second
+            for metric in SearchMetric:
+                routes = self.engine.alternative_routes(5, metric)
+                self.assertEqual(5, len(routes), f"Expected five routes from {first} to {second}.")
+                costs = [self.path_cost(route, metric) for route in routes]
+                expected = self.loopless_costs(first, second, metric, costs[-1] * (1 + 1e-9))[:5]
+                for cost, expected_cost in zip(costs, expected):
+                    self.assertAlmostEqual(expected_cost, cost, msg=f"Not the cheapest routes from {first} to {second}.")
+                self.assertEqual(self.engine.perform_search(metric, SearchMode.DIJKSTRA), routes[0],
+                                 "The first route should be the shortest path.")
+                for route in routes:
+                    cities = [first]
+                    for edge in route:
+                        self.assertIn(cities[-1], edge[:2], "A route's edges should follow on from each other.")
+                        cities.append(edge[1] if edge[0] == cities[-1] else edge[0])
+                    self.assertEqual(second, cities[-1], "Each route should end at the goal.")
+                    self.assertEqual(len(cities), len(set(cities)), "Routes shouldn't visit a city twice.")
+                    self.assertTrue(self.engine.describe_path(route).startswith("Path found:"), "Can't describe it.")
+                self.assertEqual(sorted(costs), costs, "Routes should come cheapest first.")
+
+    def test_1_filters(self):
+        metric = SearchMetric.TIME
+        self.engine.first_city_id = 21
+        self.engine.second_city_id = 93
+        best = self.path_cost(self.engine.alternative_routes(1, metric)[0], metric)
+        for route in self.engine.alternative_routes(10, metric, max_detour=1.05):
+            self.assertLessEqual(self.path_cost(route, metric), 1.05 * best + 1e-6, "That route is too long a detour.")
+        routes = self.engine.alternative_routes(4, metric, max_overlap=0.5)
+        self.assertGreater(len(routes), 1, "There should be some quite different routes.")
+        for position, route in enumerate(routes):
+            for earlier in routes[:position]:
+                roads = {frozenset(edge[:2]) for edge in earlier}
+                shared = sum(edge[metric.value] for edge in route if frozenset(edge[:2]) in roads)
+                self.assertLessEqual(shared, 0.5 * self.path_cost(route, metric) + 1e-6, "Routes overlap too much.")
+
+    def test_2_shares_work(self):
+        alternatives = AlternativeRoutes(self.engine, 53, 79, SearchMetric.DISTANCE)
+        alternatives.find(5)
+        self.assertGreater(alternatives.spurs_from_tree, 0, "Some spurs should come straight from the tree.")
+        self.assertLess(alternatives.cities_settled, 5 * len(self.engine.vertices),
+                        "Five routes should cost much less than five full searches.")
+        self.assertEqual([], AlternativeRoutes(self.engine, 53, -1).find(3), "No routes to a city that isn't there.")
+
+
+if __name__ == '__main__':
+    unittest.main()
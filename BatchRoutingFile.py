@@ -0,0 +1,76 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import os
+
+from RoutingEngineFile import RoutingEngine, Edge_Data, SearchMetric
+
+Route_Request = Tuple[int, int, SearchMetric]  # (origin city id, destination city id, what to minimize)
+Source_Task = Tuple[int, SearchMetric, List[int]]  # (origin city id, what to minimize, destination city ids)
+
+# the engine each worker process searches in, set once by _start_worker() rather than sent along with every task.
+_worker_engine: Optional[RoutingEngine] = None
+
+
+def _start_worker(engine: RoutingEngine):
+    """
+    runs once in each worker process of the pool to give it the engine. (When the pool forks, the engine's arrays
+    are shared with the parent copy-on-write; the workers only ever read them.)
+    :param engine: the engine to search in
+    :return: None
+    """
+    global _worker_engine
+    _worker_engine = engine
+
+
+def routes_from_source(engine: RoutingEngine, task: Source_Task) -> List[Optional[List[Edge_Data]]]:
+    """
+    answers every request that shares an origin and a metric with a single search from that origin.
+    :param engine: the engine to search in
+    :param task: the origin, the metric and the list of destinations
+    :return: one path (or None, if unreachable) per destination, in the same order as the destinations.
+    """
+    origin, metric, destinations = task
+    best_cost, arrived_by = engine.shortest_path_tree(origin, metric, targets=destinations)
+    return [engine.trace_path(arrived_by, origin, destination) if destination in best_cost else None
+            for destination in destinations]
+
+
+def _routes_from_source_in_worker(task: Source_Task) -> List[Optional[List[Edge_Data]]]:
+    return routes_from_source(_worker_engine, task)
+
+
+def route_batch(engine: RoutingEngine, requests: List[Route_Request],
+                processes: Optional[int] = None) -> List[Optional[List[Edge_Data]]]:
+    """
+    finds the shortest path for each (origin, destination, metric) request. Requests are grouped by origin and metric
+    so that each group costs one single-source search, and the groups are spread across a pool of worker processes.
+    Unlike perform_search(), this does not read or change engine.first_city_id/second_city_id.
+    :param engine: the engine to search in. It is handed to each worker once, when the pool starts.
+    :param requests: the list of requests
+    :param processes: how many worker processes to use; defaults to the number of CPUs. With 1 (or with only one
+    group of requests) everything runs in this process.
+    :return: one path per request, in the same order as the requests: a list of Edge_Data in travel order, or None if
+    the destination can't be reached.
+    """
+    groups: Dict[Tuple[int, SearchMetric], List[int]] = {}  # (origin, metric) -> positions in the requests list
+    for position, (origin, destination, metric) in enumerate(requests):
+        groups.setdefault((origin, metric), []).append(position)
+    tasks: List[Source_Task] = [(origin, metric, [requests[position][1] for position in positions])
+                                for (origin, metric), positions in groups.items()]
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(tasks))
+    if processes <= 1:
+        answers = [routes_from_source(engine, task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_start_worker, initargs=(engine,)) as pool:
+            # a few tasks per message keeps the overhead of passing work back and forth down for small searches.
+            answers = list(pool.map(_routes_from_source_in_worker, tasks,
+                                    chunksize=max(1, len(tasks) // (4 * processes))))
+
+    results: List[Optional[List[Edge_Data]]] = [None] * len(requests)
+    for positions, paths in zip(groups.values(), answers):
+        for position, path in zip(positions, paths):
+            results[position] = path
+    return results
@@ -0,0 +1,36 @@
+import unittest
+from BatchRoutingFile import route_batch
+from RoutingEngineFile import RoutingEngine, SearchMetric
+
+
+class BatchRoutingTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = RoutingEngine()
+        self.requests = [(21, 93, SearchMetric.DISTANCE), (53, 79, SearchMetric.DISTANCE),
+                         (21, 4, SearchMetric.TIME), (21, 95, SearchMetric.DISTANCE), (28, 28, SearchMetric.DISTANCE),
+                         (95, 4, SearchMetric.TIME), (21, 93, SearchMetric.TIME)]
+
+    def expected_paths(self):
+        expected = []
+        for origin, destination, metric in self.requests:
+            self.engine.first_city_id = origin
+            self.engine.second_city_id = destination
+            expected.append(self.engine.perform_search(metric))
+        self.engine.first_city_id = -1
+        self.engine.second_city_id = -1
+        return expected
+
+    def test_0_batch_matches_single_searches(self):
+        self.assertEqual(self.expected_paths(), route_batch(self.engine, self.requests, processes=1),
+                         "Batch routes should match one perform_search() per request.")
+
+    def test_1_batch_in_process_pool(self):
+        self.assertEqual(self.expected_paths(), route_batch(self.engine, self.requests, processes=2),
+                         "Routes from the process pool should match one perform_search() per request.")
+
+    def test_2_batch_leaves_engine_alone(self):
+        route_batch(self.engine, self.requests, processes=1)
+        self.assertEqual((-1, -1), (self.engine.first_city_id, self.engine.second_city_id),
+                         "route_batch() should not change the engine's selected cities.")
+
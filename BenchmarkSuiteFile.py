@@ -0,0 +1,303 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import string
+import subprocess
+import time
+
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode, CITY_DATA_FILENAME, CONNECTION_DATA_FILENAME
+
+BENCHMARK_GRAPH_FOLDER = "benchmark_graphs"
+BENCHMARK_RESULTS_FILENAME = "benchmark_results.json"
+RESULTS_FORMAT_VERSION = 1
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000, 1_000_000)
+
+# the part of the map graphic the real cities cover, in pixels (left, top, right, bottom); synthetic cities are spread
+# over the same area, so they can be drawn on the same map.
+MAP_AREA = (60, 50, 960, 510)
+# roughly how the real connections.txt relates a connection's length in pixels to its distance, and its distance to
+# its travel time.
+DISTANCE_PER_PIXEL = 160.0
+TIME_PER_DISTANCE = (20.0, 35.0)
+
+
+# ============================================================================ SYNTHETIC GRAPHS
+def generate_synthetic_graph(num_cities: int, city_file_path: str, connection_file_path: str, seed: int = 0,
+                             keep_fraction: float = 0.7, diagonal_fraction: float = 0.05):
+    """
+    writes a random, road-like map in exactly the formats of "City Data with coords.txt" and "connections.txt".
+    The cities sit on a jittered grid over the map area; each city is connected to the next one along and the next
+    one down with probability keep_fraction (and, now and then, diagonally), and then just enough more grid
+    connections are added to make the whole map connected. That gives each city about three connections on average,
+    like a real road network, rather than the dozens a random graph of the same size would have.
+    :param num_cities: how many cities to make
+    :param city_file_path: where to write the cities
+    :param connection_file_path: where to write the connections
+    :param seed: the random seed; the same seed and size always give the same files.
+    :param keep_fraction: the chance that each grid connection is a road
+    :param diagonal_fraction: the chance of a diagonal road from each city
+    :return: None
+    """
+    generator = random.Random(seed)
+    left, top, right, bottom = MAP_AREA
+    columns = max(1, math.ceil(math.sqrt(num_cities * (right - left) / (bottom - top))))
+    rows = math.ceil(num_cities / columns)
+    spacing_x = (right - left) / columns
+    spacing_y = (bottom - top) / max(rows, 1)
+
+    xs: List[float] = []
+    ys: List[float] = []
+    for city in range(num_cities):
+        row, column = divmod(city, columns)
+        xs.append(left + (column + 0.5 + generator.uniform(-0.35, 0.35)) * spacing_x)
+        ys.append(top + (row + 0.5 + generator.uniform(-0.35, 0.35)) * spacing_y)
+
+    # every pair of neighbors on the grid (a few diagonals included) is a candidate road.
+    candidates: List[Tuple[int, int]] = []
+    for city in range(num_cities):
+        row, column = divmod(city, columns)
+        if column + 1 < columns and city + 1 < num_cities:
+            candidates.append((city, city + 1))
+        if city + columns < num_cities:
+            candidates.append((city, city + columns))
+        if generator.random() < diagonal_fraction and column + 1 < columns and city + columns + 1 < num_cities:
+            candidates.append((city, city + columns + 1))
+
+    # keep a random share of them, then add back whichever of the rest join separate pieces of the map.
+    group = list(range(num_cities))
+
+    def find(city: int) -> int:
+        while group[city] != city:
+            group[city] = group[group[city]]
+            city = group[city]
+        return city
+
+    roads: List[Tuple[int, int]] = []
+    skipped: List[Tuple[int, int]] = []
+    for pair in candidates:
+        if generator.random() < keep_fraction:
+            roads.append(pair)
+            group[find(pair[0])] = find(pair[1])
+        else:
+            skipped.append(pair)
+    for pair in skipped:
+        root1, root2 = find(pair[0]), find(pair[1])
+        if root1 != root2:
+            roads.append(pair)
+            group[root1] = root2
+    roads.sort()
+
+    # the city file separates lines with carriage returns and the connection file with newlines, and neither ends
+    # with a line break - just like the originals.
+    states = ["".join(generator.choice(string.ascii_uppercase) for _ in range(2)) for _ in range(50)]
+    with open(city_file_path, "w", newline="") as city_file:
+        city_file.write("\r".join(f"{city}\tTown {city}\t{states[city % len(states)]}\t{round(xs[city])}\t"
+                                  f"{round(ys[city])}" for city in range(num_cities)))
+    with open(connection_file_path, "w", newline="") as connection_file:
+        lines = []
+        for edge_id, (city1, city2) in enumerate(roads):
+            pixels = math.hypot(xs[city1] - xs[city2], ys[city1] - ys[city2])
+            distance = max(1, round(pixels * DISTANCE_PER_PIXEL * generator.uniform(1.0, 1.3)))
+            travel_time = max(1, round(distance * generator.uniform(*TIME_PER_DISTANCE)))
+            lines.append(f"{edge_id}\t{city1}\t{city2}\t{distance}\t{travel_time}")
+        connection_file.write("\n".join(lines))
+
+
+def synthetic_graph_files(num_cities: int, seed: int = 0, folder: str = BENCHMARK_GRAPH_FOLDER) -> Tuple[str, str]:
+    """
+    finds (or generates, the first time) the synthetic map of the given size and seed.
+    :return: (the city file path, the connection file path)
+    """
+    graph_folder = os.path.join(folder, f"{num_cities}_cities_seed_{seed}")
+    city_file_path = os.path.join(graph_folder, CITY_DATA_FILENAME)
+    connection_file_path = os.path.join(graph_folder, CONNECTION_DATA_FILENAME)
+    if not (os.path.exists(city_file_path) and os.path.exists(connection_file_path)):
+        os.makedirs(graph_folder, exist_ok=True)
+        generate_synthetic_graph(num_cities, city_file_path, connection_file_path, seed)
+    return city_file_path, connection_file_path
+# =========================================================================================
+
+
+# ============================================================================ TIMING
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """
+    :param durations: how long each call took, in seconds
+    :return: the count, total, mean, median, 99th percentile, fastest and slowest of them, in seconds.
+    """
+    ordered = sorted(durations)
+    if not ordered:
+        return {"calls": 0}
+    return {"calls": len(ordered),
+            "total_s": sum(ordered),
+            "mean_s": sum(ordered) / len(ordered),
+            "p50_s": statistics.median(ordered),
+            "p99_s": ordered[max(0, math.ceil(0.99 * len(ordered)) - 1)],
+            "min_s": ordered[0],
+            "max_s": ordered[-1]}
+
+
+def time_calls(function: Callable, arguments: List[tuple]) -> List[float]:
+    """
+    calls function once with each tuple of arguments.
+    :return: how long each call took, in seconds
+    """
+    durations = []
+    for args in arguments:
+        start_time = time.perf_counter()
+        function(*args)
+        durations.append(time.perf_counter() - start_time)
+    return durations
+
+
+def make_engine(city_file_path: str, connection_file_path: str) -> RoutingEngine:
+    # a MapConnector (if OpenCV is available) so that drawing can be timed too; without a window, it costs no more
+    # to load than a RoutingEngine.
+    try:
+        from MapConnectorFile import MapConnector
+    except ImportError:
+        return RoutingEngine(city_file_path, connection_file_path)
+    return MapConnector(False, city_file_path, connection_file_path)
+
+
+def benchmark_graph(city_file_path: str, connection_file_path: str, queries: int = 20, samples: int = 10_000,
+                    seed: int = 0) -> dict:
+    """
+    times each phase of the program, separately, on one map.
+    :param city_file_path: the tab-delimited city file
+    :param connection_file_path: the tab-delimited connection file
+    :param queries: how many random searches to time in each search mode
+    :param samples: how many random calls to time for the quick operations (get_neighbor_edges, find_closest_city)
+    :param seed: the random seed for choosing cities and points
+    :return: {"cities", "connections", "phases": phase name -> summarize() of its timings, "skipped": phase -> why}
+    """
+    generator = random.Random(seed)
+    phases: Dict[str, Dict[str, float]] = {}
+    skipped: Dict[str, str] = {}
+
+    start_time = time.perf_counter()
+    engine = make_engine(city_file_path, connection_file_path)
+    phases["load"] = summarize([time.perf_counter() - start_time])
+    num_cities = len(engine.vertices)
+
+    cities = [generator.randrange(num_cities) for _ in range(min(samples, num_cities))]
+    phases["get_neighbor_edges"] = summarize(time_calls(engine.get_neighbor_edges, [(city,) for city in cities]))
+
+    pairs = [(generator.randrange(num_cities), generator.randrange(num_cities), metric)
+             for metric in SearchMetric for _ in range(max(1, queries // 2))]
+    paths = []
+    for mode in (SearchMode.DIJKSTRA, SearchMode.A_STAR, SearchMode.BIDIRECTIONAL):
+        durations = []
+        for first_city_id, second_city_id, metric in pairs:
+            engine.first_city_id = first_city_id
+            engine.second_city_id = second_city_id
+            start_time = time.perf_counter()
+            path = engine.perform_search(metric, mode)
+            durations.append(time.perf_counter() - start_time)
+            if mode == SearchMode.DIJKSTRA:
+                paths.append((first_city_id, second_city_id, path))
+        phases[f"perform_search.{mode.name.lower()}"] = summarize(durations)
+
+    durations = []
+    for first_city_id, second_city_id, path in paths:
+        engine.first_city_id = first_city_id
+        engine.second_city_id = second_city_id
+        start_time = time.perf_counter()
+        engine.describe_path(path)
+        durations.append(time.perf_counter() - start_time)
+    phases["describe_path"] = summarize(durations)
+    engine.first_city_id = engine.second_city_id = -1
+
+    left, top, right, bottom = MAP_AREA
+    points = [((generator.uniform(left, right), generator.uniform(top, bottom)),) for _ in range(samples)]
+    engine.find_closest_city(points[0][0])  # builds the spatial index, which belongs to loading rather than lookups.
+    phases["find_closest_city"] = summarize(time_calls(engine.find_closest_city, points))
+
+    if hasattr(engine, "draw_cities_and_connections") and engine.original_map_image is not None:
+        phases["draw_cities_and_connections"] = summarize(time_calls(engine.draw_cities_and_connections, [()]))
+    else:
+        skipped["draw_cities_and_connections"] = "OpenCV or the map graphic is not available."
+
+    return {"cities": num_cities, "connections": len(engine.edges), "phases": phases, "skipped": skipped}
+# =========================================================================================
+
+
+# ============================================================================ RESULTS
+def current_commit() -> Optional[str]:
+    """
+    :return: the git commit of the working copy, or None if it can't be found out.
+    """
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def run_suite(sizes=DEFAULT_SIZES, seed: int = 0, queries: int = 20, samples: int = 10_000,
+              graph_folder: str = BENCHMARK_GRAPH_FOLDER) -> dict:
+    """
+    benchmarks a synthetic map of each size in turn. Bigger maps get fewer searches, so that each size takes roughly
+    the same time.
+    :return: the results, ready to be saved as JSON: details of the run, plus {size: benchmark_graph() results}
+    """
+    results = {"format": RESULTS_FORMAT_VERSION,
+               "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+               "commit": current_commit(),
+               "python": platform.python_version(),
+               "platform": platform.platform(),
+               "seed": seed,
+               "sizes": {}}
+    for size in sizes:
+        city_file_path, connection_file_path = synthetic_graph_files(size, seed, graph_folder)
+        size_queries = max(2, min(queries, round(queries * 10_000 / size)))
+        print(f"Benchmarking {size} cities ({size_queries} searches per mode)...")
+        results["sizes"][str(size)] = benchmark_graph(city_file_path, connection_file_path, size_queries, samples,
+                                                      seed)
+    return results
+
+
+def print_results(results: dict, baseline: Optional[dict] = None, tolerance: float = 1.2):
+    """
+    prints the mean time of each phase for each size - and, given earlier results to compare with, how many times
+    slower or faster each one is now, marking anything more than tolerance times slower.
+    :return: None
+    """
+    print(f"{'cities':>9} {'phase':<32} {'calls':>6} {'mean (ms)':>11} {'p99 (ms)':>10}"
+          f"{'  vs baseline' if baseline else ''}")
+    for size, result in results["sizes"].items():
+        for phase, timing in result["phases"].items():
+            line = f"{size:>9} {phase:<32} {timing['calls']:>6} {1000 * timing['mean_s']:>11.3f} " \
+                   f"{1000 * timing['p99_s']:>10.3f}"
+            old_timing = baseline["sizes"].get(size, {}).get("phases", {}).get(phase) if baseline else None
+            if old_timing:
+                ratio = timing["mean_s"] / old_timing["mean_s"] if old_timing["mean_s"] > 0 else math.inf
+                line += f"  {ratio:>6.2f}x{'  <-- slower' if ratio > tolerance else ''}"
+            print(line)
+        for phase, reason in result["skipped"].items():
+            print(f"{size:>9} {phase:<32} skipped: {reason}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time each phase of the routing program on synthetic maps.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="how many cities")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=20, help="searches per mode on the smaller maps")
+    parser.add_argument("--output", default=BENCHMARK_RESULTS_FILENAME, help="where to write the JSON results")
+    parser.add_argument("--baseline", help="earlier JSON results to compare with")
+    arguments = parser.parse_args()
+
+    suite_results = run_suite(arguments.sizes, arguments.seed, arguments.queries)
+    with open(arguments.output, "w") as results_file:
+        json.dump(suite_results, results_file, indent=2)
+    baseline_results = None
+    if arguments.baseline:
+        with open(arguments.baseline, "r") as baseline_file:
+            baseline_results = json.load(baseline_file)
+    print_results(suite_results, baseline_results)
+    print(f"Saved the results to {arguments.output}.")
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from BenchmarkSuiteFile import benchmark_graph, generate_synthetic_graph, summarize
+from RoutingEngineFile import RoutingEngine
+
+
+class BenchmarkSuiteTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.folder = tempfile.TemporaryDirectory()
+        self.city_file_path = os.path.join(self.folder.name, "cities.txt")
+        self.connection_file_path = os.path.join(self.folder.name, "connections.txt")
+
+    def tearDown(self) -> None:
+        self.folder.cleanup()
+
+    def test_0_file_formats(self):
+        generate_synthetic_graph(500, self.city_file_path, self.connection_file_path, seed=3)
+        with open(self.city_file_path, "r", newline="") as city_file:
+            city_text = city_file.read()
+        with open(self.connection_file_path, "r", newline="") as connection_file:
+            connection_text = connection_file.read()
+        self.assertNotIn("\n", city_text, "Like the original, the city file should separate lines with '\\r'.")
+        self.assertNotIn("\r", connection_text, "Like the original, the connection file should use '\\n'.")
+        self.assertFalse(city_text.endswith("\r") or connection_text.endswith("\n"),
+                         "Neither file should end with a line break.")
+        for line_number, line in enumerate(city_text.split("\r")):
+            parts = line.split("\t")
+            self.assertEqual(5, len(parts), "Each city should have five fields.")
+            self.assertEqual(str(line_number), parts[0], "Cities should be numbered in order.")
+        for line_number, line in enumerate(connection_text.split("\n")):
+            self.assertEqual([str(line_number)], line.split("\t")[:1], "Connections should be numbered in order.")
+            self.assertTrue(all(part.isdigit() for part in line.split("\t")), "Every field should be an integer.")
+
+    def test_1_road_like_and_connected(self):
+        generate_synthetic_graph(2000, self.city_file_path, self.connection_file_path, seed=5)
+        engine = RoutingEngine(self.city_file_path, self.connection_file_path)
+        self.assertEqual(2000, len(engine.vertices))
+        mean_degree = 2 * len(engine.edges) / len(engine.vertices)
+        self.assertTrue(2.5 <= mean_degree <= 3.5, f"Expected about three roads per city, got {mean_degree:.2f}.")
+        best_cost, _ = engine.shortest_path_tree(0)
+        self.assertEqual(2000, len(best_cost), "Every city should be reachable from every other.")
+
+        with open(self.connection_file_path, "r") as connection_file:
+            first_text = connection_file.read()
+        generate_synthetic_graph(2000, self.city_file_path, self.connection_file_path, seed=5)
+        with open(self.connection_file_path, "r") as connection_file:
+            self.assertEqual(first_text, connection_file.read(), "The same seed should give the same map.")
+
+    def test_2_benchmark_graph(self):
+        generate_synthetic_graph(300, self.city_file_path, self.connection_file_path)
+        result = benchmark_graph(self.city_file_path, self.connection_file_path, queries=4, samples=50)
+        self.assertEqual(300, result["cities"])
+        for phase in ("load", "get_neighbor_edges", "perform_search.dijkstra", "perform_search.a_star",
+                      "perform_search.bidirectional", "describe_path", "find_closest_city"):
+            self.assertIn(phase, result["phases"], f"Expected a timing for {phase}.")
+            self.assertGreater(result["phases"][phase]["calls"], 0)
+        self.assertEqual(1, len(result["phases"]) + len(result["skipped"]) - 7,
+                         "Drawing should be either timed or skipped.")
+
+    def test_3_summarize(self):
+        timing = summarize([0.004, 0.001, 0.003, 0.002])
+        self.assertEqual(4, timing["calls"])
+        self.assertAlmostEqual(0.0025, timing["mean_s"])
+        self.assertAlmostEqual(0.0025, timing["p50_s"])
+        self.assertAlmostEqual(0.004, timing["p99_s"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+from typing import Dict, List, Optional
+import json
+import os
+
+import numpy
+
+from GraphArraysFile import CityTable, EdgeTable, StringTable
+from RoutingEngineFile import RoutingEngine, SearchMetric, CITY_DATA_FILENAME, CONNECTION_DATA_FILENAME
+
+BINARY_GRAPH_FOLDER = "graph_binary"
+MANIFEST_FILENAME = "manifest.json"
+FORMAT_VERSION = 1
+
+# every array in the format, with the type it is stored as.
+ARRAY_TYPES = {"city_ids": numpy.int64,
+               "city_xs": numpy.int32,
+               "city_ys": numpy.int32,
+               "name_blob": numpy.uint8,
+               "name_offsets": numpy.int64,
+               "state_blob": numpy.uint8,
+               "state_offsets": numpy.int64,
+               "edge_endpoints": numpy.int64,
+               "edge_distances": numpy.float64,
+               "edge_times": numpy.float64,
+               "neighbor_offsets": numpy.int64,
+               "neighbor_cities": numpy.int64,
+               "neighbor_edge_ids": numpy.int64,
+               "neighbor_distances": numpy.float64,
+               "neighbor_times": numpy.float64}
+
+
+def source_stamps(city_file_path: str, connection_file_path: str) -> List[List]:
+    """
+    :return: the size and modification time of each text data file (None for a missing file), which is how a
+    compiled graph knows whether it is still up to date without reading the text files.
+    """
+    stamps = []
+    for path in (city_file_path, connection_file_path):
+        if os.path.exists(path):
+            status = os.stat(path)
+            stamps.append([os.path.basename(path), status.st_size, status.st_mtime_ns])
+        else:
+            stamps.append([os.path.basename(path), None, None])
+    return stamps
+
+
+def compile_binary_graph(output_folder: str = BINARY_GRAPH_FOLDER, city_file_path: str = CITY_DATA_FILENAME,
+                         connection_file_path: str = CONNECTION_DATA_FILENAME):
+    """
+    reads the two text data files (with the usual RoutingEngine loaders, which remain the source of truth) and writes
+    them, along with the adjacency index, as a folder of fixed-width .npy arrays that BinaryGraph can memory-map.
+    :param output_folder: the folder to write into; it is created if needed.
+    :param city_file_path: the tab-delimited city file
+    :param connection_file_path: the tab-delimited connection file
+    :return: None
+    """
+    engine = RoutingEngine(city_file_path, connection_file_path)
+    os.makedirs(output_folder, exist_ok=True)
+    manifest_path = os.path.join(output_folder, MANIFEST_FILENAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)  # so that a half-rewritten folder is never mistaken for an up-to-date one.
+
+    name_blob, name_offsets = StringTable.pack([city[1] for city in engine.vertices])
+    state_blob, state_offsets = StringTable.pack([city[2] for city in engine.vertices])
+    arrays = {"city_ids": [city[0] for city in engine.vertices],
+              "city_xs": [city[3] for city in engine.vertices],
+              "city_ys": [city[4] for city in engine.vertices],
+              "name_blob": name_blob,
+              "name_offsets": name_offsets,
+              "state_blob": state_blob,
+              "state_offsets": state_offsets,
+              "edge_endpoints": numpy.array([(edge[0], edge[1]) for edge in engine.edges],
+                                            dtype=numpy.int64).reshape(-1, 2),
+              "edge_distances": [edge[2] for edge in engine.edges],
+              "edge_times": [edge[3] for edge in engine.edges],
+              "neighbor_offsets": engine.neighbor_offsets,
+              "neighbor_cities": engine.neighbor_cities,
+              "neighbor_edge_ids": engine.neighbor_edge_ids,
+              "neighbor_distances": engine.neighbor_distances,
+              "neighbor_times": engine.neighbor_times}
+    for name, dtype in ARRAY_TYPES.items():
+        numpy.save(os.path.join(output_folder, f"{name}.npy"), numpy.asarray(arrays[name], dtype=dtype))
+
+    manifest = {"version": FORMAT_VERSION,
+                "sources": source_stamps(city_file_path, connection_file_path),
+                "heuristic_scales": {metric.name: scale for metric, scale in engine.heuristic_scales.items()}}
+    with open(manifest_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+
+
+class BinaryGraph:
+    """
+    A compiled graph folder, opened with every array memory-mapped read-only - so opening it is nearly instant
+    whatever its size, and processes that open the same folder share one physical copy of the data.
+    """
+
+    def __init__(self, arrays: Dict[str, numpy.ndarray], heuristic_scales: Dict[SearchMetric, float]):
+        self.arrays = arrays
+        self.heuristic_scales = heuristic_scales
+        self.vertices = CityTable(arrays["city_ids"],
+                                  StringTable(arrays["name_blob"], arrays["name_offsets"]),
+                                  StringTable(arrays["state_blob"], arrays["state_offsets"]),
+                                  arrays["city_xs"], arrays["city_ys"])
+        self.edges = EdgeTable(arrays["edge_endpoints"], arrays["edge_distances"], arrays["edge_times"])
+
+    @staticmethod
+    def is_current(folder: str, city_file_path: str, connection_file_path: str) -> bool:
+        """
+        :return: whether the folder holds a complete compiled graph of the text files as they are now.
+        """
+        try:
+            with open(os.path.join(folder, MANIFEST_FILENAME), "r") as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return False
+        return manifest.get("version") == FORMAT_VERSION and \
+            manifest.get("sources") == source_stamps(city_file_path, connection_file_path)
+
+    @classmethod
+    def open(cls, folder: str, city_file_path: str = CITY_DATA_FILENAME,
+             connection_file_path: str = CONNECTION_DATA_FILENAME) -> Optional["BinaryGraph"]:
+        """
+        memory-maps a folder written by compile_binary_graph().
+        :return: the graph, or None if the folder is missing, incomplete or older than the text files.
+        """
+        if not cls.is_current(folder, city_file_path, connection_file_path):
+            return None
+        try:
+            with open(os.path.join(folder, MANIFEST_FILENAME), "r") as manifest_file:
+                manifest = json.load(manifest_file)
+            arrays = {name: numpy.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r") for name in ARRAY_TYPES}
+        except (OSError, ValueError) as err:
+            print(f"Couldn't open the compiled graph: {err}")
+            return None
+        scales = {metric: float(manifest["heuristic_scales"][metric.name]) for metric in SearchMetric}
+        return cls(arrays, scales)
+
+
+if __name__ == '__main__':
+    compile_binary_graph()
+    print(f"Compiled the city and connection data into {BINARY_GRAPH_FOLDER}/.")
@@ -0,0 +1,57 @@
+from array import array
+import os
+import shutil
+import tempfile
+import unittest
+from BinaryGraphFile import compile_binary_graph
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
+
+
+class BinaryGraphTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.folder = tempfile.mkdtemp()
+        self.city_path = os.path.join(self.folder, "cities.txt")
+        self.connection_path = os.path.join(self.folder, "connections.txt")
+        self.graph_folder = os.path.join(self.folder, "graph_binary")
+        shutil.copy("City Data with coords.txt", self.city_path)
+        shutil.copy("connections.txt", self.connection_path)
+        compile_binary_graph(self.graph_folder, self.city_path, self.connection_path)
+        self.text_engine = RoutingEngine(self.city_path, self.connection_path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.folder)
+
+    def test_0_same_data_as_text(self):
+        engine = RoutingEngine(self.city_path, self.connection_path, binary_graph_folder=self.graph_folder)
+        self.assertIsNot(list, type(engine.edges), "The compiled graph should have been memory-mapped.")
+        self.assertEqual(self.text_engine.neighbor_edge_ids, engine.neighbor_edge_ids, "The adjacency index differs.")
+        self.assertIsInstance(engine.neighbor_times, array, "The searches should read the index from array.arrays.")
+        self.assertEqual(self.text_engine.vertices, list(engine.vertices), "Cities differ from the text files.")
+        self.assertEqual(self.text_engine.edges, list(engine.edges), "Connections differ from the text files.")
+        self.assertEqual(self.text_engine.vertices[49], engine.vertices[49], "City 49 differs from the text file.")
+        self.assertEqual(self.text_engine.edges[-1], engine.edges[-1], "The last edge differs from the text file.")
+        self.assertEqual(self.text_engine.data_fingerprint(), engine.data_fingerprint(), "Fingerprints differ.")
+
+    def test_1_same_searches_as_text(self):
+        engine = RoutingEngine(self.city_path, self.connection_path, binary_graph_folder=self.graph_folder)
+        for first, second in [(53, 79), (28, 81), (95, 4), (21, 93)]:
+            for target in (engine, self.text_engine):
+                target.first_city_id = first
+                target.second_city_id = second
+            for metric in SearchMetric:
+                self.assertEqual(self.text_engine.perform_search(metric, SearchMode.A_STAR),
+                                 engine.perform_search(metric, SearchMode.A_STAR), "Searches differ.")
+            self.assertEqual(self.text_engine.describe_path(self.text_engine.perform_search()),
+                             engine.describe_path(engine.perform_search()), "Descriptions differ.")
+        self.assertEqual(self.text_engine.find_closest_city((400, 300)), engine.find_closest_city((400, 300)),
+                         "Closest cities differ.")
+
+    def test_2_falls_back_to_text_when_stale(self):
+        with open(self.connection_path, "a") as connection_file:
+            connection_file.write("\n204\t0\t99\t1000\t1000")  # (the file has no newline at the end.)
+        engine = RoutingEngine(self.city_path, self.connection_path, binary_graph_folder=self.graph_folder)
+        self.assertIs(list, type(engine.edges), "A stale compiled graph should not be used.")
+        self.assertEqual(205, len(engine.edges), "The text files should have been read instead.")
+        self.assertEqual(self.text_engine.edges, engine.edges[:204], "The original connections should be unchanged.")
+        self.assertEqual((0, 99, 1000.0, 1000.0), engine.edges[204], "The new connection wasn't read correctly.")
@@ -0,0 +1,155 @@
+from array import array
+from collections.abc import Sequence
+from typing import IO, Iterable, List, Optional, Union
+
+from RoutingEngineFile import RoutingEngine, Edge_Data
+
+
+class CompactPath(Sequence):
+    """
+    A path stored as two integer arrays - the cities in travel order, and the index (in the engine's edges) of each
+    connection between them - plus its total distance and time, added up as it is built. Compared with a list of
+    Edge_Data, it knows which way it is travelled (so nothing has to work that out by matching shared endpoints), and
+    costs 16 bytes per step instead of a list slot pointing at a tuple.
+
+    It is also a read-only sequence of the Edge_Data it passes along, in travel order, so it can be handed to anything
+    that takes a path as a list - display_path(), say - and to_edges() turns it into exactly that list.
+    """
+
+    def __init__(self, edges, cities: array, edge_ids: array):
+        """
+        :param edges: the engine's list of edges, which edge_ids index into
+        :param cities: the cities in travel order (one more than there are edges; just the start, for an empty path)
+        :param edge_ids: the index in edges of the connection used for each step
+        """
+        self.edges = edges
+        self.cities = cities
+        self.edge_ids = edge_ids
+        self.total_distance = 0.0
+        self.total_time = 0.0
+        for edge_id in edge_ids:
+            edge = edges[edge_id]
+            self.total_distance += edge[2]
+            self.total_time += edge[3]
+
+    @classmethod
+    def from_arrived_by(cls, engine: RoutingEngine, arrived_by: dict, start: int, goal: int) -> "CompactPath":
+        """
+        builds the path straight from a search's record of how it reached each city - like trace_path(), but without
+        making the list of tuples.
+        :param engine: the engine that ran the search
+        :param arrived_by: city id -> index (in engine.edges) of the edge the search used to reach that city
+        :param start: the city the search began at
+        :param goal: the city the search ended at
+        :return: the path from start to goal
+        """
+        return cls.from_edge_ids(engine, start, engine.trace_edge_ids(arrived_by, start, goal))
+
+    @classmethod
+    def from_edge_ids(cls, engine: RoutingEngine, start: int, edge_ids: Iterable[int]) -> "CompactPath":
+        """
+        builds the path from the indices of its edges, as a search knows them - the exact connections it used, even
+        where two cities have identical parallel ones.
+        :param engine: the engine whose edges the indices refer to
+        :param start: the city the path begins at
+        :param edge_ids: the index (in engine.edges) of each edge of the path, in travel order
+        :return: the path from start along those edges
+        """
+        edges = engine.edges
+        cities = array("l", [start])
+        edge_ids = array("l", edge_ids)
+        city = start
+        for edge_id in edge_ids:
+            edge = edges[edge_id]
+            city = edge[0] if edge[1] == city else edge[1]
+            cities.append(city)
+        return cls(edges, cities, edge_ids)
+
+    @classmethod
+    def from_edges(cls, engine: RoutingEngine, path: List[Edge_Data],
+                   start: Optional[int] = None) -> Optional["CompactPath"]:
+        """
+        converts a path in the usual form, a list of Edge_Data in travel order. A list doesn't say which of two
+        identical parallel connections it means; the one it holds (if it came from engine.edges) is used, otherwise
+        the first. Where the edge indices are known, from_edge_ids() is exact - or ask perform_search() for
+        compact=True.
+        :param engine: the engine whose edges the path uses
+        :param path: the path; None gives None
+        :param start: the city the path begins at, if known; otherwise engine.path_start_city() works it out.
+        :return: the same path, compacted (to_edges() gives back an equal list)
+        :raises ValueError: if the path uses a connection the engine doesn't have
+        """
+        if path is None:
+            return None
+        if len(path) == 0:
+            return cls(engine.edges, array("l", [engine.first_city_id if start is None else start]), array("l"))
+        city = engine.path_start_city(path) if start is None else start
+        offsets = engine.neighbor_offsets
+        neighbor_edge_ids = engine.neighbor_edge_ids
+        cities = array("l", [city])
+        edge_ids = array("l")
+        for edge in path:
+            matches = [edge_id for edge_id in neighbor_edge_ids[offsets[city]:offsets[city + 1]]
+                       if engine.edges[edge_id] == edge]
+            if not matches:
+                raise ValueError(f"The connection {edge} doesn't leave city {city}.")
+            edge_ids.append(next((edge_id for edge_id in matches if engine.edges[edge_id] is edge), matches[0]))
+            city = edge[1] if edge[0] == city else edge[0]
+            cities.append(city)
+        return cls(engine.edges, cities, edge_ids)
+
+    @property
+    def start(self) -> int:
+        return self.cities[0]
+
+    @property
+    def goal(self) -> int:
+        return self.cities[-1]
+
+    def to_edges(self) -> List[Edge_Data]:
+        """
+        :return: the path as a list of Edge_Data in travel order, as perform_search() returns it.
+        """
+        return [self.edges[edge_id] for edge_id in self.edge_ids]
+
+    def __len__(self) -> int:
+        return len(self.edge_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.edges[edge_id] for edge_id in self.edge_ids[index]]
+        return self.edges[self.edge_ids[index]]
+
+    def __iter__(self):
+        return (self.edges[edge_id] for edge_id in self.edge_ids)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CompactPath):
+            return self.cities == other.cities and self.edge_ids == other.edge_ids
+        return list(self) == other
+
+
+def write_path_descriptions(engine: RoutingEngine, paths: Iterable[Optional[Union[CompactPath, List[Edge_Data]]]],
+                            output: IO[str]) -> int:
+    """
+    writes the describe_path() of every path to a text file, one after another with a blank line between them - for
+    very many paths (millions of routes from route_batch(), say). Each city's line is formatted once, up front, and
+    each path's cities are written with one join of those lines, so nothing is made per step of a path; paths are
+    read one at a time, so they can come from a generator.
+    :param engine: the engine the paths belong to
+    :param paths: the paths: CompactPaths, lists of Edge_Data (which are compacted first), or None for "No path found."
+    :param output: a text file open for writing
+    :return: how many paths were written
+    """
+    lines = [f"• {city[1]}, {city[2]}\n" for city in engine.vertices]
+    count = 0
+    for path in paths:
+        if path is not None and not isinstance(path, CompactPath):
+            path = CompactPath.from_edges(engine, path)
+        if path is None or len(path) == 0:
+            output.write("No path found.\n\n")
+        else:
+            output.write(f"Path found:\n{''.join([lines[city] for city in path.cities])}"
+                         f"total_distance = {path.total_distance}\ttotal_time = {path.total_time}\n\n")
+        count += 1
+    return count
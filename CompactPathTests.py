@@ -0,0 +1,98 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from CompactPathFile import CompactPath, write_path_descriptions
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
+
+
+class CompactPathTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        folder = tempfile.TemporaryDirectory()  # (where test_3's precomputed modes save their tables.)
+        self.addCleanup(folder.cleanup)
+        for name in ("City Data with coords.txt", "connections.txt"):
+            shutil.copy(name, folder.name)
+        self.engine = RoutingEngine(os.path.join(folder.name, "City Data with coords.txt"),
+                                    os.path.join(folder.name, "connections.txt"))
+        self.pairs = [(53, 79), (28, 81), (95, 4), (21, 93), (1, 4), (49, 89)]
+
+    def search(self, first, second, metric=SearchMetric.DISTANCE):
+        self.engine.first_city_id = first
+        self.engine.second_city_id = second
+        return self.engine.perform_search(metric, SearchMode.DIJKSTRA)
+
+    def test_0_round_trip(self):
+        for first, second in self.pairs:
+            for metric in SearchMetric:
+                path = self.search(first, second, metric)
+                compact = CompactPath.from_edges(self.engine, path)
+                self.assertEqual(path, compact.to_edges(), "Converting back should give the same list.")
+                self.assertEqual(path, list(compact), "Iterating should give the same edges.")
+                self.assertEqual(path[-1], compact[-1], "Indexing should give the same edges.")
+                self.assertEqual(len(path) + 1, len(compact.cities), "There should be one more city than edges.")
+                self.assertEqual((first, second), (compact.start, compact.goal), "The path runs the wrong way.")
+                self.assertAlmostEqual(sum(edge[2] for edge in path), compact.total_distance, msg="Wrong distance.")
+                self.assertAlmostEqual(sum(edge[3] for edge in path), compact.total_time, msg="Wrong time.")
+
+                _, arrived_by = self.engine.shortest_path_tree(first, metric)
+                traced = self.engine.trace_compact_path(arrived_by, first, second)
+                self.assertEqual(self.engine.trace_path(arrived_by, first, second), traced.to_edges(),
+                                 "Tracing a compact path should give the same edges as trace_path().")
+
+    def test_1_describe(self):
+        for first, second in self.pairs:
+            path = self.search(first, second)
+            self.assertEqual(self.engine.describe_path(path),
+                             self.engine.describe_path(CompactPath.from_edges(self.engine, path)),
+                             f"The descriptions from {first} to {second} differ.")
+        empty = CompactPath.from_edges(self.engine, [], start=3)
+        self.assertEqual("No path found.", self.engine.describe_path(empty), "An empty path is no path.")
+        self.assertIsNone(CompactPath.from_edges(self.engine, None), "No path converts to no path.")
+        with self.assertRaises(ValueError):
+            CompactPath.from_edges(self.engine, [(0, 1, 1.0, 1.0), (1, 2, 1.0, 1.0)], start=0)
+
+    def test_2_bulk_describe(self):
+        paths = []
+        for first, second in self.pairs:
+            path = self.search(first, second)
+            paths.append(path)
+            paths.append(CompactPath.from_edges(self.engine, path))
+        paths.append(None)
+        expected = [self.engine.describe_path(path) + "\n\n" for path in paths]
+        output = io.StringIO()
+        self.assertEqual(len(paths), write_path_descriptions(self.engine, iter(paths), output), "Wrong count.")
+        self.assertEqual("".join(expected), output.getvalue(), "Bulk descriptions should match describe_path().")
+
+    def test_3_compact_searches(self):
+        modes = list(SearchMode)
+        for first, second in self.pairs:
+            self.engine.first_city_id = first
+            self.engine.second_city_id = second
+            for mode in modes:
+                path = self.engine.perform_search(SearchMetric.TIME, mode)
+                compact = self.engine.perform_search(SearchMetric.TIME, mode, compact=True)
+                self.assertIsInstance(compact, CompactPath, f"{mode.name}: expected a CompactPath.")
+                self.assertEqual(path, compact.to_edges(), f"{mode.name}: the compact path should be the same path.")
+                self.assertEqual((first, second), (compact.start, compact.goal), f"{mode.name}: runs the wrong way.")
+
+        # add a connection identical to the first one on the path, and close the original: the searches must say
+        # they used the new one, even though the two look the same.
+        self.engine.first_city_id, self.engine.second_city_id = self.pairs[0]
+        original_id = self.engine.perform_search(SearchMetric.TIME, compact=True).edge_ids[0]
+        edge = self.engine.edges[original_id]
+        self.engine.edges.append((edge[0], edge[1], edge[2], edge[3]))
+        duplicate_id = len(self.engine.edges) - 1
+        self.engine.build_adjacency_index()
+        self.engine.close_edge(original_id)
+        for mode in modes:
+            compact = self.engine.perform_search(SearchMetric.TIME, mode, compact=True)
+            self.assertEqual(duplicate_id, compact.edge_ids[0], f"{mode.name}: the closed connection was reported.")
+            path = self.engine.perform_search(SearchMetric.TIME, mode)
+            self.assertEqual(compact, CompactPath.from_edges(self.engine, path),
+                             f"{mode.name}: converting the list should find the connection it holds.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,342 @@
+from typing import Dict, List, Optional, Tuple
+import heapq
+import json
+import math
+import os
+import random
+import time
+
+from RoutingEngineFile import RoutingEngine, Edge_Data, SearchMetric
+
+# (cost, edge_id, middle_city_id): an arc of the hierarchy is either an original connection (edge_id is its index in
+# the edge list and middle is -1) or a shortcut standing for the two arcs through a contracted city (edge_id is -1).
+Arc_Data = Tuple[float, int, int]
+
+FORMAT_VERSION = 2  # (version 1 hierarchies could include closed connections, so they are rebuilt.)
+
+
+class ContractionHierarchy:
+    """
+    A contraction hierarchy for one metric: every city gets a rank, and "shortcut" arcs are added so that every
+    shortest path can be found by searching only *upward* in rank from both ends. Queries then settle a small fraction
+    of the cities a plain Dijkstra search would, at the price of a one-time preprocessing step (build()), whose result
+    can be saved to disk.
+    """
+
+    def __init__(self, edges: List[Edge_Data], metric: SearchMetric, fingerprint: str, rank: List[int],
+                 arcs: Dict[Tuple[int, int], Arc_Data]):
+        """
+        :param edges: the edge list the hierarchy was built from. (Arcs refer to edges by their index in this list.)
+        :param metric: what the arc costs measure
+        :param fingerprint: RoutingEngine.data_fingerprint() of the data the hierarchy was built from
+        :param rank: city id -> the order in which that city was contracted
+        :param arcs: (lower city id, higher city id) -> Arc_Data, for every original connection and shortcut.
+        """
+        self.edges = edges
+        self.metric = metric
+        self.fingerprint = fingerprint
+        self.rank = rank
+        self.arcs = arcs
+
+        # city id -> list of (neighbor, cost) for the arcs that lead to a higher-ranked city. Since the connections are
+        # undirected, the forward and backward searches of a query both use this one list.
+        self.upward: List[List[Tuple[int, float]]] = [[] for _ in rank]
+        for (city1, city2), (cost, _, _) in arcs.items():
+            if rank[city1] < rank[city2]:
+                self.upward[city1].append((city2, cost))
+            else:
+                self.upward[city2].append((city1, cost))
+
+        # how many cities the most recent call to find_path() settled, counting both directions.
+        self.cities_settled = 0
+
+    # ============================================================================ PREPROCESSING
+    @classmethod
+    def build(cls, engine: RoutingEngine, metric: SearchMetric = SearchMetric.DISTANCE,
+              witness_settle_limit: int = 200) -> "ContractionHierarchy":
+        """
+        contracts the cities of the engine's graph one at a time, cheapest first (by "edge difference": shortcuts
+        added minus arcs removed, plus the number of neighbors already contracted, to keep the order spread out).
+        :param engine: the engine whose graph to use
+        :param metric: whether the hierarchy is for distance or time
+        :param witness_settle_limit: how many cities a witness search may settle before giving up and adding the
+        shortcut anyway. Smaller is faster to build but may add unnecessary shortcuts; it never affects correctness.
+        :return: the new hierarchy
+        """
+        num_cities = len(engine.neighbor_offsets) - 1
+        arcs: Dict[Tuple[int, int], Arc_Data] = {}
+        remaining: List[Dict[int, float]] = [{} for _ in range(num_cities)]  # the not-yet-contracted graph
+        for edge_id, edge in enumerate(engine.edges):
+            city1, city2, cost = edge[0], edge[1], engine.edge_cost(edge_id, metric)
+            if city1 == city2 or math.isinf(cost):
+                continue  # a loop is never part of a shortest path, and a closed connection is never part of any.
+            key = (min(city1, city2), max(city1, city2))
+            if key not in arcs or cost < arcs[key][0]:
+                arcs[key] = (cost, edge_id, -1)
+                remaining[city1][city2] = cost
+                remaining[city2][city1] = cost
+
+        contracted_neighbors = [0] * num_cities
+        rank = [0] * num_cities
+
+        def priority(shortcuts: list, city: int) -> int:
+            return len(shortcuts) - len(remaining[city]) + contracted_neighbors[city]
+
+        queue = []
+        for city in range(num_cities):
+            queue.append((priority(cls._shortcuts_needed(remaining, city, witness_settle_limit), city), city))
+        heapq.heapify(queue)
+
+        next_rank = 0
+        while queue:
+            _, city = heapq.heappop(queue)
+            # priorities go stale as neighbors are contracted, so check this one again before committing to it.
+            shortcuts = cls._shortcuts_needed(remaining, city, witness_settle_limit)
+            current = priority(shortcuts, city)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, city))
+                continue
+
+            for city1, city2, cost in shortcuts:
+                key = (min(city1, city2), max(city1, city2))
+                if key not in arcs or cost < arcs[key][0]:
+                    arcs[key] = (cost, -1, city)
+                    remaining[city1][city2] = cost
+                    remaining[city2][city1] = cost
+            for neighbor in remaining[city]:
+                del remaining[neighbor][city]
+                contracted_neighbors[neighbor] += 1
+            remaining[city] = {}
+            rank[city] = next_rank
+            next_rank += 1
+
+        return cls(engine.edges, metric, engine.data_fingerprint(), rank, arcs)
+
+    @staticmethod
+    def _shortcuts_needed(remaining: List[Dict[int, float]], city: int,
+                          witness_settle_limit: int) -> List[Tuple[int, int, float]]:
+        """
+        works out which shortcuts contracting the given city would require: one for each pair of its neighbors whose
+        cheapest connection runs through it.
+        :return: a list of (neighbor1, neighbor2, cost) for the shortcuts.
+        """
+        neighbors = list(remaining[city].items())
+        shortcuts = []
+        for position, (city1, cost1) in enumerate(neighbors[:-1]):
+            others = neighbors[position + 1:]
+            limit = cost1 + max(cost2 for _, cost2 in others)
+            witness = ContractionHierarchy._witness_search(remaining, city1, city, limit, witness_settle_limit)
+            for city2, cost2 in others:
+                if witness.get(city2, math.inf) > cost1 + cost2:
+                    shortcuts.append((city1, city2, cost1 + cost2))
+        return shortcuts
+
+    @staticmethod
+    def _witness_search(remaining: List[Dict[int, float]], source: int, avoid: int, limit: float,
+                        settle_limit: int) -> Dict[int, float]:
+        """
+        a small Dijkstra search in the not-yet-contracted graph that skips the city being contracted, to find out
+        whether its neighbors have some other path between them that is at least as cheap.
+        :return: city id -> best cost found from source (not necessarily final, if the search was cut off).
+        """
+        best_cost = {source: 0.0}
+        finished = set()
+        frontier = [(0.0, source)]
+        while frontier and len(finished) < settle_limit:
+            cost, city = heapq.heappop(frontier)
+            if city in finished:
+                continue
+            if cost > limit:
+                break
+            finished.add(city)
+            for neighbor, step in remaining[city].items():
+                new_cost = cost + step
+                if neighbor != avoid and new_cost < best_cost.get(neighbor, math.inf):
+                    best_cost[neighbor] = new_cost
+                    heapq.heappush(frontier, (new_cost, neighbor))
+        return best_cost
+    # =========================================================================================
+
+    # ============================================================================ SAVING & LOADING
+    @staticmethod
+    def default_cache_path(engine: RoutingEngine, metric: SearchMetric) -> str:
+        """
+        :return: where to keep the hierarchy for this engine and metric - in the same folder as the connection file.
+        """
+        return os.path.join(os.path.dirname(os.path.abspath(engine.connection_file_path)),
+                            f"contraction_hierarchy_{metric.name.lower()}.json")
+
+    def save(self, path: str):
+        """
+        writes the hierarchy to disk, replacing any older copy in one step.
+        :param path: the file to write
+        :return: None
+        """
+        contents = {"version": FORMAT_VERSION,
+                    "fingerprint": self.fingerprint,
+                    "metric": self.metric.name,
+                    "rank": self.rank,
+                    "arcs": [[city1, city2, cost, edge_id, middle]
+                             for (city1, city2), (cost, edge_id, middle) in self.arcs.items()]}
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as hierarchy_file:
+            json.dump(contents, hierarchy_file)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, engine: RoutingEngine, path: str,
+             metric: SearchMetric = SearchMetric.DISTANCE) -> Optional["ContractionHierarchy"]:
+        """
+        reads a hierarchy saved by save(), as long as it was built from the data the engine has loaded now.
+        :return: the hierarchy, or None if the file is missing, unreadable, for another metric or out of date.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as hierarchy_file:
+                contents = json.load(hierarchy_file)
+            if contents.get("version") != FORMAT_VERSION or contents["fingerprint"] != engine.data_fingerprint() or \
+                    contents["metric"] != metric.name:
+                return None
+            arcs = {(int(city1), int(city2)): (float(cost), int(edge_id), int(middle))
+                    for city1, city2, cost, edge_id, middle in contents["arcs"]}
+            rank = [int(r) for r in contents["rank"]]
+        except (OSError, KeyError, ValueError, TypeError) as err:
+            print(f"Couldn't read the contraction hierarchy, so it will be rebuilt: {err}")
+            return None
+        return cls(engine.edges, metric, contents["fingerprint"], rank, arcs)
+
+    @classmethod
+    def load_or_build(cls, engine: RoutingEngine, metric: SearchMetric = SearchMetric.DISTANCE,
+                      path: Optional[str] = None) -> "ContractionHierarchy":
+        """
+        loads the saved hierarchy for this engine's data and metric, or builds (and saves) a fresh one.
+        """
+        if path is None:
+            path = cls.default_cache_path(engine, metric)
+        hierarchy = cls.load(engine, path, metric)
+        if hierarchy is None:
+            hierarchy = cls.build(engine, metric)
+            try:
+                hierarchy.save(path)
+            except OSError as osErr:
+                print(f"Couldn't save the contraction hierarchy: {osErr}")
+        return hierarchy
+    # =========================================================================================
+
+    # ============================================================================ QUERIES
+    def find_path(self, first_city_id: int, second_city_id: int) -> Optional[List[Edge_Data]]:
+        """
+        finds the cheapest path between two cities with a bidirectional search that only follows upward arcs, then
+        unpacks the shortcuts on it back into original connections.
+        The number of cities settled is left in self.cities_settled.
+        :return: the edges from first_city_id to second_city_id in travel order, or None if there is no path.
+        """
+        self.cities_settled = 0
+        num_cities = len(self.rank)
+        if not (0 <= first_city_id < num_cities and 0 <= second_city_id < num_cities):
+            return None
+        if first_city_id == second_city_id:
+            return []
+
+        # index 0 is the search from the first city, index 1 the search from the second.
+        best_cost = ({first_city_id: 0.0}, {second_city_id: 0.0})
+        came_from = ({first_city_id: -1}, {second_city_id: -1})
+        finished = (set(), set())
+        frontiers = ([(0.0, first_city_id)], [(0.0, second_city_id)])
+        shortest = math.inf
+        meeting_city = -1
+        while True:
+            # a side is done once nothing left on its frontier could lead to something cheaper than we already have.
+            active = [side for side in (0, 1) if frontiers[side] and frontiers[side][0][0] < shortest]
+            if not active:
+                break
+            side = min(active, key=lambda s: frontiers[s][0][0])
+            cost, city = heapq.heappop(frontiers[side])
+            if city in finished[side]:
+                continue
+            finished[side].add(city)
+            self.cities_settled += 1
+
+            other_cost = best_cost[1 - side].get(city)
+            if other_cost is not None and cost + other_cost < shortest:
+                shortest = cost + other_cost
+                meeting_city = city
+            for neighbor, step in self.upward[city]:
+                new_cost = cost + step
+                if new_cost < best_cost[side].get(neighbor, math.inf):
+                    best_cost[side][neighbor] = new_cost
+                    came_from[side][neighbor] = city
+                    heapq.heappush(frontiers[side], (new_cost, neighbor))
+
+        if meeting_city < 0:
+            return None
+
+        # the chain of hierarchy cities: first city ... meeting city ... second city.
+        cities = [meeting_city]
+        while came_from[0][cities[-1]] >= 0:
+            cities.append(came_from[0][cities[-1]])
+        cities.reverse()
+        while came_from[1][cities[-1]] >= 0:
+            cities.append(came_from[1][cities[-1]])
+
+        result_path: List[Edge_Data] = []
+        for city1, city2 in zip(cities, cities[1:]):
+            self._unpack(city1, city2, result_path)
+        return result_path
+
+    def _unpack(self, city1: int, city2: int, result_path: List[Edge_Data]):
+        """
+        appends the original connections that the arc from city1 to city2 stands for, in travel order.
+        """
+        pending = [(city1, city2)]
+        while pending:
+            here, there = pending.pop()
+            _, edge_id, middle = self.arcs[(min(here, there), max(here, there))]
+            if middle < 0:
+                result_path.append(self.edges[edge_id])
+            else:
+                # the second half goes on the stack first, so the first half gets unpacked (and appended) first.
+                pending.append((middle, there))
+                pending.append((here, middle))
+    # =========================================================================================
+
+
+def print_comparison(engine: RoutingEngine, metric: SearchMetric = SearchMetric.DISTANCE, num_queries: int = 200,
+                     seed: int = 0):
+    """
+    builds a hierarchy for the engine's graph and prints how long that took, alongside the average query time and
+    number of cities settled/expanded for the hierarchy and for the plain perform_search(), over random city pairs.
+    """
+    start_time = time.perf_counter()
+    hierarchy = ContractionHierarchy.build(engine, metric)
+    print(f"Preprocessing: {time.perf_counter() - start_time:.3f} s, "
+          f"{sum(1 for arc in hierarchy.arcs.values() if arc[2] >= 0)} shortcuts added to {len(engine.edges)} edges.")
+
+    generator = random.Random(seed)
+    num_cities = len(hierarchy.rank)
+    pairs = [(generator.randrange(num_cities), generator.randrange(num_cities)) for _ in range(num_queries)]
+    baseline_time = hierarchy_time = 0.0
+    baseline_count = hierarchy_count = 0
+    for first, second in pairs:
+        engine.first_city_id = first
+        engine.second_city_id = second
+        start_time = time.perf_counter()
+        engine.perform_search(metric)
+        baseline_time += time.perf_counter() - start_time
+        baseline_count += engine.cities_expanded
+
+        start_time = time.perf_counter()
+        hierarchy.find_path(first, second)
+        hierarchy_time += time.perf_counter() - start_time
+        hierarchy_count += hierarchy.cities_settled
+    print(f"Dijkstra:               {1e6 * baseline_time / num_queries:8.1f} µs/query, "
+          f"{baseline_count / num_queries:6.1f} cities expanded on average.")
+    print(f"Contraction hierarchy:  {1e6 * hierarchy_time / num_queries:8.1f} µs/query, "
+          f"{hierarchy_count / num_queries:6.1f} cities settled on average.")
+
+
+if __name__ == '__main__':
+    for which_metric in SearchMetric:
+        print(f"----- {which_metric.name} -----")
+        print_comparison(RoutingEngine(), which_metric)
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from ContractionHierarchyFile import ContractionHierarchy
+from RoutingEngineFile import RoutingEngine, SearchMetric
+
+
+class ContractionHierarchyTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = RoutingEngine()
+
+    def test_0_matches_dijkstra(self):
+        for metric in SearchMetric:
+            hierarchy = ContractionHierarchy.build(self.engine, metric)
+            for first in range(0, 100, 7):
+                for second in range(0, 100, 3):
+                    self.engine.first_city_id = first
+                    self.engine.second_city_id = second
+                    self.assertEqual(self.engine.perform_search(metric), hierarchy.find_path(first, second),
+                                     f"Hierarchy path from {first} to {second} by {metric.name} did not match.")
+
+    def test_1_long_path_settles_fewer_cities(self):
+        edge_nums = [121, 118, 151, 156, 161, 175, 174, 189, 186, 188, 193]
+        expected_path = [self.engine.edges[num] for num in edge_nums]
+        hierarchy = ContractionHierarchy.build(self.engine)
+        self.engine.first_city_id = 21  # Miami
+        self.engine.second_city_id = 93  # Montpellier
+        self.engine.perform_search()
+        self.assertEqual(expected_path, hierarchy.find_path(21, 93), "Long path did not match expected.")
+        self.assertLess(hierarchy.cities_settled, self.engine.cities_expanded,
+                        "The hierarchy should settle fewer cities than Dijkstra.")
+
+    def test_2_save_and_load(self):
+        hierarchy = ContractionHierarchy.build(self.engine, SearchMetric.TIME)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "hierarchy.json")
+            hierarchy.save(path)
+            loaded = ContractionHierarchy.load(self.engine, path, SearchMetric.TIME)
+            self.assertIsNotNone(loaded, "A saved hierarchy should reload.")
+            self.assertEqual(hierarchy.find_path(95, 4), loaded.find_path(95, 4), "Reloaded hierarchy differs.")
+            self.assertIsNone(ContractionHierarchy.load(self.engine, path, SearchMetric.DISTANCE),
+                              "A hierarchy for another metric should be rejected.")
+            self.engine.edges = self.engine.edges[:-1]
+            self.engine.build_adjacency_index()
+            self.assertIsNone(ContractionHierarchy.load(self.engine, path, SearchMetric.TIME),
+                              "A hierarchy for old data should be rejected.")
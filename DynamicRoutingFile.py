@@ -0,0 +1,190 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import math
+import random
+import time
+
+from RoutingEngineFile import RoutingEngine, Edge_Data, SearchMetric
+
+
+class DynamicShortestPathTree:
+    """
+    The shortest paths from one city to every other, kept up to date as connections change (see
+    RoutingEngine.update_edge(), close_edge() and reopen_edge()). After a change, repair() only redoes the part of the
+    tree the change can affect, instead of searching the whole map again:
+      * a connection that got more expensive (or closed) only matters if the tree uses it; then every city below it
+        in the tree loses its path, and is re-attached from the cities around it that still have one;
+      * a connection that got cheaper only matters if it now gives a shorter way to one of its ends; then the
+        improvement is spread outward from there.
+    Both happen in one Dijkstra-style pass over just the affected cities, however many connections changed at once.
+    """
+
+    def __init__(self, engine: RoutingEngine, source: int, metric: SearchMetric = SearchMetric.DISTANCE):
+        """
+        :param engine: the engine whose connections this tree follows
+        :param source: the city all the paths start from
+        :param metric: whether the paths are shortest by distance or by time
+        """
+        self.engine = engine
+        self.source = source
+        self.metric = metric
+        self.cost: Dict[int, float] = {}  # city id -> cost of its shortest path (unreachable cities are left out)
+        self.arrived_by: Dict[int, int] = {}  # city id -> index of the last edge on that path (-1 for the source)
+        self.parent: Dict[int, int] = {}  # city id -> the city before it on that path
+        self.children: Dict[int, Set[int]] = {}  # city id -> the cities whose paths run through it last
+        self.cities_touched = 0  # how many cities the most recent repair() (or rebuild()) had to look at
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        recomputes the whole tree from scratch.
+        :return: None
+        """
+        self.cost, self.arrived_by = self.engine.shortest_path_tree(self.source, self.metric)
+        self.parent = {}
+        self.children = {}
+        for city, edge_id in self.arrived_by.items():
+            if edge_id >= 0:
+                edge = self.engine.edges[edge_id]
+                self._attach(city, edge[0] if edge[1] == city else edge[1])
+        self.cities_touched = len(self.cost)
+
+    def path_to(self, city: int) -> Optional[List[Edge_Data]]:
+        """
+        :return: the shortest path from the source to the given city, in travel order, or None if it can't be reached.
+        """
+        if city not in self.cost:
+            return None
+        return self.engine.trace_path(self.arrived_by, self.source, city)
+
+    def repair(self, changed_edge_ids: Iterable[int]):
+        """
+        brings the tree up to date after the given connections changed (in any way - cheaper, more expensive, closed
+        or reopened). Connections that did not change needn't be listed.
+        :param changed_edge_ids: indices (in engine.edges) of the connections that changed
+        :return: None
+        """
+        engine = self.engine
+        changed = [edge_id for edge_id in set(changed_edge_ids) if engine.edges[edge_id][0] != engine.edges[edge_id][1]]
+
+        # 1. find the tree edges that got more expensive; everything below them has to find a new path.
+        lost_roots = []
+        for edge_id in changed:
+            city1, city2 = engine.edges[edge_id][0], engine.edges[edge_id][1]
+            weight = engine.edge_cost(edge_id, self.metric)
+            for here, there in ((city1, city2), (city2, city1)):
+                if self.arrived_by.get(there) == edge_id and self.parent.get(there) == here \
+                        and self.cost[here] + weight > self.cost[there]:
+                    lost_roots.append(there)
+        lost = set()
+        pending = list(lost_roots)
+        while pending:
+            city = pending.pop()
+            if city not in lost:
+                lost.add(city)
+                pending.extend(self.children.get(city, ()))
+        for city in lost:
+            self._detach(city)
+        for city in lost:
+            del self.cost[city]
+            del self.arrived_by[city]
+            self.children.pop(city, None)
+
+        # 2. collect every way a city might now get a cheaper path: lost cities from their neighbors that still have
+        #    paths, and the far end of every changed connection from the near end.
+        offsets = engine.neighbor_offsets
+        neighbor_cities = engine.neighbor_cities
+        neighbor_edge_ids = engine.neighbor_edge_ids
+        neighbor_costs = engine.neighbor_distances if self.metric == SearchMetric.DISTANCE else engine.neighbor_times
+        frontier: List[Tuple[float, int, int, int]] = []  # (cost, city, edge index, previous city)
+        for city in lost:
+            for slot in range(offsets[city], offsets[city + 1]):
+                neighbor = neighbor_cities[slot]
+                if neighbor in self.cost and self.cost[neighbor] + neighbor_costs[slot] < math.inf:
+                    frontier.append((self.cost[neighbor] + neighbor_costs[slot], city, neighbor_edge_ids[slot],
+                                     neighbor))
+        for edge_id in changed:
+            city1, city2 = engine.edges[edge_id][0], engine.edges[edge_id][1]
+            weight = engine.edge_cost(edge_id, self.metric)
+            for here, there in ((city1, city2), (city2, city1)):
+                if here in self.cost and self.cost[here] + weight < self.cost.get(there, math.inf):
+                    frontier.append((self.cost[here] + weight, there, edge_id, here))
+        heapq.heapify(frontier)
+
+        # 3. spread the improvements outward, cheapest first.
+        touched = len(lost)
+        while frontier:
+            cost, city, edge_id, previous = heapq.heappop(frontier)
+            if cost >= self.cost.get(city, math.inf):
+                continue
+            touched += 1
+            self.cost[city] = cost
+            self.arrived_by[city] = edge_id
+            self._detach(city)
+            self._attach(city, previous)
+            for slot in range(offsets[city], offsets[city + 1]):
+                neighbor = neighbor_cities[slot]
+                new_cost = cost + neighbor_costs[slot]
+                if new_cost < self.cost.get(neighbor, math.inf):
+                    heapq.heappush(frontier, (new_cost, neighbor, neighbor_edge_ids[slot], city))
+        self.cities_touched = touched
+
+    def _attach(self, city: int, parent: int):
+        self.parent[city] = parent
+        self.children.setdefault(parent, set()).add(city)
+
+    def _detach(self, city: int):
+        parent = self.parent.pop(city, None)
+        if parent is not None:
+            self.children[parent].discard(city)
+
+
+def run_benchmark(engine: RoutingEngine, batch_sizes: Tuple[int, ...] = (1, 10, 50), rounds: int = 200,
+                  metric: SearchMetric = SearchMetric.TIME, seed: int = 0):
+    """
+    prints how long repair() takes next to a full rebuild, for random batches of changes (slowdowns, speedups,
+    closures and reopenings) to a tree from a random city, and checks that the two agree.
+    """
+    generator = random.Random(seed)
+    num_cities = len(engine.neighbor_offsets) - 1
+    original_edges = list(engine.edges)
+    print(f"{'changes':>8} {'repair (µs)':>12} {'rebuild (µs)':>13} {'cities touched':>15} {'of':>5}")
+    for batch_size in batch_sizes:
+        tree = DynamicShortestPathTree(engine, generator.randrange(num_cities), metric)
+        repair_time = rebuild_time = 0.0
+        touched = 0
+        for _ in range(rounds):
+            changed = generator.sample(range(len(engine.edges)), batch_size)
+            for edge_id in changed:
+                roll = generator.random()
+                if edge_id in engine.closed_edges:
+                    engine.reopen_edge(edge_id)
+                elif roll < 0.1:
+                    engine.close_edge(edge_id)
+                else:
+                    factor = generator.uniform(0.5, 2.0)
+                    original = original_edges[edge_id]
+                    engine.update_edge(edge_id, original[2] * factor, original[3] * factor)
+
+            start_time = time.perf_counter()
+            tree.repair(changed)
+            repair_time += time.perf_counter() - start_time
+            touched += tree.cities_touched
+
+            start_time = time.perf_counter()
+            fresh_cost, _ = engine.shortest_path_tree(tree.source, metric)
+            rebuild_time += time.perf_counter() - start_time
+            if any(not math.isclose(fresh_cost[city], tree.cost.get(city, math.inf)) for city in fresh_cost) \
+                    or len(fresh_cost) != len(tree.cost):
+                raise AssertionError("The repaired tree does not match a fresh one.")
+        print(f"{batch_size:>8} {1e6 * repair_time / rounds:>12.1f} {1e6 * rebuild_time / rounds:>13.1f} "
+              f"{touched / rounds:>15.1f} {num_cities:>5}")
+
+    for edge_id in list(engine.closed_edges):
+        engine.reopen_edge(edge_id)
+    for edge_id, edge in enumerate(original_edges):
+        engine.update_edge(edge_id, edge[2], edge[3])
+
+
+if __name__ == '__main__':
+    run_benchmark(RoutingEngine())
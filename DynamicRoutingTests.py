@@ -0,0 +1,89 @@
+import math
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from ContractionHierarchyFile import ContractionHierarchy
+from DynamicRoutingFile import DynamicShortestPathTree
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
+
+
+class DynamicRoutingTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # work on a private copy of the data, so test_2's precomputed modes keep their tables in a temporary folder.
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        for name in ("City Data with coords.txt", "connections.txt"):
+            shutil.copy(name, folder.name)
+        self.engine = RoutingEngine(os.path.join(folder.name, "City Data with coords.txt"),
+                                    os.path.join(folder.name, "connections.txt"))
+
+    def assert_matches_fresh_tree(self, tree: DynamicShortestPathTree, message: str):
+        fresh_cost, _ = self.engine.shortest_path_tree(tree.source, tree.metric)
+        self.assertEqual(set(fresh_cost), set(tree.cost), f"{message}: the same cities should be reachable.")
+        for city, cost in fresh_cost.items():
+            self.assertTrue(math.isclose(cost, tree.cost[city]), f"{message}: wrong cost to city {city}.")
+            path = tree.path_to(city)
+            self.assertTrue(math.isclose(cost, sum(self.engine.edge_cost(self.engine.edges.index(edge), tree.metric)
+                                                   for edge in path)),
+                            f"{message}: the path to city {city} should add up to its cost.")
+
+    def test_0_random_changes(self):
+        generator = random.Random(13)
+        for metric in SearchMetric:
+            tree = DynamicShortestPathTree(self.engine, 21, metric)
+            for round_number in range(40):
+                changed = generator.sample(range(len(self.engine.edges)), generator.choice((1, 5, 20)))
+                for edge_id in changed:
+                    if edge_id in self.engine.closed_edges:
+                        self.engine.reopen_edge(edge_id)
+                    elif generator.random() < 0.15:
+                        self.engine.close_edge(edge_id)
+                    else:
+                        edge = self.engine.edges[edge_id]
+                        self.engine.update_edge(edge_id, edge[2] * generator.uniform(0.5, 2.0),
+                                                edge[3] * generator.uniform(0.5, 2.0))
+                tree.repair(changed)
+                self.assert_matches_fresh_tree(tree, f"{metric.name}, round {round_number}")
+
+    def test_1_close_and_reopen(self):
+        self.engine.first_city_id = 21
+        self.engine.second_city_id = 93
+        original_path = self.engine.perform_search()
+        tree = DynamicShortestPathTree(self.engine, 21)
+        self.assertEqual(original_path, tree.path_to(93), "A new tree should match perform_search().")
+
+        closed_id = self.engine.edges.index(original_path[len(original_path) // 2])
+        self.engine.close_edge(closed_id)
+        tree.repair([closed_id])
+        detour = tree.path_to(93)
+        self.assertNotIn(self.engine.edges[closed_id], detour, "The path should avoid the closed connection.")
+        self.assertEqual(self.engine.perform_search(), detour, "The detour should match a fresh search.")
+
+        self.engine.reopen_edge(closed_id)
+        tree.repair([closed_id])
+        self.assertEqual(original_path, tree.path_to(93), "Reopening should bring the original path back.")
+        self.assertEqual(original_path, self.engine.perform_search(), "Searches should use the reopened connection.")
+
+    def test_2_precomputed_modes_avoid_closed_edges(self):
+        for metric in SearchMetric:
+            self.engine.first_city_id = 21
+            self.engine.second_city_id = 93
+            original_path = self.engine.perform_search(metric)
+            closed_id = self.engine.edges.index(original_path[len(original_path) // 2])
+            self.engine.close_edge(closed_id)
+            detour = self.engine.perform_search(metric)
+            self.assertNotIn(self.engine.edges[closed_id], detour, "Dijkstra should avoid the closed connection.")
+            for mode in (SearchMode.ALL_PAIRS_TABLE, SearchMode.LANDMARKS):
+                self.assertEqual(detour, self.engine.perform_search(metric, mode),
+                                 f"{mode.name} by {metric.name} should avoid the closed connection.")
+            hierarchy = ContractionHierarchy.build(self.engine, metric)
+            self.assertEqual(detour, hierarchy.find_path(21, 93),
+                             f"The contraction hierarchy by {metric.name} should avoid the closed connection.")
+            self.engine.reopen_edge(closed_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
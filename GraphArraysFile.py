@@ -0,0 +1,163 @@
+from collections.abc import Sequence
+from typing import List, Tuple
+
+import numpy
+
+
+class StringTable(Sequence):
+    """
+    A list of strings stored as one block of UTF-8 bytes plus an array of where each string starts, so that thousands
+    of city names cost two arrays rather than thousands of Python objects.
+    """
+
+    def __init__(self, blob: numpy.ndarray, offsets: numpy.ndarray):
+        """
+        :param blob: uint8 array holding every string's bytes, one after the other
+        :param offsets: int64 array of len(strings) + 1 positions; string i is blob[offsets[i]:offsets[i + 1]].
+        """
+        self.blob = blob
+        self.offsets = offsets
+
+    @staticmethod
+    def pack(strings: List[str]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        :param strings: the strings to store
+        :return: the (blob, offsets) arrays for a StringTable holding them.
+        """
+        encoded = [text.encode("utf-8") for text in strings]
+        offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+        offsets[1:] = numpy.cumsum([len(data) for data in encoded])
+        blob = numpy.frombuffer(b"".join(encoded), dtype=numpy.uint8).copy()
+        return blob, offsets
+
+    @property
+    def nbytes(self) -> int:
+        return self.blob.nbytes + self.offsets.nbytes
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string table index out of range")
+        return bytes(self.blob[self.offsets[index]:self.offsets[index + 1]]).decode("utf-8")
+
+
+class CityTable(Sequence):
+    """
+    A read-only, list-like view of the cities, backed by one array per field. Each item comes out as the same
+    City_Data tuple (id, name, state, x, y) that RoutingEngine.vertices holds when it is loaded from text, so code that
+    indexes into vertices works unchanged.
+    """
+
+    def __init__(self, ids: numpy.ndarray, names: StringTable, states: StringTable, xs: numpy.ndarray,
+                 ys: numpy.ndarray):
+        self.ids = ids
+        self.names = names
+        self.states = states
+        self.xs = xs
+        self.ys = ys
+
+    @classmethod
+    def from_rows(cls, vertices: List[tuple]) -> "CityTable":
+        """
+        :param vertices: a list of City_Data tuples, as RoutingEngine.load_city_data() reads them
+        :return: a table holding the same cities, in arrays.
+        """
+        return cls(numpy.array([city[0] for city in vertices], dtype=numpy.int64),
+                   StringTable(*StringTable.pack([city[1] for city in vertices])),
+                   StringTable(*StringTable.pack([city[2] for city in vertices])),
+                   numpy.array([city[3] for city in vertices], dtype=numpy.int32),
+                   numpy.array([city[4] for city in vertices], dtype=numpy.int32))
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.names.nbytes + self.states.nbytes + self.xs.nbytes + self.ys.nbytes
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("city index out of range")
+        return int(self.ids[index]), self.names[index], self.states[index], int(self.xs[index]), int(self.ys[index])
+
+    def __iter__(self):
+        for index, city_id, x, y in zip(range(len(self)), self.ids.tolist(), self.xs.tolist(), self.ys.tolist()):
+            yield city_id, self.names[index], self.states[index], x, y
+
+
+class EdgeTable(Sequence):
+    """
+    A list-like view of the connections, backed by an N x 2 array of endpoints and one array each for distance and
+    time. Items come out as Edge_Data tuples (city1, city2, distance, time). Items can be replaced (as update_edge()
+    does) as long as the arrays are writable, which memory-mapped ones are not - see writeable and copy().
+    """
+
+    def __init__(self, endpoints: numpy.ndarray, distances: numpy.ndarray, times: numpy.ndarray):
+        self.endpoints = endpoints
+        self.distances = distances
+        self.times = times
+
+    @classmethod
+    def from_rows(cls, edges: List[tuple]) -> "EdgeTable":
+        """
+        :param edges: a list of Edge_Data tuples, as RoutingEngine.load_connection_data() reads them
+        :return: a table holding the same connections, in new (so writable) arrays.
+        """
+        return cls(numpy.array([(edge[0], edge[1]) for edge in edges], dtype=numpy.int64).reshape(-1, 2),
+                   numpy.array([edge[2] for edge in edges], dtype=numpy.float64),
+                   numpy.array([edge[3] for edge in edges], dtype=numpy.float64))
+
+    def copy(self) -> "EdgeTable":
+        """
+        :return: a table with private, writable copies of the arrays (of a memory-mapped table, say).
+        """
+        return EdgeTable(numpy.array(self.endpoints), numpy.array(self.distances), numpy.array(self.times))
+
+    @property
+    def nbytes(self) -> int:
+        return self.endpoints.nbytes + self.distances.nbytes + self.times.nbytes
+
+    @property
+    def writeable(self) -> bool:
+        """
+        whether the connections can be changed in place - False for arrays memory-mapped read-only.
+        """
+        return all(values.flags.writeable for values in (self.endpoints, self.distances, self.times))
+
+    def __len__(self) -> int:
+        return len(self.distances)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("edge index out of range")
+        return (int(self.endpoints[index, 0]), int(self.endpoints[index, 1]), float(self.distances[index]),
+                float(self.times[index]))
+
+    def __setitem__(self, index: int, edge: tuple):
+        if not self.writeable:
+            raise TypeError("this edge table is read-only; change a copy() of it instead")
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("edge index out of range")
+        self.endpoints[index] = (edge[0], edge[1])
+        self.distances[index] = edge[2]
+        self.times[index] = edge[3]
+
+    def __iter__(self):
+        return zip(self.endpoints[:, 0].tolist(), self.endpoints[:, 1].tolist(), self.distances.tolist(),
+                   self.times.tolist())
@@ -0,0 +1,69 @@
+import unittest
+import numpy
+from DynamicRoutingFile import DynamicShortestPathTree
+from GraphArraysFile import CityTable, EdgeTable
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
+
+
+class GraphArraysTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.list_engine = RoutingEngine()
+        self.engine = RoutingEngine(array_storage=True)
+
+    def test_0_same_data_as_lists(self):
+        self.assertIsInstance(self.engine.vertices, CityTable, "The cities should be held in arrays.")
+        self.assertIsInstance(self.engine.edges, EdgeTable, "The connections should be held in arrays.")
+        self.assertEqual(self.list_engine.vertices, list(self.engine.vertices), "Cities differ from the lists.")
+        self.assertEqual(self.list_engine.edges, list(self.engine.edges), "Connections differ from the lists.")
+        self.assertEqual(self.list_engine.vertices[-1], self.engine.vertices[-1], "The last city differs.")
+        self.assertEqual(self.list_engine.edges[12:15], self.engine.edges[12:15], "Slices of edges differ.")
+        self.assertEqual(self.list_engine.data_fingerprint(), self.engine.data_fingerprint(), "Fingerprints differ.")
+        self.assertEqual(self.list_engine.heuristic_scales, self.engine.heuristic_scales, "The A* scales differ.")
+        self.assertEqual(32 * len(self.engine.edges), self.engine.edges.nbytes, "Each edge should take 32 bytes.")
+
+    def test_1_same_answers_as_lists(self):
+        for first, second in [(53, 79), (28, 81), (95, 4), (21, 93)]:
+            for target in (self.engine, self.list_engine):
+                target.first_city_id = first
+                target.second_city_id = second
+            for metric in SearchMetric:
+                for mode in (SearchMode.DIJKSTRA, SearchMode.A_STAR, SearchMode.BIDIRECTIONAL):
+                    path = self.engine.perform_search(metric, mode)
+                    self.assertEqual(self.list_engine.perform_search(metric, mode), path,
+                                     f"{mode.name} by {metric.name} differs from {first} to {second}.")
+                    self.assertEqual(self.list_engine.describe_path(path), self.engine.describe_path(path),
+                                     "Descriptions differ.")
+        for pos in [(0, 0), (600, 400), (1023, 17), (355, 512)]:
+            self.assertEqual(self.list_engine.find_closest_city(pos), self.engine.find_closest_city(pos),
+                             f"A different city is closest to {pos}.")
+
+    def test_2_live_updates_stay_in_arrays(self):
+        tree = DynamicShortestPathTree(self.engine, 17, SearchMetric.TIME)
+        for engine in (self.engine, self.list_engine):
+            engine.update_edge(40, time=1.5)
+            engine.close_edge(7)
+        tree.repair([40, 7])
+        self.assertIsInstance(self.engine.edges, EdgeTable, "An update shouldn't turn the arrays back into a list.")
+        self.assertEqual(self.list_engine.edges, list(self.engine.edges), "The updates weren't applied the same.")
+        self.assertEqual(DynamicShortestPathTree(self.list_engine, 17, SearchMetric.TIME).cost, tree.cost,
+                         "The repaired tree differs from one built from scratch.")
+
+    def test_3_read_only_tables_are_copied_before_updates(self):
+        edges = self.engine.edges
+        for values in (edges.endpoints, edges.distances, edges.times):
+            values.flags.writeable = False  # (as for a memory-mapped graph)
+        self.assertFalse(edges.writeable, "The table should know it is read-only.")
+        with self.assertRaises(TypeError):
+            edges[3] = (0, 1, 2.0, 3.0)
+        self.engine.update_edge(3, distance=2.0)
+        self.assertIsInstance(self.engine.edges, EdgeTable, "A read-only table should be copied into arrays.")
+        self.assertTrue(self.engine.edges.writeable, "The copy should be writable.")
+        self.assertEqual(2.0, self.engine.edges[3][2], "The update wasn't applied.")
+        self.assertNotEqual(2.0, edges[3][2], "The read-only table shouldn't have changed.")
+        self.assertEqual((numpy.int32, numpy.int32), (self.engine.vertices.xs.dtype, self.engine.vertices.ys.dtype),
+                         "City coordinates should be stored compactly.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy
+
+from RoutingEngineFile import RoutingEngine, SearchMetric
+
+
+def cost_field(engine: RoutingEngine, costs: Dict[int, float], metric: SearchMetric, shape: Tuple[int, int],
+               reach_pixels: float = 40.0, step: int = 2) -> numpy.ndarray:
+    """
+    estimates, for every pixel of a map, what it costs to get there: the cost of the closest city plus the straight
+    line from that city to the pixel (at the A* scale for the metric, so a lower bound). Worked out in a few
+    vectorized passes over the whole image - one batched snap_points() and some array arithmetic - rather than per
+    city.
+    :param engine: the engine whose cities the costs belong to
+    :param costs: city id -> cost, such as the first result of RoutingEngine.reachable_within()
+    :param metric: what the costs measure
+    :param shape: (height, width) of the map
+    :param reach_pixels: pixels farther than this from their closest city are left out (set to infinity), so that
+    oceans and empty land aren't shaded
+    :param step: work out one value per step x step block of pixels, which is plenty for shading and step**2 times
+    less work
+    :return: a float32 array of the given shape: the cost at each pixel, or infinity where nothing is reachable.
+    """
+    height, width = shape
+    step = max(1, int(step))
+    city_costs = numpy.full(len(engine.vertices), numpy.inf, dtype=numpy.float64)
+    if costs:
+        reached = numpy.fromiter(costs.keys(), dtype=numpy.int64, count=len(costs))
+        city_costs[reached] = numpy.fromiter(costs.values(), dtype=numpy.float64, count=len(costs))
+
+    # the centre of each block of pixels.
+    xs = numpy.arange(step / 2 - 0.5, width, step)
+    ys = numpy.arange(step / 2 - 0.5, height, step)
+    grid_x, grid_y = numpy.meshgrid(xs, ys)
+    field = numpy.full(grid_x.shape, numpy.inf, dtype=numpy.float32)
+    if len(engine.vertices) > 0 and costs:
+        closest = engine.snap_points(numpy.column_stack((grid_x.ravel(), grid_y.ravel()))).reshape(grid_x.shape)
+        if hasattr(engine.vertices, "xs"):
+            city_xs = numpy.asarray(engine.vertices.xs, dtype=numpy.float64)
+            city_ys = numpy.asarray(engine.vertices.ys, dtype=numpy.float64)
+        else:
+            city_xs = numpy.array([city[3] for city in engine.vertices], dtype=numpy.float64)
+            city_ys = numpy.array([city[4] for city in engine.vertices], dtype=numpy.float64)
+        pixels = numpy.hypot(grid_x - city_xs[closest], grid_y - city_ys[closest])
+        estimate = city_costs[closest] + engine.heuristic_scales[metric] * pixels
+        estimate[pixels > reach_pixels] = numpy.inf
+        field[:] = estimate
+
+    # back up to full size, each value filling its block.
+    return numpy.repeat(numpy.repeat(field, step, axis=0), step, axis=1)[:height, :width]
+
+
+def shade_by_cost(image: numpy.ndarray, field: numpy.ndarray, budget: float, alpha: float = 0.55,
+                  colormap: int = cv2.COLORMAP_JET) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    colors an image by a cost field in one pass: pixels that cost nothing are red, those at the budget blue, and
+    anything over budget (or unreachable) is left alone.
+    :param image: the BGR map to shade (not changed)
+    :param field: the cost at each pixel, as from cost_field(), the same height and width as image
+    :param budget: the cost at the far end of the color scale
+    :param alpha: how strongly the colors cover the map (0 - 1)
+    :param colormap: an OpenCV color map
+    :return: (the shaded copy of image, a uint8 mask that is 255 wherever it was shaded)
+    """
+    inside = numpy.isfinite(field) & (field <= budget)
+    level = numpy.zeros(field.shape, dtype=numpy.uint8)
+    if budget > 0:
+        level[inside] = (255 * (1.0 - field[inside] / budget)).astype(numpy.uint8)
+    colors = cv2.applyColorMap(level, colormap)
+    shaded = image.copy()
+    shaded[inside] = (alpha * colors[inside] + (1.0 - alpha) * image[inside]).astype(numpy.uint8)
+    return shaded, inside.astype(numpy.uint8) * 255
+
+
+def render_isochrone(engine: RoutingEngine, image: numpy.ndarray, origins, budget: float,
+                     metric: SearchMetric = SearchMetric.TIME, reach_pixels: float = 40.0, step: int = 2,
+                     costs: Optional[Dict[int, float]] = None) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    runs reachable_within() for the origins (unless the costs are given) and shades image by the result.
+    :return: (the shaded copy of image, the mask of shaded pixels), as for shade_by_cost().
+    """
+    if costs is None:
+        costs, _ = engine.reachable_within(origins, budget, metric)
+    field = cost_field(engine, costs, metric, image.shape[:2], reach_pixels, step)
+    return shade_by_cost(image, field, budget)
@@ -0,0 +1,56 @@
+import math
+import unittest
+from RoutingEngineFile import RoutingEngine, SearchMetric
+
+
+class IsochroneTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = RoutingEngine()
+
+    def test_0_matches_full_search(self):
+        for metric in SearchMetric:
+            for source in (4, 53, 95):
+                full_cost, _ = self.engine.shortest_path_tree(source, metric)
+                for budget in (0.0, sorted(full_cost.values())[10], sorted(full_cost.values())[-1] / 2, math.inf):
+                    cost, served_by = self.engine.reachable_within([source], budget, metric)
+                    expected = {city: value for city, value in full_cost.items() if value <= budget}
+                    self.assertEqual(expected, cost, f"Wrong cities within {budget} of {source} by {metric.name}.")
+                    self.assertEqual({source}, set(served_by.values()), "Everything is served by the one origin.")
+
+    def test_1_several_origins(self):
+        origins = [4, 53, 95]
+        budget = 20000
+        cost, served_by = self.engine.reachable_within(origins, budget, SearchMetric.TIME)
+        trees = {origin: self.engine.shortest_path_tree(origin, SearchMetric.TIME)[0] for origin in origins}
+        for city in range(len(self.engine.vertices)):
+            best = min(tree.get(city, math.inf) for tree in trees.values())
+            if best > budget:
+                self.assertNotIn(city, cost, f"City {city} is out of reach of every origin.")
+                continue
+            self.assertAlmostEqual(best, cost[city], msg=f"Wrong cost for city {city}.")
+            self.assertAlmostEqual(best, trees[served_by[city]][city], msg=f"City {city} served by the wrong origin.")
+        for origin in origins:
+            self.assertEqual((0.0, origin), (cost[origin], served_by[origin]), "An origin serves itself, for free.")
+        self.assertEqual(({}, {}), self.engine.reachable_within([-1, 1000], budget), "Unknown origins reach nothing.")
+
+    def test_2_cost_field(self):
+        import numpy
+        from IsochroneFile import cost_field
+        cost, _ = self.engine.reachable_within([53], 30000, SearchMetric.TIME)
+        field = cost_field(self.engine, cost, SearchMetric.TIME, (600, 1000), reach_pixels=40, step=1)
+        self.assertEqual((600, 1000), field.shape, "The field should cover the whole map.")
+        for city, value in cost.items():
+            x, y = self.engine.vertices[city][3], self.engine.vertices[city][4]
+            if 0 <= x < 1000 and 0 <= y < 600:
+                self.assertAlmostEqual(value, float(field[y, x]), delta=1e-3 * max(value, 1),
+                                       msg=f"The field should match the cost right at city {city}.")
+        unreached = [city for city in range(len(self.engine.vertices)) if city not in cost]
+        for city in unreached:
+            x, y = self.engine.vertices[city][3], self.engine.vertices[city][4]
+            if 0 <= x < 1000 and 0 <= y < 600:
+                self.assertTrue(numpy.isinf(field[y, x]), f"City {city} is out of reach, so shouldn't be shaded.")
+
+
+if __name__ == '__main__':
+    unittest.main()
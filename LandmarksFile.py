@@ -0,0 +1,254 @@
+from typing import Callable, Dict, List, Optional
+import os
+import random
+import sys
+import time
+
+import numpy
+
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
+from SearchProgressFile import SearchProgress
+
+LANDMARKS_FILENAME = "landmarks.npz"
+FORMAT_VERSION = 1  # saved with the tables; tables saved in any other layout are rebuilt rather than misread.
+DEFAULT_LANDMARK_COUNT = 8
+DEFAULT_ACTIVE_LANDMARKS = 4
+
+
+class LandmarkTables:
+    """
+    Precomputed costs from a handful of "landmark" cities to every city, for goal-directed search with the ALT
+    heuristic (A*, Landmarks, Triangle inequality). For any landmark L, the triangle inequality says the cost from a
+    city v to the goal g is at least |cost(L, g) - cost(L, v)|, so the biggest such difference over the landmarks is a
+    lower bound that - unlike the straight-line pixel distance - "knows" about detours, slow roads and gaps in the
+    network. Landmarks on the outskirts of the map work best, so they are picked farthest-first.
+
+    The tables take 8 bytes per city per landmark for each metric. They are saved next to the data files, like the
+    all-pairs tables, and reloaded as long as the data in those files has not changed.
+    """
+
+    def __init__(self, landmarks: List[int], fingerprint: str, costs: Dict[SearchMetric, numpy.ndarray],
+                 build_seconds: float = 0.0):
+        """
+        :param landmarks: the ids of the landmark cities
+        :param fingerprint: identifies the versions of the data files the tables were built from.
+        :param costs: metric -> L x V array; costs[m][i, c] is the cheapest cost between landmarks[i] and city c (inf
+        if there is no path).
+        :param build_seconds: how long building the tables took
+        """
+        self.landmarks = landmarks
+        self.fingerprint = fingerprint
+        self.costs = costs
+        self.build_seconds = build_seconds
+
+    @property
+    def nbytes(self) -> int:
+        return sum(table.nbytes for table in self.costs.values())
+
+    @property
+    def bytes_per_landmark(self) -> int:
+        return self.nbytes // max(len(self.landmarks), 1)
+
+    @staticmethod
+    def default_cache_path(engine: RoutingEngine) -> str:
+        """
+        :param engine: the engine whose tables we want to save or load
+        :return: where to keep the tables - in the same folder as the connection file.
+        """
+        return os.path.join(os.path.dirname(os.path.abspath(engine.connection_file_path)), LANDMARKS_FILENAME)
+
+    @staticmethod
+    def cost_row(engine: RoutingEngine, source: int, metric: SearchMetric) -> numpy.ndarray:
+        """
+        :return: the cost from source to every city (inf where there is no path), as one array.
+        """
+        costs, _ = engine.shortest_path_tree(source, metric)
+        row = numpy.full(len(engine.neighbor_offsets) - 1, numpy.inf)
+        row[numpy.fromiter(costs.keys(), dtype=numpy.int64, count=len(costs))] = \
+            numpy.fromiter(costs.values(), dtype=numpy.float64, count=len(costs))
+        return row
+
+    @classmethod
+    def build(cls, engine: RoutingEngine, count: int = DEFAULT_LANDMARK_COUNT,
+              progress: Optional[SearchProgress] = None) -> Optional["LandmarkTables"]:
+        """
+        picks up to count landmarks farthest-first - each one the city farthest (by distance) from all the landmarks
+        chosen so far, starting from the city farthest from city 0 - and runs one shortest-path tree per landmark and
+        metric. A city that none of the landmarks can reach at all is farther than anything, so every part of a network
+        in pieces gets a landmark of its own, once the pieces with landmarks have one each.
+        :param engine: the engine whose graph to use
+        :param count: how many landmarks to pick (fewer are picked if there are fewer cities with connections)
+        :param progress: if given, building gives up as soon as progress.cancel() is called
+        :return: the new tables, or None if building was cancelled
+        """
+        start_time = time.perf_counter()
+        num_cities = len(engine.neighbor_offsets) - 1
+        landmarks: List[int] = []
+        rows: Dict[SearchMetric, List[numpy.ndarray]] = {metric: [] for metric in SearchMetric}
+        if num_cities > 0:
+            closest = cls.cost_row(engine, 0, SearchMetric.DISTANCE)  # (just to find a first landmark)
+            while len(landmarks) < count:
+                reachable = numpy.where(numpy.isfinite(closest), closest, -1.0)
+                if reachable.max() > 0:
+                    landmark = int(reachable.argmax())
+                elif numpy.isinf(closest).any():
+                    landmark = int(numpy.isinf(closest).argmax())  # a piece of the network with no landmark yet
+                else:
+                    break  # every city is a landmark, or has no connections.
+                landmarks.append(landmark)
+                for metric in SearchMetric:
+                    if progress is not None and progress.cancelled:
+                        return None
+                    rows[metric].append(cls.cost_row(engine, landmark, metric))
+                distances = rows[SearchMetric.DISTANCE][-1]
+                closest = distances if len(landmarks) == 1 else numpy.minimum(closest, distances)
+                closest[landmark] = 0.0
+
+        costs = {metric: numpy.array(rows[metric], dtype=numpy.float64).reshape(len(landmarks), num_cities)
+                 for metric in SearchMetric}
+        return cls(landmarks, engine.data_fingerprint(), costs, time.perf_counter() - start_time)
+
+    def save(self, path: str):
+        """
+        writes the tables to disk, replacing any older copy in one step so a reader never sees a half-written file.
+        :param path: the file to write
+        :return: None
+        """
+        arrays = {"version": numpy.array(FORMAT_VERSION), "fingerprint": numpy.array(self.fingerprint),
+                  "landmarks": numpy.array(self.landmarks, dtype=numpy.int64),
+                  "build_seconds": numpy.array(self.build_seconds)}
+        for metric in SearchMetric:
+            arrays[f"{metric.name.lower()}_costs"] = self.costs[metric]
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as table_file:
+            numpy.savez(table_file, **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, engine: RoutingEngine, path: str) -> Optional["LandmarkTables"]:
+        """
+        reads tables saved by save(), as long as they were built from the data files the engine uses now.
+        :param engine: the engine the tables are for
+        :param path: the file to read
+        :return: the tables, or None if the file is missing, unreadable or out of date.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with numpy.load(path) as saved:
+                fingerprint = str(saved["fingerprint"])
+                if "version" not in saved.files or int(saved["version"]) != FORMAT_VERSION or \
+                        fingerprint != engine.data_fingerprint():
+                    return None
+                landmarks = saved["landmarks"].tolist()
+                build_seconds = float(saved["build_seconds"])
+                costs = {metric: saved[f"{metric.name.lower()}_costs"] for metric in SearchMetric}
+        except (OSError, KeyError, ValueError) as err:
+            print(f"Couldn't read the landmark tables, so they will be rebuilt: {err}")
+            return None
+        return cls(landmarks, fingerprint, costs, build_seconds)
+
+    @classmethod
+    def load_or_build(cls, engine: RoutingEngine, path: Optional[str] = None, count: int = DEFAULT_LANDMARK_COUNT,
+                      progress: Optional[SearchProgress] = None) -> Optional["LandmarkTables"]:
+        """
+        loads the saved tables for this engine's data, or builds (and saves) fresh ones if there are none yet or the
+        data files have changed since they were built.
+        :param engine: the engine the tables are for
+        :param path: where to keep the tables; defaults to default_cache_path(engine)
+        :param count: how many landmarks to pick, if the tables have to be built
+        :param progress: if given, building (but not loading) gives up as soon as progress.cancel() is called
+        :return: the tables, or None if building them was cancelled
+        """
+        if path is None:
+            path = cls.default_cache_path(engine)
+        tables = cls.load(engine, path)
+        if tables is None:
+            tables = cls.build(engine, count, progress)
+            if tables is None:
+                return None
+            try:
+                tables.save(path)
+            except OSError as osErr:
+                print(f"Couldn't save the landmark tables: {osErr}")
+        return tables
+
+    def make_heuristic(self, start: int, goal: int, metric: SearchMetric,
+                       active: int = DEFAULT_ACTIVE_LANDMARKS) -> Callable[[int], float]:
+        """
+        builds the ALT estimate for one query. Only the `active` landmarks that give the best bound from the start
+        are used; their bounds for every city are worked out at once, in a few vectorized passes, so that each lookup
+        during the search is just a list index.
+        :param start: the city the search starts from (to choose the active landmarks)
+        :param goal: the city the search is heading for
+        :param metric: distance or time
+        :param active: how many landmarks to use
+        :return: a function that takes a city id and returns a lower bound on the cost from there to the goal.
+        """
+        table = self.costs[metric]
+        num_cities = table.shape[1]
+        if len(table) == 0 or not (0 <= goal < num_cities):
+            return lambda city: 0.0
+        if 0 <= start < num_cities and active < len(table):
+            table = table[numpy.argsort(-self.bounds(table, [start], goal)[:, 0])[:active]]
+        bounds = self.bounds(table, slice(None), goal).max(axis=0).tolist()
+
+        def estimate(city: int) -> float:
+            return bounds[city] if city < num_cities else 0.0
+        return estimate
+
+    @staticmethod
+    def bounds(table: numpy.ndarray, cities, goal: int) -> numpy.ndarray:
+        """
+        :return: the lower bound each landmark (row of table) gives on the cost from each of the cities to the goal.
+        """
+        with numpy.errstate(invalid="ignore"):
+            difference = numpy.abs(table[:, cities] - table[:, goal, None])
+        # a landmark that reaches neither end says nothing; one that reaches only one end proves there is no path.
+        return numpy.where(numpy.isnan(difference), 0.0, difference).reshape(len(table), -1)
+
+
+def run_comparison(engine: RoutingEngine, count: int = DEFAULT_LANDMARK_COUNT, queries: int = 200,
+                   metric: SearchMetric = SearchMetric.TIME, seed: int = 0):
+    """
+    builds landmark tables for the engine and prints what they cost - build time and memory per landmark - and what
+    they save: the average number of cities settled (and the time taken) per query by plain Dijkstra, A* with the
+    straight-line heuristic and A* with landmarks, for the same random queries. Also checks that all three agree.
+    """
+    tables = LandmarkTables.build(engine, count)
+    engine.landmark_tables = tables
+    num_cities = len(engine.neighbor_offsets) - 1
+    print(f"{num_cities} cities; {len(tables.landmarks)} landmarks built in {1000 * tables.build_seconds:.1f} ms, "
+          f"{tables.bytes_per_landmark / 1024:.1f} KiB per landmark ({tables.nbytes / 1024:.1f} KiB in all).")
+
+    generator = random.Random(seed)
+    pairs = [(generator.randrange(num_cities), generator.randrange(num_cities)) for _ in range(queries)]
+    modes = (SearchMode.DIJKSTRA, SearchMode.A_STAR, SearchMode.LANDMARKS)
+    settled = {mode: 0 for mode in modes}
+    elapsed = {mode: 0.0 for mode in modes}
+    for first, second in pairs:
+        engine.first_city_id = first
+        engine.second_city_id = second
+        costs = []
+        for mode in modes:
+            start_time = time.perf_counter()
+            path = engine.perform_search(metric, mode)
+            elapsed[mode] += time.perf_counter() - start_time
+            settled[mode] += engine.cities_expanded
+            costs.append(None if path is None else sum(edge[metric.value] for edge in path))
+        if any((cost is None) != (costs[0] is None) or (cost is not None and abs(cost - costs[0]) > 1e-6 * cost)
+               for cost in costs):
+            raise AssertionError(f"The searches disagree about the path from {first} to {second}.")
+
+    print(f"{'mode':>10} {'settled':>9} {'vs Dijkstra':>12} {'ms/query':>9}")
+    for mode in modes:
+        print(f"{mode.name:>10} {settled[mode] / queries:>9.1f} "
+              f"{settled[mode] / max(settled[SearchMode.DIJKSTRA], 1):>11.0%} {1000 * elapsed[mode] / queries:>9.3f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        from BenchmarkSuiteFile import synthetic_graph_files
+        run_comparison(RoutingEngine(*synthetic_graph_files(int(sys.argv[1]))))
+    else:
+        run_comparison(RoutingEngine())
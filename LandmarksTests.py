@@ -0,0 +1,79 @@
+import math
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from LandmarksFile import FORMAT_VERSION, LandmarkTables
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
+
+
+class LandmarksTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = RoutingEngine()
+        self.tables = LandmarkTables.build(self.engine, count=6)
+        self.engine.landmark_tables = self.tables
+
+    def test_0_landmarks(self):
+        self.assertEqual(6, len(self.tables.landmarks), "Six landmarks were asked for.")
+        self.assertEqual(6, len(set(self.tables.landmarks)), "The landmarks should all be different.")
+        for metric in SearchMetric:
+            self.assertEqual((6, len(self.engine.vertices)), self.tables.costs[metric].shape, "Wrong table size.")
+        self.assertEqual(2 * 8 * len(self.engine.vertices), self.tables.bytes_per_landmark,
+                         "Each landmark should take 8 bytes per city per metric.")
+
+    def test_1_lower_bounds(self):
+        for metric in SearchMetric:
+            for goal in (4, 53, 95):
+                true_cost, _ = self.engine.shortest_path_tree(goal, metric)
+                for start in (0, 21, 79):
+                    estimate = self.tables.make_heuristic(start, goal, metric)
+                    for city in range(len(self.engine.vertices)):
+                        self.assertLessEqual(estimate(city), true_cost.get(city, math.inf) + 1e-9,
+                                             f"The bound from {city} to {goal} by {metric.name} is too big.")
+
+    def test_2_same_paths_less_work(self):
+        settled = {SearchMode.DIJKSTRA: 0, SearchMode.LANDMARKS: 0}
+        for first, second in [(53, 79), (28, 81), (95, 4), (21, 93), (0, 99)]:
+            self.engine.first_city_id = first
+            self.engine.second_city_id = second
+            for metric in SearchMetric:
+                costs = []
+                for mode in settled:
+                    path = self.engine.perform_search(metric, mode)
+                    settled[mode] += self.engine.cities_expanded
+                    costs.append(sum(edge[metric.value] for edge in path) if path is not None else None)
+                self.assertAlmostEqual(costs[0], costs[1], msg=f"Different costs from {first} to {second}.")
+        self.assertLess(settled[SearchMode.LANDMARKS], settled[SearchMode.DIJKSTRA],
+                        "Landmarks should make the search settle fewer cities.")
+
+    def test_3_saved_tables(self):
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, "landmarks.npz")
+            self.tables.save(path)
+            loaded = LandmarkTables.load(self.engine, path)
+            self.assertEqual(self.tables.landmarks, loaded.landmarks, "The landmarks didn't survive saving.")
+            for metric in SearchMetric:
+                self.assertEqual(self.tables.costs[metric].tolist(), loaded.costs[metric].tolist(),
+                                 "The costs didn't survive saving.")
+            with numpy.load(path) as saved:
+                arrays = {name: saved[name] for name in saved.files}
+            old_layout_path = os.path.join(folder, "old_landmarks.npz")
+            numpy.savez(old_layout_path, **{name: values for name, values in arrays.items() if name != "version"})
+            self.assertIsNone(LandmarkTables.load(self.engine, old_layout_path),
+                              "Tables saved without a format version should be rebuilt.")
+            numpy.savez(old_layout_path, **dict(arrays, version=numpy.array(FORMAT_VERSION + 1)))
+            self.assertIsNone(LandmarkTables.load(self.engine, old_layout_path),
+                              "Tables saved in another format version should be rebuilt.")
+
+            self.engine.update_edge(3, distance=1.0)
+            self.assertIsNone(self.engine.landmark_tables, "Changing a connection should drop the tables.")
+            self.assertIsNone(LandmarkTables.load(self.engine, path), "Saved tables for the old data are stale.")
+        finally:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,19 +1,32 @@
 import cv2
 from copy import deepcopy
 from enum import Enum
-from typing import List, Tuple
-import os
+from time import perf_counter
+from typing import List, Optional, Tuple
 import logging
+import threading
 
 import numpy
 
+from RoutingEngineFile import RoutingEngine, City_Data, Edge_Data, SearchMetric, SearchMode, CITY_DATA_FILENAME, \
+    CONNECTION_DATA_FILENAME
+import MapRenderingFile as rendering
+from SearchProgressFile import BackgroundSearch
+
 logging.basicConfig(level=logging.INFO)  # simple version to the output console
 # logging.basicConfig(level=logging.DEBUG, filename=f"log {datetime.datetime.now():%m-%d@%H:%M:%S}.txt",
 #                     format="%(asctime)s %(levelname)s %(message)s",
 #                     datefmt="%H:%M:%S %p --- ")  # more robust, sent to a file cNode = Tuple[int, T]
 
-City_Data = Tuple[int, str, str, int, int]
-Edge_Data = Tuple[int, int, float, float]
+MAP_IMAGE_FILENAME = "Major_US_Cities.png"
+
+Rect = Tuple[int, int, int, int]  # (left, top, right, bottom) in pixels; right and bottom are not included.
+
+# how long the UI loop blocks waiting for events while nothing is happening - long enough that an idle window uses
+# next to no CPU, short enough that a search started by a click is picked up promptly.
+IDLE_WAIT_MS = 200
+# how long it waits between frames while a search is running, which caps the frame rate (here, at about 30 fps).
+FRAME_WAIT_MS = 33
 
 
 class ClickHandlerMode(Enum):
@@ -23,123 +36,201 @@ class ClickHandlerMode(Enum):
     DONE = 3
 
 
-class MapConnector:
+class MapConnector(RoutingEngine):
 
-    def __init__(self):
+    def __init__(self, show_window: bool = True, city_file_path: str = CITY_DATA_FILENAME,
+                 connection_file_path: str = CONNECTION_DATA_FILENAME):
         """
-        Loads the map graphic, as well as the files for the cities and the connections between them.
-
+        Loads the files for the cities and the connections between them (via RoutingEngine) and, if show_window is
+        True, draws them over the map graphic in a window called "Map."
+        The map graphic itself is only read from disk the first time something needs to be drawn, so a MapConnector
+        made with show_window=False costs no more than a RoutingEngine until you ask it to draw.
+        :param show_window: whether to draw the map and open the window now.
+        :param city_file_path: the tab-delimited file of cities, as for RoutingEngine
+        :param connection_file_path: the tab-delimited file of connections, as for RoutingEngine
         """
-        self.original_map_image: numpy.ndarray = cv2.imread("Major_US_Cities.png")  # by default this reads as color.
-
-        self.vertices: List[City_Data] = []  # an array of 5-element arrays ("City_Data"s)
-        self.edges: List[Edge_Data] = []  # an array of 4-element arrays ("Edge_Data"s). Remember that Edge_Data is an
-        # abbreviation for a Tuple of (int, int, float, float), corresponding to
-        # (cityA_1d, cityB_id, distance, time).
-
-        self.load_city_data()
-        self.load_connection_data()
-
-        self.current_map: numpy.ndarray = self.draw_cities_and_connections()
-        # display the map you just made in a window called "Map"
-        cv2.imshow("Map", self.current_map)
+        super().__init__(city_file_path, connection_file_path)
+        self._original_map_image: Optional[numpy.ndarray] = None
+        self._base_layer: Optional[numpy.ndarray] = None  # the map with the cities and connections drawn on it.
+        self._map_tiles: Optional[rendering.MapTiles] = None  # the same, cut into tiles at several resolutions.
+        self._city_positions: Optional[numpy.ndarray] = None  # V x 2 (x, y) of the cities, as of _positions_version
+        self._positions_version = -1
+        self._segments: Optional[numpy.ndarray] = None  # E x 2 x 2 ends of the connections, as of _segments_version
+        self._segments_version = -1
+        self.current_map: Optional[numpy.ndarray] = None  # what is on screen: the base layer plus the overlay.
+
+        # the overlay holds everything drawn on top of the base layer (paths, labels...). overlay_mask is 255 wherever
+        # something has been drawn on it. overlay_rects lists every region the overlay has touched since the last reset;
+        # dirty_rects lists the ones that have not been copied into current_map yet.
+        self.overlay: Optional[numpy.ndarray] = None
+        self.overlay_mask: Optional[numpy.ndarray] = None
+        self.overlay_rects: List[Rect] = []
+        self.dirty_rects: List[Rect] = []
+
+        if show_window:
+            self.restore_base_layer()
+            # display the map you just made in a window called "Map"
+            cv2.imshow("Map", self.current_map)
 
         # variables for handling mouse clicks.
         self.click_mode = None
         self.waiting_for_click = False
-        self.first_city_id = -1
-        self.second_city_id = -1
+        self.click_received = threading.Event()  # set by handle_click() to release wait_for_click()
+
+        # the search in progress (run on a worker thread, so the window stays responsive), and how it is set up.
+        self.search_metric = SearchMetric.DISTANCE
+        self.search_mode = SearchMode.DIJKSTRA
+        self.current_search: Optional[BackgroundSearch] = None
+        self.cities_drawn = 0  # how many of the current search's settled cities are already on the overlay
 
-    def load_city_data(self):
+    @property
+    def original_map_image(self) -> numpy.ndarray:
         """
-        opens & reads the data file containing location info about cities into self.vertices.
-        :return:
+        the map graphic, read from disk the first time it is needed.
         """
-        if os.path.exists("City Data with coords.txt"):
-            try:
-                # city data consists of tab-delimited: id#, city name, state, x-coord, y-coord
-                city_data_file = open("City Data with coords.txt", "r")
-            except OSError as osErr:
-                print(f"Couldn't open the City Data file: {osErr}")
-                return
-            try:
-                for line in city_data_file:
-                    # "line" is now a string that corresponds to one line of the file.
+        if self._original_map_image is None:
+            self._original_map_image = cv2.imread(MAP_IMAGE_FILENAME)  # by default this reads as color.
+        return self._original_map_image
 
-                    parts: List[str] = line.split("\t")
-                    # "parts" is now a List of little strings that came from the longer "line," divided by tabs.
-                    # (The tabs are not included in any of the strings.)
+    @property
+    def base_layer(self) -> numpy.ndarray:
+        """
+        the map with all the cities and connections drawn on it. This is drawn once and then reused by every reset();
+        call invalidate_base_layer() if the cities or connections change.
+        """
+        if self._base_layer is None:
+            self._base_layer = self.draw_cities_and_connections()
+        return self._base_layer
 
-                    # remember, City_Data is an abbreviation for a Tuple of (int, str, str, int, int), which corresponds
-                    #    to (id, name, state, x, y).
-                    city: City_Data = (int(parts[0]), parts[1], parts[2], int(parts[3]), int(parts[4]))
+    def invalidate_base_layer(self):
+        """
+        forgets the cached base layer, so that it is drawn again (from the current self.vertices and self.edges) the
+        next time it is needed.
+        :return: None
+        """
+        self._base_layer = None
+        self._map_tiles = None
 
-                    self.vertices.append(city)
+    @property
+    def city_points(self) -> numpy.ndarray:
+        """
+        the (x, y) of every city, as a V x 2 array, for drawing many cities at once. Worked out again only when the
+        data changes (see data_version).
+        """
+        if self._city_positions is None or self._positions_version != self.data_version:
+            self._city_positions = rendering.city_positions(self.vertices)
+            self._positions_version = self.data_version
+        return self._city_positions
 
-            except IOError as ioErr:
-                print(f"Error reading City Data file: {ioErr}")
-            city_data_file.close()
-        else:
-            print("Could not find City Data file.")
+    @property
+    def connection_lines(self) -> numpy.ndarray:
+        """
+        the ((x1, y1), (x2, y2)) of every connection, as an E x 2 x 2 array, for drawing them all at once. Like
+        city_points, worked out again only when the data changes.
+        """
+        if self._segments is None or self._segments_version != self.data_version:
+            self._segments = rendering.connection_segments(self.vertices, self.edges)
+            self._segments_version = self.data_version
+        return self._segments
 
-    def load_connection_data(self):
+    def map_tiles(self, tile_size: int = 256) -> rendering.MapTiles:
         """
-        opens & reads the data file containing roadway info about city connections into self.edges, a list of
-        undirected edges. (That is, self.edges should become a list of Edge_Data.)
-        :return:
+        the map with the cities and connections, as a tile pyramid (see MapRenderingFile.py): for rendering, exporting
+        or panning around a big map one tile at a time, at full resolution or shrunk. Made the first time it is
+        needed, and forgotten by invalidate_base_layer().
+        :param tile_size: the width and height of each tile, in pixels
+        :return: the tiles
         """
-        if os.path.exists("connections.txt"):
-            try:
-                connection_file = open("connections.txt", "r")
-            except OSError as osErr:
-                print(f"Couldn't open the City Data file: {osErr}")
-                return
-            try:
-                # connection data in the file consists of tab-delimited:
-                #    edge_id(unused),
-                #    node1_id,
-                #    node2_id,
-                #    distance_in_meters,
-                #    travel_time_in_seconds
-                # -----------------------------------------
-                # TODO #0: You should write this portion of this method:
-                #
-                #       Fill the edge list from the connection_file. Borrow heavily from the load_city_data() method I
-                #       wrote, above.
-                print("I am not yet loading any edges!")  # replace this with your code.
-
-                # -----------------------------------------
-            except IOError as ioErr:
-                print(f"Error reading Connection Data file: {ioErr}")
-            connection_file.close()
-        else:
-            print("Could not find Connection Data file.")
+        if self._map_tiles is None or self._map_tiles.tile_size != tile_size:
+            self._map_tiles = rendering.MapTiles(self.vertices, self.edges, self.original_map_image, tile_size)
+        return self._map_tiles
 
     def start_process(self):
         """
         this is essentially our game loop - it sets up the mouse listener,
         and then enters an infinite loop where it waits for the user to select
         the two cities before it performs a search and displays the result.
+        The loop is event-driven: cv2.waitKey() blocks until something happens (mouse events are handled by
+        handle_click() while it waits), and the search itself runs on a worker thread (see start_search()), so the
+        window keeps responding - and keeps showing the search spreading out - however long the search takes.
         :return:
         """
         # if anybody does anything mouse-related in the "Map" window, call self.handle_click.
         cv2.setMouseCallback("Map", self.handle_click)
         self.reset()
         while True:
-            while self.click_mode != ClickHandlerMode.SEARCHING:
-                cv2.waitKey(1)
-            path = self.perform_search()
-            self.display_path(path)
-            print(self.describe_path(path))
+            if self.current_search is None:
+                cv2.waitKey(IDLE_WAIT_MS)
+                continue
+            cv2.waitKey(FRAME_WAIT_MS)
+            if self.current_search is None:
+                continue  # a click cancelled it while we waited.
+            self.show_search_progress()
+            if self.current_search.is_done():
+                self.finish_search()
+
+    def start_search(self):
+        """
+        starts searching from self.first_city_id to self.second_city_id on a worker thread. The UI loop in
+        start_process() draws its progress and, when it is done, the result (see finish_search()).
+        :return: None
+        """
+        self.cities_drawn = 0
+        self.current_search = BackgroundSearch(self, self.search_metric, self.search_mode).start()
 
-            # TODO (optional): consider the following. No action is required.
+    def cancel_search(self):
+        """
+        stops the search in progress, if there is one, and waits for its thread to let go of the engine.
+        :return: None
+        """
+        if self.current_search is not None:
+            # cancel, then wake it, in case it is paused in wait_for_click(): woken any earlier, it could pause there
+            # again before seeing the cancellation - and cancel() would give up waiting for it.
+            self.current_search.progress.cancel()
+            self.click_received.set()
+            self.current_search.cancel()
+            self.current_search = None
+
+    def show_search_progress(self):
+        """
+        draws the cities the current search has settled since the last frame (each with the connection it was
+        reached by) onto the overlay, and marks the cities waiting on its frontier on the displayed frame only.
+        :return: None
+        """
+        progress = self.current_search.progress
+        settled = progress.settled
+        newly_settled = settled[self.cities_drawn:len(settled)]
+        self.cities_drawn += len(newly_settled)
+        for city, edge_id in newly_settled:
+            if edge_id >= 0:
+                edge = self.edges[edge_id]
+                self.draw_overlay_edge(edge[0], edge[1], color=(255, 160, 0), thickness=1)
+        self.refresh_display(show=False)
+
+        frame = self.current_map.copy()
+        frontier = numpy.array(progress.frontier_cities(), dtype=numpy.int64)
+        rendering.draw_cities(frame, self.city_points[frontier[frontier < len(self.city_points)]],
+                              color=(0, 140, 255), size=2)
+        cv2.imshow("Map", frame)
+
+    def finish_search(self):
+        """
+        shows the result of the search that just finished.
+        :return: None
+        """
+        path, description = self.current_search.result()
+        self.current_search = None
+        self.display_path(path)
+        print(description)
 
-            #  Optional: if you would like to save a copy of the graphic that results,
-            #  you can say:
-            #     cv2.imsave("pickAFilename.png",self.current_map).
+        # TODO (optional): consider the following. No action is required.
 
-            print("Click on screen once to start again.")
-            self.click_mode = ClickHandlerMode.DONE
+        #  Optional: if you would like to save a copy of the graphic that results,
+        #  you can say:
+        #     cv2.imsave("pickAFilename.png",self.current_map).
+
+        print("Click on screen once to start again.")
+        self.click_mode = ClickHandlerMode.DONE
 
     def reset(self):
         """
@@ -147,9 +238,27 @@ class MapConnector:
         set the click mode to wait for the first click.
         :return:
         """
-        self.current_map = self.draw_cities_and_connections()
+        self.restore_base_layer()
         self.click_mode = ClickHandlerMode.FIRST_CLICK
 
+    def restore_base_layer(self):
+        """
+        sets self.current_map back to the cached base layer - a single copy into the existing buffer, rather than a
+        redraw - and clears the overlay.
+        :return: None
+        """
+        base = self.base_layer
+        if self.current_map is None or self.overlay is None or self.current_map.shape != base.shape:
+            self.current_map = base.copy()
+            self.overlay = numpy.zeros_like(base)
+            self.overlay_mask = numpy.zeros(base.shape[:2], dtype=numpy.uint8)
+        else:
+            numpy.copyto(self.current_map, base)
+            for left, top, right, bottom in self.overlay_rects:
+                self.overlay_mask[top:bottom, left:right] = 0
+        self.overlay_rects = []
+        self.dirty_rects = []
+
     # ============================================================================ DRAWING METHODS
     def draw_cities_and_connections(self, draw_cities: bool = True, draw_connections: bool = True) -> numpy.ndarray:
         """
@@ -159,14 +268,16 @@ class MapConnector:
         :param draw_connections:
         :return: the new copy with the drawings in it.
         """
+        start_time = perf_counter() if self.collect_search_stats else 0.0
         map_copy = deepcopy(self.original_map_image)
+        # everything is drawn in two batched calls (see MapRenderingFile.py), rather than one per city and connection,
+        # so this takes about as long for a few hundred thousand connections as for a few hundred.
         if draw_cities:
-            for city in self.vertices:
-                self.draw_city(map_copy, city)
+            rendering.draw_cities(map_copy, self.city_points)
         if draw_connections:
-            for edge in self.edges:
-                self.draw_edge(map_copy, int(edge[0]), int(edge[1]))  # note edge is a list of strings,
-                # so we have to cast to ints.
+            rendering.draw_connections(map_copy, self.connection_lines)
+        if self.collect_search_stats:
+            self.finish_phase("draw_cities_and_connections", start_time)
         return map_copy
 
     @staticmethod  # does not require or change any self.* variables or methods.
@@ -201,6 +312,73 @@ class MapConnector:
         cv2.line(img=map_to_draw_on, pt1=point1, pt2=point2, color=color, thickness=thickness)
     # =========================================================================================
 
+    # ============================================================================ OVERLAY METHODS
+    def mark_overlay(self, rect: Rect):
+        """
+        records that the overlay has changed inside the given rectangle (clipped to the map), so that
+        refresh_display() copies that region - and only that region - into self.current_map.
+        :param rect: (left, top, right, bottom)
+        :return: None
+        """
+        height, width = self.overlay_mask.shape
+        left, top, right, bottom = max(rect[0], 0), max(rect[1], 0), min(rect[2], width), min(rect[3], height)
+        if left < right and top < bottom:
+            self.overlay_rects.append((left, top, right, bottom))
+            self.dirty_rects.append((left, top, right, bottom))
+
+    def draw_overlay_text(self, text: str, org: Tuple[int, int], color: Tuple[int, int, int]):
+        """
+        writes a label onto the overlay.
+        :param text: what to write
+        :param org: the bottom-left corner of the text
+        :param color: note: color is BGR, 0-255
+        :return: None
+        """
+        if self.overlay is None:
+            self.restore_base_layer()
+        for image, ink in ((self.overlay, color), (self.overlay_mask, (255, 255, 255))):
+            cv2.putText(img=image,
+                        text=text,
+                        org=org,
+                        fontFace=cv2.FONT_HERSHEY_SIMPLEX,
+                        fontScale=0.5,
+                        thickness=2,
+                        color=ink,
+                        bottomLeftOrigin=False)
+        (text_width, text_height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
+        self.mark_overlay((org[0] - 2, org[1] - text_height - 2, org[0] + text_width + 2, org[1] + baseline + 2))
+
+    def draw_overlay_edge(self, city1_id: int, city2_id: int, color: Tuple[int, int, int], thickness: int):
+        """
+        draws a connection onto the overlay (see draw_edge()).
+        :return: None
+        """
+        if self.overlay is None:
+            self.restore_base_layer()
+        self.draw_edge(self.overlay, city1_id, city2_id, color=color, thickness=thickness)
+        self.draw_edge(self.overlay_mask, city1_id, city2_id, color=(255, 255, 255), thickness=thickness)
+        city1 = self.vertices[city1_id]
+        city2 = self.vertices[city2_id]
+        self.mark_overlay((min(city1[3], city2[3]) - thickness - 1, min(city1[4], city2[4]) - thickness - 1,
+                           max(city1[3], city2[3]) + thickness + 2, max(city1[4], city2[4]) + thickness + 2))
+
+    def refresh_display(self, show: bool = True):
+        """
+        copies the parts of the overlay that changed since the last refresh on top of the base layer in
+        self.current_map, and shows the result.
+        :param show: whether to show it now (pass False to draw more on a copy of self.current_map first).
+        :return: None
+        """
+        for left, top, right, bottom in self.dirty_rects:
+            drawn = self.overlay_mask[top:bottom, left:right] > 0
+            region = self.current_map[top:bottom, left:right]
+            numpy.copyto(region, self.base_layer[top:bottom, left:right])
+            region[drawn] = self.overlay[top:bottom, left:right][drawn]
+        self.dirty_rects = []
+        if show:
+            cv2.imshow("Map", self.current_map)
+    # =========================================================================================
+
     # ============================================================================ PATH METHODS
     def display_path(self, path: List[Edge_Data], line_color: Tuple[int, int, int] = (0, 255, 0)):
         """
@@ -208,127 +386,55 @@ class MapConnector:
          color that makes them obvious. If the path is None, then you should
          display a message that indicates that there is no path.
          You may assume that the self.first_city and self.second_city variables are correct.
-         *** Modifies the existing self.current_map graphics variable. ***
+         *** Draws on the overlay, which is then copied into the existing self.current_map graphics variable. ***
 
         :param path: a list of edges or None, if no path can be found.
         :param line_color: the BGR 0-255 values for the color to draw these lines over the normal black lines.
         :return: None
         """
-        # -----------------------------------------
-        # TODO #1: You should write this method
-
-        # Strong hint: Make use of the draw_edge() method! Consider giving it a thickness of 2 or more, so you can see
-        # the line easily.
-        print("You're supposed to replace this line with code to draw the path found.")
-
-        # -----------------------------------------
-        # NOTE: Don't forget to call cv2.imshow to make the screen update:
-        cv2.imshow("Map", self.current_map)
-
-    def describe_path(self, path: List[Edge_Data]) -> str:
-        """
-        Returns the list of city names corresponding to the items in path, along with the total path length
-        (in km or time) of this path. If the path is None (or empty), then you should return a message "No path found."
-
-        For example...
-            Suppose we had a self.vertices list of just the first part of the data set:
-            [(0, Birmingham, AL,671, 353), (1, Montgomery, AL, 680, 375), (2, Little Rock, AR, 585, 331),
-            (3, Phoenix, AZ, 268, 357), (4, Tucson, AZ, 286, 380), (5, Anaheim, CA, 175, 349)]
-
-            and self.first_city_id = 1  and self.second_city_id = 4
-
-            and you were given a path:
-            path = [(1, 3, 2845, 294533), (3, 5, 1670, 259455), (2, 5, 3895, 395542), (0, 2, 2895, 249543),
-            (0, 4, 1845, 342980)]
-
-            These edges are talking about the following city connections:
-            Montgomery, AL <-> Phoenix, AZ
-            Phoenix, AZ <-> Anaheim, CA
-            Little Rock, AR <-> Anaheim, CA
-            Birmingham, AL <-> Little Rock, AR
-            Birmingham, AL <-> Tucson, AZ
-            (Note that the second city of one edge _sometimes_ matches the first city of the next edge, but not always,
-                 because these are undirected edges. But consecutive edges always DO have a city in common.)
-
-            Then the output should be a string that says...
-            • Montgomery, AL
-            • Phoenix, AZ
-            • Anaheim, CA
-            • Little Rock, AR
-            • Birmingham, AL
-            • Tucson, AZ
-            total_distance = 13150.0	total_time = 1542053.0
-
-        :param path: a list of Edges or None, if no path was found
-        :return: a multi-line string describing the path.
-        """
-
+        start_time = perf_counter() if self.collect_search_stats else 0.0
         if path is None or len(path) == 0:
-            return "No path found."
-
-        logging.info("I'm logging the following so you can better understand what the issue is - Mr. Howe")
-        for e in path:
-            c1 = self.vertices[e[0]]
-            c2 = self.vertices[e[1]]
-            logging.info(f"{c1[1]}, {c1[2]} <--> {c2[1]}, {c2[2]}\t{e[2]}meters\t{e[3]}seconds.")
-
-        result = "Path found:\n"
-
-        # -----------------------------------------
-        # TODO #2: You should write this method
+            self.draw_overlay_text("No path found.", org=(0, 440), color=(0, 0, 255))
+        else:
+            for edge in path:
+                self.draw_overlay_edge(edge[0], edge[1], color=line_color, thickness=3)
 
-        # -----------------------------------------
-        return result
+        # NOTE: Don't forget to update the screen (refresh_display() calls cv2.imshow):
+        self.refresh_display()
+        if self.collect_search_stats:
+            self.finish_phase("render", start_time)
 
-    def get_neighbor_edges(self, city: int) -> List[Edge_Data]:
-        """
-        gets a list of all edges that have the given city on one end or the other
-        :param city: the id of the city in question
-        :return: a list of edge_data values
+    def display_isochrone(self, origins: List[int], budget: float, metric: SearchMetric = SearchMetric.TIME):
         """
-        result = []
-        for edge in self.edges:
-            if edge[0] == city or edge[1] == city:
-                result.append(edge)
-        return result
-
-    def perform_search(self) -> List[Edge_Data]:
-        """
-        finds the shortest path from self.first_city_id to self.second_city_id.
-        Whether this is the shortest driving distance or the shortest time duration
-        is the programmer's choice. (For testing, use distance.)
-        :return: a list of EdgeData's (like what you received in describePath) that represents the path,
-        or None, if no such path can be found.
+        shades the map by what it costs to get everywhere within budget of the origins (see reachable_within() and
+        IsochroneFile.py) - red nearby, fading to blue at the budget - and rings the origins. Drawn on the overlay, so
+        reset() clears it.
+        :param origins: the cities to start from (several depots, say)
+        :param budget: the most it may cost, in meters or seconds
+        :param metric: whether the budget is a distance or a time
+        :return: None
         """
-        result_path: List[Edge_Data] = []
-        # -----------------------------------------
-        # TODO #3: You should write this method here.
-
-        # Hint: if you would like to be able to pause after each cycle of the search, consider adding "wait_for_click()"
-        # inside your primary loop.
-        # ...but be sure to delete it for your finished program!
-        # -----------------------------------------
-        return result_path
+        from IsochroneFile import render_isochrone
+        start_time = perf_counter() if self.collect_search_stats else 0.0
+        if self.overlay is None:
+            self.restore_base_layer()
+        shaded, shaded_mask = render_isochrone(self, self.base_layer, origins, budget, metric)
+        drawn = shaded_mask > 0
+        self.overlay[drawn] = shaded[drawn]
+        self.overlay_mask[drawn] = 255
+        for origin in origins:
+            city = self.vertices[origin]
+            for image in (self.overlay, self.overlay_mask):
+                cv2.circle(img=image, center=(int(city[3]), int(city[4])), radius=7, color=(255, 255, 255),
+                           thickness=2)
+        height, width = self.overlay_mask.shape
+        self.mark_overlay((0, 0, width, height))
+        self.refresh_display()
+        if self.collect_search_stats:
+            self.finish_phase("render", start_time)
     # =========================================================================================
 
     # ============================================================================ MOUSE METHODS
-    def find_closest_city(self, pos: Tuple[int, int]) -> int:
-        """
-        identifies which city is closest to the coordinate given.
-        :param pos: the coordinate of interest (x,y)
-        :return: the index of the closest city.
-        """
-        dist = float("inf")
-        which_city = None
-        counter = 0
-        for city in self.vertices:
-            d_squared = (pos[0] - int(city[3])) ** 2 + (pos[1] - int(city[4])) ** 2
-            if d_squared < dist:
-                dist = d_squared
-                which_city = counter
-            counter += 1
-        return which_city
-
     def handle_click(self, event: int, x: int, y: int, flags: int, param):
         """
         this method gets called whenever the user moves or clicks or does
@@ -348,17 +454,11 @@ class MapConnector:
                 # identify which city was selected, set the self.first_city_id variable
                 # and display the selected city on screen.
                 self.first_city_id = self.find_closest_city((x, y))
-                cv2.putText(img=self.current_map,
-                            text="from: {0}, {1}".format(self.vertices[self.first_city_id][1],
-                                                         self.vertices[self.first_city_id][2]),
-                            org=(0, 400),
-                            fontFace=cv2.FONT_HERSHEY_SIMPLEX,
-                            fontScale=0.5,
-                            thickness=2,
-                            color=(0, 128, 0),
-                            bottomLeftOrigin=False)
+                self.draw_overlay_text("from: {0}, {1}".format(self.vertices[self.first_city_id][1],
+                                                               self.vertices[self.first_city_id][2]),
+                                       org=(0, 400), color=(0, 128, 0))
                 # update the screen with these changes.
-                cv2.imshow("Map", self.current_map)
+                self.refresh_display()
                 # now prepare to receive the second city.
                 self.click_mode = ClickHandlerMode.SECOND_CLICK
                 return
@@ -368,25 +468,26 @@ class MapConnector:
                 # identify which city was selected, set the self.second_city_id variable
                 # and display the selected city on screen.
                 self.second_city_id = self.find_closest_city((x, y))
-                cv2.putText(img=self.current_map,
-                            text="to: {0}, {1}".format(self.vertices[self.second_city_id][1],
-                                                       self.vertices[self.second_city_id][2]),
-                            org=(0, 420),
-                            fontFace=cv2.FONT_HERSHEY_SIMPLEX,
-                            fontScale=0.5,
-                            thickness=2,
-                            color=(0, 0, 128),
-                            bottomLeftOrigin=False)
+                self.draw_overlay_text("to: {0}, {1}".format(self.vertices[self.second_city_id][1],
+                                                             self.vertices[self.second_city_id][2]),
+                                       org=(0, 420), color=(0, 0, 128))
                 # update the screen with these changes
-                cv2.imshow("Map", self.current_map)
-                # now prepare for the search process. Any further clicks while
-                #   the search is in progress will be used to advance the search
-                #   step by step.
+                self.refresh_display()
+                # now start the search. Any further clicks while the search is in progress will either advance it
+                #   step by step (if it is paused in wait_for_click()) or cancel it.
                 self.click_mode = ClickHandlerMode.SEARCHING
+                self.start_search()
                 return
             elif self.click_mode == ClickHandlerMode.SEARCHING:
-                # advance to the next step
-                self.waiting_for_click = False
+                if self.waiting_for_click:
+                    # advance to the next step
+                    self.waiting_for_click = False
+                    self.click_received.set()
+                    return
+                # otherwise, cancel the search and start choosing a new route from the city that was clicked.
+                self.cancel_search()
+                self.reset()
+                self.handle_click(event, x, y, flags, param)
                 return
 
             elif self.click_mode == ClickHandlerMode.DONE:
@@ -397,16 +498,26 @@ class MapConnector:
 
     def wait_for_click(self):
         """
-        makes the program freeze until the user releases the mouse in the window.
+        makes the program freeze until the user releases the mouse in the window. (Meant to be called from within
+        perform_search(), to step through it; the UI loop keeps drawing in the meantime.)
         :return: None
         """
         if self.click_mode != ClickHandlerMode.SEARCHING:
             raise RuntimeError("You asked to wait_for_click, but it only works in SEARCHING mode. "
                                "(Otherwise the program would freeze indefinitely.)")
+        self.click_received.clear()
+        if self.current_search is not None and self.current_search.cancelled:
+            return  # (checked after clearing, so a cancel_search() from now on still wakes us.)
         self.waiting_for_click = True
-        while self.waiting_for_click:
-            cv2.waitKey(1)
-            # if the user clicks the mouse, then handle_click() will change the waiting_for_click variable.
+        if threading.current_thread() is threading.main_thread():
+            # mouse events are only delivered while the UI thread is inside cv2.waitKey(), so keep calling it - but
+            # blocking for a frame at a time, rather than spinning.
+            while self.waiting_for_click:
+                cv2.waitKey(FRAME_WAIT_MS)
+        else:
+            # on the search thread: just sleep until handle_click() (or a cancellation) wakes us.
+            self.click_received.wait()
+        self.waiting_for_click = False
     # =========================================================================================
 
 
@@ -1,12 +1,16 @@
+import os
+import tempfile
 import unittest
 import cv2
 from MapConnectorFile import MapConnector
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
 
 
 class MyTestCase(unittest.TestCase):
 
     def setUp(self) -> None:
-        self.connector = MapConnector()
+        # only test 1 needs the map window; everything else can use the (much faster to load) headless engine.
+        self.connector = RoutingEngine()
 
     def test_0_load_edges(self):
         self.assertEqual(204, len(self.connector.edges), "You haven't loaded the correct number of edges.")
@@ -21,6 +25,7 @@ class MyTestCase(unittest.TestCase):
 
         There are no actual tests in this -- you're just checking that a window shows up with the pink line described.
         """
+        self.connector = MapConnector()
         edge_nums = [47, 51, 33, 32, 19, 11]
         example_path = []
         for num in edge_nums:
@@ -181,3 +186,67 @@ class MyTestCase(unittest.TestCase):
 
         result = self.connector.perform_search()
         self.assertEqual(expected_path, result, "Long path did not match expected.")
+
+    def test_10_a_star_matches_and_expands_less(self):
+        edge_nums = [121, 118, 151, 156, 161, 175, 174, 189, 186, 188, 193]
+        expected_path = []
+        for num in edge_nums:
+            expected_path.append((self.connector.edges[num]))
+        self.connector.first_city_id = 21  # Miami
+        self.connector.second_city_id = 93  # Montpellier
+
+        self.connector.perform_search()
+        plain_expanded = self.connector.cities_expanded
+        result = self.connector.perform_search(mode=SearchMode.A_STAR)
+        print(f"Dijkstra expanded {plain_expanded} cities; A* expanded {self.connector.cities_expanded}.")
+        self.assertEqual(expected_path, result, "A* long path did not match expected.")
+        self.assertLess(self.connector.cities_expanded, plain_expanded, "A* should expand fewer cities.")
+
+    def test_11_all_pairs_tables(self):
+        from AllPairsTablesFile import AllPairsTables
+        tables = AllPairsTables.build(self.connector)
+        for first, second in [(53, 79), (28, 81), (95, 4), (21, 93), (7, 7)]:
+            self.connector.first_city_id = first
+            self.connector.second_city_id = second
+            for metric in SearchMetric:
+                self.assertEqual(self.connector.perform_search(metric), tables.find_path(first, second, metric),
+                                 f"Table path from {first} to {second} by {metric.name} did not match the search.")
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "tables.npz")
+            tables.save(path)
+            self.assertIsNotNone(AllPairsTables.load(self.connector, path), "Saved tables should reload.")
+            self.connector.edges = self.connector.edges[:-1]
+            self.connector.build_adjacency_index()
+            self.assertIsNone(AllPairsTables.load(self.connector, path), "Tables for old data should be rejected.")
+
+    def test_12_bidirectional_matches(self):
+        for first, second, edge_nums in [(53, 79, [54, 55]), (28, 81, [131, 143, 142]), (95, 4, [3, 73, 35, 36, 31]),
+                                         (21, 93, [121, 118, 151, 156, 161, 175, 174, 189, 186, 188, 193])]:
+            expected_path = [self.connector.edges[num] for num in edge_nums]
+            self.connector.first_city_id = first
+            self.connector.second_city_id = second
+            result = self.connector.perform_search(mode=SearchMode.BIDIRECTIONAL)
+            self.assertEqual(expected_path, result, f"Bidirectional path from {first} to {second} did not match.")
+            self.assertEqual(self.connector.cities_expanded,
+                             self.connector.cities_settled_forward + self.connector.cities_settled_backward,
+                             "The two sides' counts should add up to the total.")
+        self.connector.perform_search()
+        plain_expanded = self.connector.cities_expanded
+        self.connector.perform_search(mode=SearchMode.BIDIRECTIONAL)
+        self.assertLess(self.connector.cities_expanded, plain_expanded,
+                        "Bidirectional search should settle fewer cities on the long path.")
+
+    def test_13_pareto_paths(self):
+        self.connector.first_city_id = 21  # Miami
+        self.connector.second_city_id = 93  # Montpellier
+        shortest = self.connector.perform_search(SearchMetric.DISTANCE)
+        fastest = self.connector.perform_search(SearchMetric.TIME)
+        paths = self.connector.pareto_search()
+        for path in paths:
+            print(self.connector.describe_path(path))
+        totals = [(sum(edge[2] for edge in path), sum(edge[3] for edge in path)) for path in paths]
+        self.assertEqual(sum(edge[2] for edge in shortest), totals[0][0], "The first path should be the shortest.")
+        self.assertEqual(sum(edge[3] for edge in fastest), totals[-1][1], "The last path should be the fastest.")
+        for (distance1, time1), (distance2, time2) in zip(totals, totals[1:]):
+            self.assertTrue(distance1 < distance2 and time1 > time2, "Each path should trade distance for time.")
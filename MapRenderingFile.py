@@ -0,0 +1,283 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import math
+import os
+
+import cv2
+import numpy
+
+
+# ============================================================================ BATCHED DRAWING
+def city_positions(vertices) -> numpy.ndarray:
+    """
+    :param vertices: a list of City_Data (or a CityTable)
+    :return: a V x 2 float64 array of the (x, y) of each city.
+    """
+    if hasattr(vertices, "xs"):  # array-backed cities (see GraphArraysFile.CityTable)
+        return numpy.column_stack((numpy.asarray(vertices.xs, dtype=numpy.float64),
+                                   numpy.asarray(vertices.ys, dtype=numpy.float64)))
+    return numpy.array([(city[3], city[4]) for city in vertices], dtype=numpy.float64).reshape(-1, 2)
+
+
+def connection_segments(vertices, edges) -> numpy.ndarray:
+    """
+    looks up both ends of every connection at once.
+    :param vertices: a list of City_Data (or a CityTable)
+    :param edges: a list of Edge_Data (or an EdgeTable)
+    :return: an E x 2 x 2 float64 array: segments[i] is [[x1, y1], [x2, y2]] for connection i. (Connections to cities
+    that don't exist are left out.)
+    """
+    if hasattr(edges, "endpoints"):  # array-backed connections (see GraphArraysFile.EdgeTable)
+        endpoints = numpy.asarray(edges.endpoints, dtype=numpy.int64)
+    else:
+        endpoints = numpy.array([(edge[0], edge[1]) for edge in edges], dtype=numpy.int64).reshape(-1, 2)
+    positions = city_positions(vertices)
+    endpoints = endpoints[(endpoints >= 0).all(axis=1) & (endpoints < len(positions)).all(axis=1)]
+    return positions[endpoints]
+
+
+def draw_connections(image: numpy.ndarray, segments: numpy.ndarray, color: Tuple[int, int, int] = (0, 0, 0),
+                     thickness: int = 1):
+    """
+    draws every segment in a single cv2.polylines() call, rather than one cv2.line() (and its Python overhead) per
+    connection.
+    :param image: the graphic to alter
+    :param segments: an E x 2 x 2 array of ((x1, y1), (x2, y2)) in pixels of this image
+    :param color: note: color is BGR, 0-255
+    :param thickness: number of pixels wide to draw the lines
+    :return: None
+    """
+    if len(segments) > 0:
+        cv2.polylines(img=image, pts=numpy.rint(segments).astype(numpy.int32), isClosed=False, color=color,
+                      thickness=thickness)
+
+
+def line_pixels(segments: numpy.ndarray, width: int, height: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    works out, all at once, the pixels that cv2.line() (1 pixel thick, 8-connected) would fill for each segment on an
+    image of the given size - including its clipping of lines that leave the image, which moves where a line starts and
+    so which pixels it fills. A tile can then draw just its share of a long connection and match the whole map exactly,
+    where drawing the connection into the tile with cv2 would clip it at the tile's edge instead.
+    :param segments: an E x 2 x 2 array of ((x1, y1), (x2, y2)) in pixels of the image
+    :param width: the width of the image
+    :param height: the height of the image
+    :return: (xs, ys) arrays of the pixels, every segment's one after another
+    """
+    ends = numpy.rint(segments).astype(numpy.int64).reshape(-1, 2, 2)
+    starts, stops = ends[:, 0].copy(), ends[:, 1].copy()
+    inside = ((ends >= 0).all(axis=2) & (ends[:, :, 0] < width) & (ends[:, :, 1] < height)).all(axis=1)
+    keep = numpy.ones(len(ends), dtype=bool)
+    for i in numpy.nonzero(~inside)[0]:  # (usually few: only connections that run off the image.)
+        visible, start, stop = cv2.clipLine((0, 0, width, height), tuple(starts[i].tolist()),
+                                            tuple(stops[i].tolist()))
+        if visible:
+            starts[i], stops[i] = start, stop
+        else:
+            keep[i] = False
+    starts, stops = starts[keep], stops[keep]
+
+    # like cv2, always step left to right, one pixel at a time along the longer axis; the shorter axis moves on when
+    # its Bresenham error term goes negative, which works out to the ceiling below.
+    backwards = stops[:, 0] < starts[:, 0]
+    starts[backwards], stops[backwards] = stops[backwards], starts[backwards].copy()
+    dx = stops[:, 0] - starts[:, 0]
+    dy = stops[:, 1] - starts[:, 1]
+    y_sign = numpy.where(dy < 0, -1, 1)
+    dy = numpy.abs(dy)
+    steep = dy > dx
+    major = numpy.where(steep, dy, dx)
+    minor = numpy.where(steep, dx, dy)
+    counts = major + 1
+    segment = numpy.repeat(numpy.arange(len(starts)), counts)
+    step = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    major, minor, steep = major[segment], minor[segment], steep[segment]
+    offset = numpy.maximum(0, -((major - 2 * minor * step) // numpy.maximum(2 * major, 1)))
+    xs = starts[segment, 0] + numpy.where(steep, offset, step)
+    ys = starts[segment, 1] + y_sign[segment] * numpy.where(steep, step, offset)
+    return xs, ys
+
+
+def disc_offsets(radius: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    :return: (dy, dx) arrays of the pixels that cv2.circle() fills for a dot of the given radius, relative to its
+    centre.
+    """
+    stamp = numpy.zeros((2 * radius + 1, 2 * radius + 1), dtype=numpy.uint8)
+    cv2.circle(img=stamp, center=(radius, radius), radius=radius, color=255, thickness=-1)
+    dy, dx = numpy.nonzero(stamp)
+    return dy - radius, dx - radius
+
+
+def draw_cities(image: numpy.ndarray, positions: numpy.ndarray, color: Tuple[int, int, int] = (0, 0, 128),
+                size: int = 4):
+    """
+    draws a dot for every city at once, by stamping the pixels of one cv2.circle() at every position with a single
+    fancy-indexed assignment. The dots are pixel-for-pixel the ones draw_city() makes.
+    :param image: the graphic to alter
+    :param positions: a V x 2 array of (x, y) in pixels of this image
+    :param color: note: color is BGR, 0-255
+    :param size: the radius of the dots
+    :return: None
+    """
+    if len(positions) == 0:
+        return
+    dy, dx = disc_offsets(size)
+    centers = numpy.rint(positions).astype(numpy.int64)
+    xs = (centers[:, 0, None] + dx[None, :]).ravel()
+    ys = (centers[:, 1, None] + dy[None, :]).ravel()
+    inside = (xs >= 0) & (xs < image.shape[1]) & (ys >= 0) & (ys < image.shape[0])
+    image[ys[inside], xs[inside]] = color
+# =========================================================================================
+
+
+# ============================================================================ TILES
+class MapTiles:
+    """
+    The map, with its cities and connections, cut into square tiles at several resolutions (a "tile pyramid"), so that
+    a map too big to draw - or to look at - all at once can be rendered, exported and panned one tile at a time.
+    Level 0 is full resolution; each level after it is half the width and height of the one before, down to a level
+    that fits in a single tile. The background for each level is shrunk from the one before (cv2.pyrDown) the first
+    time it is needed; each tile draws only the connections and cities that fall inside it, in one batched pass each,
+    and the most recently used tiles are kept.
+    """
+
+    def __init__(self, vertices, edges, background: numpy.ndarray, tile_size: int = 256, max_cached_tiles: int = 256,
+                 city_size: int = 4):
+        """
+        :param vertices: the cities (a list of City_Data, or a CityTable)
+        :param edges: the connections (a list of Edge_Data, or an EdgeTable)
+        :param background: the full-resolution map graphic to draw on (not changed)
+        :param tile_size: the width and height of each tile, in pixels
+        :param max_cached_tiles: how many rendered tiles to keep
+        :param city_size: the radius of a city's dot at full resolution (smaller levels shrink it, to 1 pixel at least)
+        """
+        self.tile_size = tile_size
+        self.max_cached_tiles = max_cached_tiles
+        self.city_size = city_size
+        self.backgrounds: List[numpy.ndarray] = [background]
+        self.level_count = 1 + max(0, math.ceil(math.log2(max(background.shape[:2]) / tile_size)))
+        self.positions = city_positions(vertices)
+        self.segments = connection_segments(vertices, edges)
+        self.segment_low = self.segments.min(axis=1) if len(self.segments) else numpy.zeros((0, 2))
+        self.segment_high = self.segments.max(axis=1) if len(self.segments) else numpy.zeros((0, 2))
+        self.cache: "OrderedDict[Tuple[int, int, int], numpy.ndarray]" = OrderedDict()
+
+    def background(self, level: int) -> numpy.ndarray:
+        """
+        :return: the map graphic at the given level's resolution.
+        """
+        if not 0 <= level < self.level_count:
+            raise IndexError(f"level {level} is not between 0 and {self.level_count - 1}")
+        while len(self.backgrounds) <= level:
+            self.backgrounds.append(cv2.pyrDown(self.backgrounds[-1]))
+        return self.backgrounds[level]
+
+    def scale(self, level: int) -> Tuple[float, float]:
+        """
+        :return: (x scale, y scale) from full-resolution pixels to the level's pixels.
+        """
+        full_height, full_width = self.backgrounds[0].shape[:2]
+        height, width = self.background(level).shape[:2]
+        return width / full_width, height / full_height
+
+    def tiles_across(self, level: int) -> Tuple[int, int]:
+        """
+        :return: (columns, rows) of tiles at the given level.
+        """
+        height, width = self.background(level).shape[:2]
+        return -(-width // self.tile_size), -(-height // self.tile_size)
+
+    def tile(self, level: int, column: int, row: int) -> numpy.ndarray:
+        """
+        :return: one tile (tiles along the right and bottom edges may be smaller than tile_size), drawing it if it
+        isn't cached. Treat it as read-only; it is shared with the cache.
+        """
+        key = (level, column, row)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        tile = self.render_tile(level, column, row)
+        self.cache[key] = tile
+        if len(self.cache) > self.max_cached_tiles:
+            self.cache.popitem(last=False)
+        return tile
+
+    def render_tile(self, level: int, column: int, row: int) -> numpy.ndarray:
+        """
+        draws one tile from scratch: the background for that level, plus the connections and cities inside it.
+        :return: the new tile
+        """
+        columns, rows = self.tiles_across(level)
+        if not (0 <= column < columns and 0 <= row < rows):
+            raise IndexError(f"tile ({column}, {row}) is outside the {columns} x {rows} tiles of level {level}")
+        left = column * self.tile_size
+        top = row * self.tile_size
+        tile = self.background(level)[top:top + self.tile_size, left:left + self.tile_size].copy()
+        height, width = tile.shape[:2]
+        scale = numpy.array(self.scale(level))
+        size = max(1, round(self.city_size * min(scale)))
+        margin = size + 1  # (lines and dots just outside the tile can still reach into it.)
+
+        # in the tile's own pixels, pick out (with array comparisons) the connections whose bounding box meets it.
+        origin = numpy.array((left, top), dtype=numpy.float64)
+        low = self.segment_low * scale - origin
+        high = self.segment_high * scale - origin
+        inside = (high[:, 0] >= -margin) & (low[:, 0] < width + margin) & \
+                 (high[:, 1] >= -margin) & (low[:, 1] < height + margin)
+        positions = self.positions * scale - origin
+        near = (positions[:, 0] >= -margin) & (positions[:, 0] < width + margin) & \
+               (positions[:, 1] >= -margin) & (positions[:, 1] < height + margin)
+
+        draw_cities(tile, positions[near], size=size)
+        # the connections' pixels are worked out on the whole level, so that they are exactly the ones the whole map
+        # would have, and then just the ones in this tile are set.
+        level_height, level_width = self.background(level).shape[:2]
+        xs, ys = line_pixels(self.segments[inside] * scale, level_width, level_height)
+        xs -= left
+        ys -= top
+        in_tile = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        tile[ys[in_tile], xs[in_tile]] = (0, 0, 0)
+        return tile
+
+    def view(self, level: int, left: int, top: int, width: int, height: int) -> numpy.ndarray:
+        """
+        puts together the part of a level that a window panned to (left, top) would show, from just the tiles it
+        overlaps. (Parts outside the map are black.)
+        :return: a height x width image
+        """
+        background = self.background(level)
+        result = numpy.zeros((height, width) + background.shape[2:], dtype=background.dtype)
+        columns, rows = self.tiles_across(level)
+        for row in range(max(0, top // self.tile_size), min(rows, -(-(top + height) // self.tile_size))):
+            for column in range(max(0, left // self.tile_size), min(columns, -(-(left + width) // self.tile_size))):
+                tile = self.tile(level, column, row)
+                tile_left = column * self.tile_size
+                tile_top = row * self.tile_size
+                x0, y0 = max(left, tile_left), max(top, tile_top)
+                x1 = min(left + width, tile_left + tile.shape[1])
+                y1 = min(top + height, tile_top + tile.shape[0])
+                if x0 < x1 and y0 < y1:
+                    result[y0 - top:y1 - top, x0 - left:x1 - left] = \
+                        tile[y0 - tile_top:y1 - tile_top, x0 - tile_left:x1 - tile_left]
+        return result
+
+    def export(self, folder: str, levels: Optional[List[int]] = None, extension: str = "png") -> Dict[int, int]:
+        """
+        writes tiles to folder/<level>/<column>_<row>.<extension>, one at a time (so only one tile is ever in memory,
+        besides the backgrounds).
+        :param folder: where to write them
+        :param levels: which levels to write; by default, all of them
+        :param extension: the image format, as cv2.imwrite() understands it
+        :return: level -> how many tiles were written for it
+        """
+        written = {}
+        for level in (range(self.level_count) if levels is None else levels):
+            os.makedirs(os.path.join(folder, str(level)), exist_ok=True)
+            columns, rows = self.tiles_across(level)
+            for row in range(rows):
+                for column in range(columns):
+                    cv2.imwrite(os.path.join(folder, str(level), f"{column}_{row}.{extension}"),
+                                self.render_tile(level, column, row))
+            written[level] = columns * rows
+        return written
+# =========================================================================================
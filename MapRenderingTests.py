@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy
+from MapConnectorFile import MapConnector
+from MapRenderingFile import MapTiles, city_positions, connection_segments, draw_cities, draw_connections, \
+    line_pixels
+
+
+class MapRenderingTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.connector = MapConnector(show_window=False)
+        self.background = self.connector.original_map_image
+
+    def test_0_batched_drawing_matches_one_at_a_time(self):
+        one_at_a_time = self.background.copy()
+        for city in self.connector.vertices:
+            self.connector.draw_city(one_at_a_time, city)
+        batched = self.background.copy()
+        draw_cities(batched, city_positions(self.connector.vertices))
+        self.assertTrue(numpy.array_equal(one_at_a_time, batched), "The city dots should be identical.")
+
+        for edge in self.connector.edges:
+            self.connector.draw_edge(one_at_a_time, edge[0], edge[1])
+        draw_connections(batched, connection_segments(self.connector.vertices, self.connector.edges))
+        self.assertTrue(numpy.array_equal(one_at_a_time, batched), "The connections should be identical.")
+        self.assertTrue(numpy.array_equal(one_at_a_time, self.connector.draw_cities_and_connections()),
+                        "draw_cities_and_connections() should draw the same map as before.")
+
+        lines = self.connector.connection_lines
+        self.assertIs(lines, self.connector.connection_lines, "The connections' ends should be worked out once.")
+        self.connector.edges = self.connector.edges[:-1]
+        self.connector.build_adjacency_index()
+        self.assertEqual(len(lines) - 1, len(self.connector.connection_lines), "New data should be looked up again.")
+
+    def test_1_tiles(self):
+        tiles = MapTiles(self.connector.vertices, self.connector.edges, self.background, tile_size=128)
+        height, width = self.background.shape[:2]
+        self.assertEqual((-(-width // 128), -(-height // 128)), tiles.tiles_across(0), "Wrong number of tiles.")
+        self.assertEqual((1, 1), tiles.tiles_across(tiles.level_count - 1), "The last level should be one tile.")
+
+        # put back together, the full-resolution tiles should be exactly the whole map - even where connections
+        # cross from one tile into the next.
+        whole = tiles.view(0, 0, 0, width, height)
+        self.assertTrue(numpy.array_equal(whole, self.connector.draw_cities_and_connections()),
+                        "The tiles don't match the map.")
+        panned = tiles.view(0, 100, 50, 300, 200)
+        self.assertTrue(numpy.array_equal(whole[50:250, 100:400], panned), "A panned view should match the map.")
+
+        smaller = tiles.view(1, 0, 0, *tiles.background(1).shape[1::-1])
+        self.assertEqual(tiles.background(1).shape, smaller.shape, "Level 1 should be half size.")
+        self.assertFalse(numpy.array_equal(tiles.background(1), smaller), "Level 1 should have the roads drawn on it.")
+
+    def test_1a_line_pixels_match_cv2(self):
+        generator = numpy.random.default_rng(0)
+        for _ in range(200):
+            segment = generator.integers(-80, 280, size=(1, 2, 2))  # (some run off the image, to be clipped.)
+            drawn = numpy.zeros((150, 200), dtype=numpy.uint8)
+            cv2.line(drawn, tuple(segment[0, 0].tolist()), tuple(segment[0, 1].tolist()), 255, 1)
+            worked_out = numpy.zeros((150, 200), dtype=numpy.uint8)
+            xs, ys = line_pixels(segment, 200, 150)
+            worked_out[ys, xs] = 255
+            self.assertTrue(numpy.array_equal(drawn, worked_out), f"Wrong pixels for {segment.tolist()}.")
+
+    def test_2_export(self):
+        folder = tempfile.mkdtemp()
+        try:
+            tiles = self.connector.map_tiles(tile_size=256)
+            written = tiles.export(folder)
+            self.assertEqual(list(range(tiles.level_count)), sorted(written), "Every level should be exported.")
+            for level, count in written.items():
+                self.assertEqual(count, len(os.listdir(os.path.join(folder, str(level)))), "Tiles are missing.")
+            tile = cv2.imread(os.path.join(folder, "0", "1_1.png"))
+            self.assertTrue(numpy.array_equal(tiles.tile(0, 1, 1), tile), "The exported tile doesn't match.")
+        finally:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
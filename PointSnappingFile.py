@@ -0,0 +1,124 @@
+from typing import List, Optional
+import math
+
+import numpy
+
+from SpatialIndexFile import CityKDTree
+
+
+class CityGrid:
+    """
+    A uniform grid over the cities, used to snap large numbers of points to their closest city in a few vectorized
+    NumPy passes. Each point is compared only with the cities in its own grid cell and the eight around it; the few
+    points for which that neighborhood can't prove the answer (for instance, points far outside the map) are handed to
+    the CityKDTree one at a time.
+    """
+
+    def __init__(self, vertices: list, tree: Optional[CityKDTree] = None, cities_per_cell: float = 2.0):
+        """
+        :param vertices: a list of City_Data, like RoutingEngine.vertices
+        :param tree: a CityKDTree over the same cities, for the points the grid can't settle. Built if not given.
+        :param cities_per_cell: roughly how many cities each cell should hold, on average.
+        """
+        self.tree = tree if tree is not None else CityKDTree.from_vertices(vertices)
+        if hasattr(vertices, "xs"):  # array-backed cities (see GraphArraysFile.CityTable)
+            self.xs = numpy.asarray(vertices.xs, dtype=numpy.float64)
+            self.ys = numpy.asarray(vertices.ys, dtype=numpy.float64)
+        else:
+            self.xs = numpy.array([city[3] for city in vertices], dtype=numpy.float64)
+            self.ys = numpy.array([city[4] for city in vertices], dtype=numpy.float64)
+        num_cities = len(vertices)
+        if num_cities == 0:
+            self.cell_offsets = numpy.zeros(2, dtype=numpy.int64)
+            self.cell_cities = numpy.zeros(0, dtype=numpy.int64)
+            return
+
+        self.min_x = float(self.xs.min())
+        self.min_y = float(self.ys.min())
+        width = max(float(self.xs.max()) - self.min_x, 1.0)
+        height = max(float(self.ys.max()) - self.min_y, 1.0)
+        self.cell_size = math.sqrt(width * height * cities_per_cell / num_cities)
+        self.columns = int(width // self.cell_size) + 1
+        self.rows = int(height // self.cell_size) + 1
+
+        # the cities sorted by cell (in increasing order of id within a cell), and where each cell's run of them
+        # starts - the same CSR layout as the adjacency index, so a crowded cell costs only its own cities.
+        cells = self._cell_numbers(self.xs, self.ys)
+        self.cell_cities = numpy.argsort(cells, kind="stable")
+        self.cell_offsets = numpy.zeros(self.rows * self.columns + 1, dtype=numpy.int64)
+        self.cell_offsets[1:] = numpy.cumsum(numpy.bincount(cells, minlength=self.rows * self.columns))
+
+    def _cell_columns_and_rows(self, xs: numpy.ndarray, ys: numpy.ndarray):
+        columns = numpy.clip(numpy.floor((xs - self.min_x) / self.cell_size), 0, self.columns - 1).astype(numpy.int64)
+        rows = numpy.clip(numpy.floor((ys - self.min_y) / self.cell_size), 0, self.rows - 1).astype(numpy.int64)
+        return columns, rows
+
+    def _cell_numbers(self, xs: numpy.ndarray, ys: numpy.ndarray) -> numpy.ndarray:
+        columns, rows = self._cell_columns_and_rows(xs, ys)
+        return rows * self.columns + columns
+
+    def snap(self, points: numpy.ndarray, chunk_size: int = 0) -> numpy.ndarray:
+        """
+        finds the closest city to each point. Ties go to the city with the smaller id, as in find_closest_city().
+        :param points: an N x 2 array of (x, y) positions
+        :param chunk_size: how many points to process per vectorized pass; by default, enough to keep each pass's
+        scratch arrays to a few million entries where the cities are spread as evenly as the grid's average.
+        :return: an array of N city ids (all -1 if there are no cities).
+        """
+        points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+        result = numpy.full(len(points), -1, dtype=numpy.int64)
+        if len(self.xs) == 0:
+            return result
+        if chunk_size <= 0:
+            cities_per_cell = max(1.0, len(self.xs) / (self.rows * self.columns))
+            chunk_size = max(1, int(4_000_000 // (9 * cities_per_cell)))
+        for start in range(0, len(points), chunk_size):
+            result[start:start + chunk_size] = self._snap_chunk(points[start:start + chunk_size])
+        return result
+
+    def _snap_chunk(self, points: numpy.ndarray) -> numpy.ndarray:
+        xs = points[:, 0]
+        ys = points[:, 1]
+        columns, rows = self._cell_columns_and_rows(xs, ys)
+
+        # the run of cities in each cell of the 3 x 3 block around each point (empty for cells off the grid)...
+        starts: List[numpy.ndarray] = []
+        counts: List[numpy.ndarray] = []
+        for row_step in (-1, 0, 1):
+            for column_step in (-1, 0, 1):
+                block_columns = columns + column_step
+                block_rows = rows + row_step
+                inside = (block_columns >= 0) & (block_columns < self.columns) & \
+                         (block_rows >= 0) & (block_rows < self.rows)
+                cells = numpy.where(inside, block_rows * self.columns + block_columns, 0)
+                starts.append(self.cell_offsets[cells])
+                counts.append(numpy.where(inside, self.cell_offsets[cells + 1] - self.cell_offsets[cells], 0))
+        starts = numpy.stack(starts, axis=1).ravel()
+        counts = numpy.stack(counts, axis=1).ravel()
+
+        # ... laid end to end as one flat list of (point, candidate city) pairs.
+        total = int(counts.sum())
+        owners = numpy.repeat(numpy.arange(len(points)).repeat(9), counts)
+        run_starts = numpy.cumsum(counts) - counts
+        candidates = self.cell_cities[numpy.repeat(starts - run_starts, counts) + numpy.arange(total)]
+
+        d_squared = (self.xs[candidates] - xs[owners]) ** 2 + (self.ys[candidates] - ys[owners]) ** 2
+        best_d_squared = numpy.full(len(points), numpy.inf)
+        numpy.minimum.at(best_d_squared, owners, d_squared)
+        # among the equally-close candidates, take the smallest id.
+        tied = d_squared == best_d_squared[owners]
+        best = numpy.full(len(points), numpy.iinfo(numpy.int64).max, dtype=numpy.int64)
+        numpy.minimum.at(best, owners[tied], candidates[tied])
+
+        # a city outside the block is at least as far away as the nearest side of the block - unless that side is
+        # the edge of the grid, beyond which there are no cities at all.
+        left = numpy.where(columns - 1 >= 0, self.min_x + (columns - 1) * self.cell_size, -numpy.inf)
+        right = numpy.where(columns + 1 < self.columns, self.min_x + (columns + 2) * self.cell_size, numpy.inf)
+        top = numpy.where(rows - 1 >= 0, self.min_y + (rows - 1) * self.cell_size, -numpy.inf)
+        bottom = numpy.where(rows + 1 < self.rows, self.min_y + (rows + 2) * self.cell_size, numpy.inf)
+        margin = numpy.minimum(numpy.minimum(xs - left, right - xs), numpy.minimum(ys - top, bottom - ys))
+        settled = numpy.isfinite(best_d_squared) & (best_d_squared < margin ** 2)
+
+        for position in numpy.flatnonzero(~settled):
+            best[position] = self.tree.nearest(float(xs[position]), float(ys[position]))
+        return best
@@ -0,0 +1,163 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from RoutingEngineFile import RoutingEngine, Edge_Data, SearchMetric, SearchMode
+
+Route_Key = Tuple[int, int, SearchMetric]  # (first city id, second city id, metric)
+
+
+class RouteCacheEntry:
+    """
+    one remembered route: the path, its description and the shorter routes it can also answer (see RouteCache).
+    """
+
+    def __init__(self, path: Optional[List[Edge_Data]], description: str):
+        self.path = path
+        self.description = description
+        self.prefix_keys: List[Route_Key] = []
+
+
+class RouteCache:
+    """
+    A bounded, least-recently-used cache of perform_search() results and their describe_path() strings, keyed by
+    (first_city_id, second_city_id, metric).
+
+    The whole cache is emptied whenever the engine's data changes (its data_version goes up, or its vertices or edges
+    are replaced). And since Dijkstra's algorithm reaches every city on a path by the beginning of that same path, a
+    cached route from A to B also answers the route from A to any city along the way; those "prefix" answers are
+    identical to what a fresh search would return, so they are only used with SearchMode.DIJKSTRA, where that is
+    guaranteed.
+    """
+
+    def __init__(self, engine: RoutingEngine, max_routes: int = 10_000, max_edges: int = 1_000_000,
+                 mode: SearchMode = SearchMode.DIJKSTRA):
+        """
+        :param engine: the engine to search in
+        :param max_routes: the most routes to keep at once
+        :param max_edges: the most edges to keep at once, counting every cached path
+        :param mode: the search mode to use on a miss
+        """
+        self.engine = engine
+        self.max_routes = max_routes
+        self.max_edges = max_edges
+        self.mode = mode
+
+        self.entries: "OrderedDict[Route_Key, RouteCacheEntry]" = OrderedDict()  # least recently used first
+        self.prefix_index: Dict[Route_Key, Tuple[Route_Key, int]] = {}  # key -> (cached route, how many edges of it)
+        self.edge_count = 0
+        self.data_stamp = self._current_data_stamp()
+
+        self.hits = 0
+        self.prefix_hits = 0  # hits answered from the beginning of a longer cached route (also counted in hits)
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _current_data_stamp(self) -> tuple:
+        engine = self.engine
+        return (engine.data_version, id(engine.vertices), len(engine.vertices), id(engine.edges), len(engine.edges))
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        :return: the fraction of lookups answered from the cache (0 if there have been none).
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        :return: the counters that help size the cache, as a dictionary.
+        """
+        return {"hits": self.hits, "prefix_hits": self.prefix_hits, "misses": self.misses,
+                "hit_rate": self.hit_rate, "evictions": self.evictions, "invalidations": self.invalidations,
+                "routes": len(self.entries), "edges": self.edge_count}
+
+    def clear(self):
+        """
+        forgets every cached route (but not the counters).
+        :return: None
+        """
+        self.entries.clear()
+        self.prefix_index.clear()
+        self.edge_count = 0
+
+    def find_route(self, first_city_id: int, second_city_id: int,
+                   metric: SearchMetric = SearchMetric.DISTANCE) -> Tuple[Optional[List[Edge_Data]], str]:
+        """
+        looks up (or finds and remembers) the shortest route between two cities.
+        The engine's first_city_id and second_city_id are left as they were.
+        :return: (the path, as perform_search() would return it; its describe_path() description)
+        """
+        stamp = self._current_data_stamp()
+        if stamp != self.data_stamp:
+            self.clear()
+            self.data_stamp = stamp
+            self.invalidations += 1
+
+        key = (first_city_id, second_city_id, metric)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry.path, entry.description
+
+        if key in self.prefix_index:
+            owner_key, length = self.prefix_index[key]
+            self.entries.move_to_end(owner_key)
+            self.hits += 1
+            self.prefix_hits += 1
+            path = list(self.entries[owner_key].path[:length])
+            # remember this one in its own right, so its description isn't rebuilt next time.
+            entry = self._store(key, path, self._describe(first_city_id, second_city_id, path))
+            return entry.path, entry.description
+
+        self.misses += 1
+        previous_cities = (self.engine.first_city_id, self.engine.second_city_id)
+        self.engine.first_city_id = first_city_id
+        self.engine.second_city_id = second_city_id
+        try:
+            path = self.engine.perform_search(metric, self.mode)
+            description = self.engine.describe_path(path)
+        finally:
+            self.engine.first_city_id, self.engine.second_city_id = previous_cities
+        entry = self._store(key, path, description)
+        if self.mode == SearchMode.DIJKSTRA and path:
+            self._index_prefixes(key, entry)
+        return entry.path, entry.description
+
+    def _describe(self, first_city_id: int, second_city_id: int, path: Optional[List[Edge_Data]]) -> str:
+        previous_cities = (self.engine.first_city_id, self.engine.second_city_id)
+        self.engine.first_city_id = first_city_id
+        self.engine.second_city_id = second_city_id
+        try:
+            return self.engine.describe_path(path)
+        finally:
+            self.engine.first_city_id, self.engine.second_city_id = previous_cities
+
+    def _store(self, key: Route_Key, path: Optional[List[Edge_Data]], description: str) -> RouteCacheEntry:
+        entry = RouteCacheEntry(path, description)
+        self.entries[key] = entry
+        self.prefix_index.pop(key, None)  # it has its own entry now.
+        self.edge_count += len(path) if path else 0
+        while len(self.entries) > 1 and (len(self.entries) > self.max_routes or self.edge_count > self.max_edges):
+            self._evict_oldest()
+        return entry
+
+    def _index_prefixes(self, key: Route_Key, entry: RouteCacheEntry):
+        first_city_id, _, metric = key
+        city = first_city_id
+        for length, edge in enumerate(entry.path[:-1], start=1):
+            city = edge[1] if edge[0] == city else edge[0]
+            prefix_key = (first_city_id, city, metric)
+            if prefix_key not in self.entries and prefix_key not in self.prefix_index:
+                self.prefix_index[prefix_key] = (key, length)
+                entry.prefix_keys.append(prefix_key)
+
+    def _evict_oldest(self):
+        key, entry = self.entries.popitem(last=False)
+        self.edge_count -= len(entry.path) if entry.path else 0
+        for prefix_key in entry.prefix_keys:
+            if self.prefix_index.get(prefix_key, (None, 0))[0] == key:
+                del self.prefix_index[prefix_key]
+        self.evictions += 1
@@ -0,0 +1,61 @@
+import unittest
+from RouteCacheFile import RouteCache
+from RoutingEngineFile import RoutingEngine, SearchMetric
+
+
+class RouteCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = RoutingEngine()
+
+    def fresh_route(self, first, second, metric=SearchMetric.DISTANCE):
+        self.engine.first_city_id = first
+        self.engine.second_city_id = second
+        path = self.engine.perform_search(metric)
+        description = self.engine.describe_path(path)
+        self.engine.first_city_id = -1
+        self.engine.second_city_id = -1
+        return path, description
+
+    def test_0_hits_and_misses(self):
+        cache = RouteCache(self.engine)
+        self.assertEqual(self.fresh_route(21, 93), cache.find_route(21, 93), "A miss should match a fresh search.")
+        self.assertEqual(self.fresh_route(21, 93), cache.find_route(21, 93), "A hit should match a fresh search.")
+        self.assertEqual(self.fresh_route(21, 93, SearchMetric.TIME), cache.find_route(21, 93, SearchMetric.TIME),
+                         "The metric is part of the key.")
+        self.assertEqual((1, 2), (cache.hits, cache.misses), "Expected one hit and two misses.")
+        self.assertEqual((-1, -1), (self.engine.first_city_id, self.engine.second_city_id),
+                         "The cache should leave the engine's selected cities alone.")
+
+    def test_1_prefix_hits(self):
+        cache = RouteCache(self.engine)
+        path, _ = cache.find_route(21, 93)
+        city = 21
+        for edge in path[:-1]:
+            city = edge[1] if edge[0] == city else edge[0]
+            self.assertEqual(self.fresh_route(21, city), cache.find_route(21, city),
+                             f"The route to {city} along the way should match a fresh search.")
+        self.assertEqual(len(path) - 1, cache.prefix_hits, "Every city along the way should have been a prefix hit.")
+        self.assertEqual(1, cache.misses, "Only the first route should have needed a search.")
+
+    def test_2_eviction(self):
+        cache = RouteCache(self.engine, max_routes=2)
+        cache.find_route(53, 79)
+        cache.find_route(28, 81)
+        cache.find_route(53, 79)  # now (28, 81) is the least recently used.
+        cache.find_route(95, 4)
+        self.assertEqual(1, cache.evictions, "The third route should have evicted one.")
+        self.assertEqual([(53, 79, SearchMetric.DISTANCE), (95, 4, SearchMetric.DISTANCE)], list(cache.entries),
+                         "The least recently used route should have been evicted.")
+        small_cache = RouteCache(self.engine, max_edges=12)
+        small_cache.find_route(21, 93)
+        small_cache.find_route(95, 4)
+        self.assertLessEqual(small_cache.edge_count, 12, "The edge limit should be respected.")
+
+    def test_3_invalidated_when_data_changes(self):
+        cache = RouteCache(self.engine)
+        cache.find_route(28, 81)
+        self.engine.edges = [edge for edge in self.engine.edges if edge != self.engine.edges[143]]
+        self.engine.build_adjacency_index()
+        self.assertEqual(self.fresh_route(28, 81), cache.find_route(28, 81), "The cache should see the new edges.")
+        self.assertEqual((1, 0), (cache.invalidations, cache.hits), "Changing the edges should empty the cache.")
@@ -0,0 +1,1073 @@
+from array import array
+from enum import Enum
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import hashlib
+import heapq
+import math
+import os
+import logging
+
+from SearchProgressFile import SearchProgress
+from SearchStatsFile import SearchStats
+from SpatialIndexFile import CityKDTree
+
+City_Data = Tuple[int, str, str, int, int]
+Edge_Data = Tuple[int, int, float, float]
+
+CITY_DATA_FILENAME = "City Data with coords.txt"
+CONNECTION_DATA_FILENAME = "connections.txt"
+
+
+class SearchMetric(Enum):
+    """
+    what a search should minimize. Each value is the position of that quantity within an Edge_Data.
+    """
+    DISTANCE = 2
+    TIME = 3
+
+
+class SearchMode(Enum):
+    DIJKSTRA = 0  # plain shortest-path search, spreading out evenly from the start.
+    A_STAR = 1  # goal-directed, using the straight-line (pixel) distance to the goal as a lower bound.
+    ALL_PAIRS_TABLE = 2  # look the path up in precomputed tables (see AllPairsTablesFile.py); no search at all.
+    BIDIRECTIONAL = 3  # search outward from both ends at once, stopping when the two searches can't do any better.
+    LANDMARKS = 4  # A*, with lower bounds from precomputed landmark costs (see LandmarksFile.py) instead of pixels.
+
+
+class RoutingEngine:
+    """
+    The "headless" half of the map program: it loads the cities and the connections between them, and it can search
+    for and describe paths. It never touches OpenCV or the map graphic, so it is cheap to create in tests and batch
+    jobs. (MapConnector builds on this class and adds the window, the drawing and the mouse handling.)
+    """
+
+    def __init__(self, city_file_path: str = CITY_DATA_FILENAME, connection_file_path: str = CONNECTION_DATA_FILENAME,
+                 binary_graph_folder: Optional[str] = None, stream_connections: bool = False,
+                 array_storage: bool = False):
+        """
+        Loads the files for the cities and the connections between them.
+        :param city_file_path: the tab-delimited file of cities (id, name, state, x, y)
+        :param connection_file_path: the tab-delimited file of connections (id, city1, city2, distance, time)
+        :param binary_graph_folder: if given, and it holds an up-to-date compiled copy of those two files (see
+        BinaryGraphFile.py), memory-map that instead of parsing the text. Otherwise, the text files are read as usual.
+        :param stream_connections: if True, read the connection file with load_connection_data_streaming() - into
+        typed arrays, chunk by chunk - rather than into a list of tuples. Meant for very large files.
+        :param array_storage: if True, keep the cities and connections in NumPy arrays (see use_array_storage())
+        rather than in lists of tuples.
+        """
+        self.city_file_path = city_file_path
+        self.connection_file_path = connection_file_path
+
+        self.vertices: List[City_Data] = []  # an array of 5-element arrays ("City_Data"s)
+        self.edges: List[Edge_Data] = []  # an array of 4-element arrays ("Edge_Data"s). Remember that Edge_Data is an
+        # abbreviation for a Tuple of (int, int, float, float), corresponding to
+        # (cityA_1d, cityB_id, distance, time).
+
+        # adjacency index (CSR layout) built from self.edges by build_adjacency_index(). The neighbors of city c are
+        # found at positions neighbor_offsets[c] up to (but not including) neighbor_offsets[c+1] of the other arrays.
+        # Each undirected edge appears twice - once from each end - unless it is a loop from a city to itself.
+        self.neighbor_offsets: array = array("l")  # one entry per city, plus one more at the end.
+        self.neighbor_cities: array = array("l")  # the city at the far end of each edge
+        self.neighbor_edge_ids: array = array("l")  # the index of the edge in self.edges
+        self.neighbor_distances: array = array("d")
+        self.neighbor_times: array = array("d")
+
+        # the indices (in self.edges) of connections that are currently closed - see close_edge(). A closed connection
+        # stays in self.edges, but costs infinitely much in the adjacency index, so no search will use it.
+        self.closed_edges: Set[int] = set()
+
+        # SearchMetric -> the largest number of meters (or seconds) per pixel of straight-line distance that never
+        # overestimates the cost of any connection. Used to turn pixel distances into an A* heuristic.
+        self.heuristic_scales = {SearchMetric.DISTANCE: 0.0, SearchMetric.TIME: 0.0}
+
+        # spatial indices of the cities, for find_closest_city() and snap_points(). The KD-tree is rebuilt whenever
+        # the cities are loaded from text (and on first use after loading a binary graph); the grid (which needs numpy)
+        # only the first time snap_points() is called.
+        self.city_tree: Optional[CityKDTree] = None
+        self.city_grid = None
+
+        # the AllPairsTables used by SearchMode.ALL_PAIRS_TABLE, loaded (or built) the first time they are needed.
+        self.all_pairs_tables = None
+        # the LandmarkTables used by SearchMode.LANDMARKS, likewise.
+        self.landmark_tables = None
+
+        # goes up by one every time the indices are rebuilt from new or changed data, so that anything remembered about
+        # earlier results (see RouteCacheFile.py) can tell it is out of date.
+        self.data_version = 0
+
+        if binary_graph_folder is None or not self.load_binary_graph(binary_graph_folder):
+            self.load_city_data()
+            if not stream_connections:
+                self.load_connection_data()
+            elif not self.load_connection_data_streaming():
+                self.build_adjacency_index()  # (of no connections at all)
+        if array_storage:
+            self.use_array_storage()
+
+        # the two ends of the path to search for and describe.
+        self.first_city_id = -1
+        self.second_city_id = -1
+
+        # how many cities the most recent call to perform_search() expanded (i.e., took off the frontier and explored).
+        # For a bidirectional search, this is split into the cities settled by the search from each end.
+        self.cities_expanded = 0
+        self.cities_settled_forward = 0
+        self.cities_settled_backward = 0
+
+        # opt-in instrumentation (see enable_search_stats()). While it is off, the searches skip all of it.
+        self.collect_search_stats = False
+        self.search_stats_callback: Optional[Callable[[str, SearchStats], None]] = None
+        self.search_stats: Optional[SearchStats] = None  # the most recent instrumented query
+
+    def load_city_data(self):
+        """
+        opens & reads the data file containing location info about cities into self.vertices.
+        :return:
+        """
+        if os.path.exists(self.city_file_path):
+            try:
+                # city data consists of tab-delimited: id#, city name, state, x-coord, y-coord
+                city_data_file = open(self.city_file_path, "r")
+            except OSError as osErr:
+                print(f"Couldn't open the City Data file: {osErr}")
+                return
+            try:
+                for line in city_data_file:
+                    # "line" is now a string that corresponds to one line of the file.
+
+                    parts: List[str] = line.split("\t")
+                    # "parts" is now a List of little strings that came from the longer "line," divided by tabs.
+                    # (The tabs are not included in any of the strings.)
+
+                    # remember, City_Data is an abbreviation for a Tuple of (int, str, str, int, int), which corresponds
+                    #    to (id, name, state, x, y).
+                    city: City_Data = (int(parts[0]), parts[1], parts[2], int(parts[3]), int(parts[4]))
+
+                    self.vertices.append(city)
+
+            except IOError as ioErr:
+                print(f"Error reading City Data file: {ioErr}")
+            city_data_file.close()
+        else:
+            print("Could not find City Data file.")
+        self.build_spatial_index()
+
+    def build_spatial_index(self):
+        """
+        rebuilds the KD-tree that find_closest_city() uses from self.vertices. Call this again if you change
+        self.vertices.
+        :return: None
+        """
+        self.city_tree = CityKDTree.from_vertices(self.vertices)
+        self.city_grid = None
+        self.data_version += 1
+
+    def load_binary_graph(self, folder: str) -> bool:
+        """
+        memory-maps a compiled graph (see BinaryGraphFile.py) in place of reading the two text files. self.vertices
+        and self.edges become read-only, list-like views that hand out the usual City_Data and Edge_Data tuples.
+        :param folder: the folder written by compile_binary_graph()
+        :return: whether it worked. (It doesn't if the folder is missing, or older than the text files.)
+        """
+        from BinaryGraphFile import BinaryGraph  # needs numpy, so only imported if this is used.
+        graph = BinaryGraph.open(folder, self.city_file_path, self.connection_file_path)
+        if graph is None:
+            print("No up-to-date compiled graph found; reading the text files instead.")
+            return False
+        self.vertices = graph.vertices
+        self.edges = graph.edges
+        # the cities and connections stay memory-mapped, but the search loops read the adjacency index one element
+        # at a time, which is several times slower from a NumPy array than from an array.array - so that (much the
+        # smaller part) is copied into the arrays build_adjacency_index() makes, straight from the mapped bytes.
+        import numpy
+        for name, typecode in (("neighbor_offsets", "l"), ("neighbor_cities", "l"), ("neighbor_edge_ids", "l"),
+                               ("neighbor_distances", "d"), ("neighbor_times", "d")):
+            setattr(self, name, array(typecode, numpy.asarray(graph.arrays[name], dtype=typecode).tobytes()))
+        self.heuristic_scales = graph.heuristic_scales
+        self.city_tree = None
+        self.city_grid = None
+        self.all_pairs_tables = None
+        self.landmark_tables = None
+        self.data_version += 1
+        return True
+
+    def use_array_storage(self):
+        """
+        switches self.vertices and self.edges from lists of tuples to "struct of arrays" tables (see
+        GraphArraysFile.py): one NumPy array per field, with the city names and states packed into a string table.
+        That takes 32 bytes per connection instead of a tuple and four boxed numbers (about 150 bytes), and lets the
+        drawing, spatial index and A* heuristic read coordinates straight from arrays. The tables are read-only,
+        list-like views that still hand out the usual City_Data and Edge_Data tuples, so describe_path() and the like
+        work unchanged - and update_edge() and friends still work, because the arrays are private and writable.
+        (Tables that are already arrays, from load_binary_graph() or load_connection_data_streaming(), are kept.)
+        :return: None
+        """
+        from GraphArraysFile import CityTable, EdgeTable  # needs numpy, so only imported if this is used.
+        if isinstance(self.vertices, list):
+            self.vertices = CityTable.from_rows(self.vertices)
+            self.build_spatial_index()
+        if isinstance(self.edges, list):
+            self.edges = EdgeTable.from_rows(self.edges)
+            self.data_version += 1
+
+    def load_connection_data(self):
+        """
+        opens & reads the data file containing roadway info about city connections into self.edges, a list of
+        undirected edges. (That is, self.edges should become a list of Edge_Data.)
+        :return:
+        """
+        if os.path.exists(self.connection_file_path):
+            try:
+                connection_file = open(self.connection_file_path, "r")
+            except OSError as osErr:
+                print(f"Couldn't open the City Data file: {osErr}")
+                return
+            try:
+                # connection data in the file consists of tab-delimited:
+                #    edge_id(unused),
+                #    node1_id,
+                #    node2_id,
+                #    distance_in_meters,
+                #    travel_time_in_seconds
+                for line in connection_file:
+                    parts: List[str] = line.split("\t")
+                    if len(parts) < 5:
+                        continue  # skip blank lines, such as a trailing newline at the end of the file.
+
+                    # remember, Edge_Data is an abbreviation for a Tuple of (int, int, float, float), which
+                    #    corresponds to (cityA_id, cityB_id, distance, time).
+                    edge: Edge_Data = (int(parts[1]), int(parts[2]), float(parts[3]), float(parts[4]))
+
+                    self.edges.append(edge)
+
+            except IOError as ioErr:
+                print(f"Error reading Connection Data file: {ioErr}")
+            connection_file.close()
+        else:
+            print("Could not find Connection Data file.")
+        self.build_adjacency_index()
+
+    def load_connection_data_streaming(self, chunk_bytes: Optional[int] = None, processes: int = 1,
+                                       progress: Optional[Callable[[int, int], None]] = None) -> bool:
+        """
+        reads the connection file like load_connection_data(), but in fixed-size chunks parsed with NumPy straight
+        into preallocated arrays (see StreamingLoaderFile.py), so that even a file of tens of millions of connections
+        loads quickly and in little more memory than the arrays themselves. self.edges becomes a read-only, list-like
+        view of those arrays that hands out the usual Edge_Data tuples. Every connection is checked against the
+        loaded cities, so load the cities first.
+        :param chunk_bytes: roughly how much of the file to parse at a time (by default, 8 MB)
+        :param processes: how many worker processes to parse chunks in
+        :param progress: if given, called as progress(bytes done, total bytes) after each chunk
+        :return: whether it worked. (If not - the file is missing or invalid - the reason is printed, and nothing
+        changes.)
+        """
+        from StreamingLoaderFile import load_connection_table, DEFAULT_CHUNK_BYTES  # needs numpy; imported on use.
+        try:
+            edges = load_connection_table(self.connection_file_path, len(self.vertices),
+                                          chunk_bytes or DEFAULT_CHUNK_BYTES, processes, progress)
+        except (OSError, ValueError) as err:
+            print(f"Couldn't load the Connection Data file: {err}")
+            return False
+        self.edges = edges
+        self.build_adjacency_index()
+        return True
+
+    def build_adjacency_index(self):
+        """
+        rebuilds the CSR-style adjacency arrays (self.neighbor_offsets, etc.) from self.vertices and self.edges, so
+        that the neighbors of any city can be read in time proportional to its number of connections, rather than
+        by scanning every edge. Call this again if you change self.edges.
+        :return: None
+        """
+        if hasattr(self.edges, "endpoints"):
+            # connections held in arrays (see load_connection_data_streaming()) get the same index, built by sorting.
+            from StreamingLoaderFile import build_adjacency_arrays
+            for name, values in build_adjacency_arrays(self.edges, len(self.vertices), self.closed_edges).items():
+                setattr(self, name, values)
+            self.calibrate_heuristic()
+            self.all_pairs_tables = None
+            self.landmark_tables = None
+            self.data_version += 1
+            return
+
+        num_cities = len(self.vertices)
+        for edge in self.edges:
+            num_cities = max(num_cities, edge[0] + 1, edge[1] + 1)
+
+        # count how many entries each city will have...
+        degree = [0] * num_cities
+        for edge in self.edges:
+            degree[edge[0]] += 1
+            if edge[1] != edge[0]:
+                degree[edge[1]] += 1
+
+        # ... turn those counts into starting positions...
+        offsets = array("l", [0] * (num_cities + 1))
+        for city in range(num_cities):
+            offsets[city + 1] = offsets[city] + degree[city]
+
+        # ... and drop each edge into its slot(s), keeping the edges in the order they appear in self.edges.
+        total = offsets[num_cities]
+        cities = array("l", [0] * total)
+        edge_ids = array("l", [0] * total)
+        distances = array("d", [0.0] * total)
+        times = array("d", [0.0] * total)
+        next_slot = list(offsets[:num_cities])
+        for edge_id, edge in enumerate(self.edges):
+            for here, there in ((edge[0], edge[1]), (edge[1], edge[0])):
+                slot = next_slot[here]
+                next_slot[here] += 1
+                cities[slot] = there
+                edge_ids[slot] = edge_id
+                distances[slot] = math.inf if edge_id in self.closed_edges else edge[2]
+                times[slot] = math.inf if edge_id in self.closed_edges else edge[3]
+                if here == there:
+                    break  # a loop only gets one entry.
+
+        self.neighbor_offsets = offsets
+        self.neighbor_cities = cities
+        self.neighbor_edge_ids = edge_ids
+        self.neighbor_distances = distances
+        self.neighbor_times = times
+        self.calibrate_heuristic()
+        self.all_pairs_tables = None  # they (and the landmark tables) describe the old connections.
+        self.landmark_tables = None
+        self.data_version += 1
+
+    def calibrate_heuristic(self):
+        """
+        finds, for each SearchMetric, the smallest ratio of an edge's cost to the straight-line pixel distance between
+        its cities. Since every connection costs at least this much per pixel, so does every path, and this ratio times
+        the pixel distance to the goal is a lower bound on the remaining cost - which keeps A* exact.
+        :return: None
+        """
+        if hasattr(self.edges, "endpoints"):
+            from StreamingLoaderFile import calibrate_scales
+            self.heuristic_scales = calibrate_scales(self.vertices, self.edges)
+            return
+        scales = {SearchMetric.DISTANCE: math.inf, SearchMetric.TIME: math.inf}
+        for edge in self.edges:
+            if edge[0] >= len(self.vertices) or edge[1] >= len(self.vertices):
+                continue
+            city1 = self.vertices[edge[0]]
+            city2 = self.vertices[edge[1]]
+            pixels = math.hypot(city1[3] - city2[3], city1[4] - city2[4])
+            if pixels == 0:
+                continue  # no information about the scale here.
+            for metric in scales:
+                scales[metric] = min(scales[metric], edge[metric.value] / pixels)
+        for metric in scales:
+            if math.isinf(scales[metric]) or scales[metric] < 0:
+                scales[metric] = 0.0  # no usable edges (or negative costs): fall back to a heuristic of zero.
+        self.heuristic_scales = scales
+
+    def data_fingerprint(self) -> str:
+        """
+        hashes the road network as the searches see it, so that anything precomputed from it and saved to disk (see
+        AllPairsTablesFile.py, for instance) can be recognized as out of date when the data files change, or when
+        connections are updated or closed. That is the adjacency index - which holds the number of cities, where
+        every connection goes and what it costs - hashed straight from its arrays' memory, so no per-edge Python
+        objects are made however big the graph is.
+        :return: a hex digest
+        """
+        digest = hashlib.sha1()
+        for values, typecode in ((self.neighbor_offsets, "q"), (self.neighbor_cities, "q"),
+                                 (self.neighbor_edge_ids, "q"), (self.neighbor_distances, "d"),
+                                 (self.neighbor_times, "d")):
+            if isinstance(values, array) and values.itemsize != 8:
+                values = array(typecode, values)  # (where a C long is 4 bytes, so as to hash the same as NumPy's.)
+            digest.update(values)
+        digest.update(repr(sorted(self.closed_edges)).encode("utf-8"))
+        return digest.hexdigest()
+
+    # ============================================================================ LIVE UPDATES
+    def update_edge(self, edge_id: int, distance: Optional[float] = None, time: Optional[float] = None):
+        """
+        changes the distance and/or time of one connection in place - in self.edges and in the adjacency index -
+        without rebuilding anything else. (If the connection is closed, the new values take effect when it reopens.)
+        Shortest-path trees computed earlier can be brought up to date with DynamicShortestPathTree.repair().
+        :param edge_id: the index of the connection in self.edges
+        :param distance: the new distance, or None to leave it alone
+        :param time: the new travel time, or None to leave it alone
+        :return: None
+        """
+        self._prepare_for_updates()
+        city1, city2, old_distance, old_time = self.edges[edge_id]
+        edge: Edge_Data = (city1, city2, old_distance if distance is None else float(distance),
+                           old_time if time is None else float(time))
+        self.edges[edge_id] = edge
+        if edge_id not in self.closed_edges:
+            self._set_edge_costs(edge_id, edge[2], edge[3])
+
+        # if a connection got cheaper per pixel than any before, the A* heuristic must shrink to stay a lower bound.
+        if city1 < len(self.vertices) and city2 < len(self.vertices):
+            pixels = math.hypot(self.vertices[city1][3] - self.vertices[city2][3],
+                                self.vertices[city1][4] - self.vertices[city2][4])
+            if pixels > 0:
+                for metric in SearchMetric:
+                    self.heuristic_scales[metric] = max(0.0, min(self.heuristic_scales[metric],
+                                                                 edge[metric.value] / pixels))
+        self._edge_costs_changed()
+
+    def close_edge(self, edge_id: int):
+        """
+        closes a connection (a road closure, say), so that no search will use it until reopen_edge() is called.
+        :param edge_id: the index of the connection in self.edges
+        :return: None
+        """
+        self._prepare_for_updates()
+        self.closed_edges.add(edge_id)
+        self._set_edge_costs(edge_id, math.inf, math.inf)
+        self._edge_costs_changed()
+
+    def reopen_edge(self, edge_id: int):
+        """
+        undoes close_edge(), with whatever distance and time the connection has now.
+        :param edge_id: the index of the connection in self.edges
+        :return: None
+        """
+        self._prepare_for_updates()
+        self.closed_edges.discard(edge_id)
+        edge = self.edges[edge_id]
+        self._set_edge_costs(edge_id, edge[2], edge[3])
+        self._edge_costs_changed()
+
+    def edge_cost(self, edge_id: int, metric: SearchMetric = SearchMetric.DISTANCE) -> float:
+        """
+        :return: what the connection currently costs searches: its distance or time, or infinity if it is closed.
+        """
+        return math.inf if edge_id in self.closed_edges else self.edges[edge_id][metric.value]
+
+    def _prepare_for_updates(self):
+        # a memory-mapped graph (see load_binary_graph()) is read-only, so switch to private, writable copies of the
+        # parts that change - still arrays, if they were.
+        if not isinstance(self.edges, list) and not self.edges.writeable:
+            self.edges = self.edges.copy()
+        if not isinstance(self.neighbor_distances, array):
+            self.neighbor_distances = array("d", self.neighbor_distances)
+            self.neighbor_times = array("d", self.neighbor_times)
+
+    def _set_edge_costs(self, edge_id: int, distance: float, time: float):
+        # an edge appears once in the adjacency index for each of its ends.
+        city1, city2 = self.edges[edge_id][0], self.edges[edge_id][1]
+        for city in ((city1,) if city1 == city2 else (city1, city2)):
+            for slot in range(self.neighbor_offsets[city], self.neighbor_offsets[city + 1]):
+                if self.neighbor_edge_ids[slot] == edge_id:
+                    self.neighbor_distances[slot] = distance
+                    self.neighbor_times[slot] = time
+
+    def _edge_costs_changed(self):
+        self.all_pairs_tables = None
+        self.landmark_tables = None
+        self.data_version += 1
+    # =========================================================================================
+
+    # ============================================================================ INSTRUMENTATION
+    def enable_search_stats(self, callback: Optional[Callable[[str, SearchStats], None]] = None):
+        """
+        switches on instrumentation: from now on, each perform_search() leaves a SearchStats in self.search_stats,
+        and the phases that follow it (describe_path(), and drawing the path in MapConnector) add their times to it.
+        :param callback: if given, called as callback(phase, stats) at the end of each phase - "search",
+        "describe_path", "render"... - for instance to log slow queries as they happen.
+        :return: None
+        """
+        self.collect_search_stats = True
+        self.search_stats_callback = callback
+
+    def disable_search_stats(self):
+        """
+        switches instrumentation back off (leaving the last self.search_stats in place).
+        :return: None
+        """
+        self.collect_search_stats = False
+        self.search_stats_callback = None
+
+    def finish_phase(self, phase: str, start_time: float):
+        """
+        records the time since start_time (a perf_counter() reading) as the given phase of the current query, and
+        tells the callback. Only called while instrumentation is on.
+        :return: None
+        """
+        if self.search_stats is None:
+            self.search_stats = SearchStats()
+        self.search_stats.add_phase_time(phase, perf_counter() - start_time)
+        if self.search_stats_callback is not None:
+            self.search_stats_callback(phase, self.search_stats)
+
+    def tally_search(self, stats: SearchStats, frontier_entries_left: int, cities_labelled: int,
+                     settled: Iterable[set], goal_popped: bool):
+        """
+        works out the rest of a search's counts from what the search itself tracked (pops and peak frontier size) and
+        what it left behind, so the search loop needn't count them as it goes.
+        :param stats: the stats, with pops and peak_frontier filled in
+        :param frontier_entries_left: entries still in the priority queue(s) when the search stopped
+        :param cities_labelled: how many cities were ever given a cost (each one's first push isn't a decrease-key)
+        :param settled: the set(s) of settled cities
+        :param goal_popped: whether the search stopped by popping the goal (which is a pop but not a settle)
+        :return: None
+        """
+        offsets = self.neighbor_offsets
+        stats.pushes = stats.pops + frontier_entries_left
+        stats.decrease_keys = stats.pushes - cities_labelled
+        for cities in settled:
+            stats.cities_settled += len(cities)
+            stats.edges_relaxed += sum(offsets[city + 1] - offsets[city] for city in cities)
+        stats.stale_pops = stats.pops - stats.cities_settled - (1 if goal_popped else 0)
+    # =========================================================================================
+
+    # ============================================================================ PATH METHODS
+    def path_start_city(self, path: List[Edge_Data]) -> int:
+        """
+        works out which end of the first edge in the path the traveler starts from. This is self.first_city_id, if
+        that city is on the first edge; otherwise it is whichever end of the first edge is not shared with the second.
+        :param path: a non-empty list of edges, in travel order
+        :return: the id of the city where the path begins
+        """
+        first_edge = path[0]
+        if self.first_city_id in (first_edge[0], first_edge[1]):
+            return self.first_city_id
+        if len(path) > 1 and first_edge[0] in (path[1][0], path[1][1]):
+            return first_edge[1]
+        return first_edge[0]
+
+    def describe_path(self, path: Optional[Sequence[Edge_Data]]) -> str:
+        """
+        Returns the list of city names corresponding to the items in path, along with the total path length
+        (in km or time) of this path. If the path is None (or empty), then you should return a message "No path found."
+
+        For example...
+            Suppose we had a self.vertices list of just the first part of the data set:
+            [(0, Birmingham, AL,671, 353), (1, Montgomery, AL, 680, 375), (2, Little Rock, AR, 585, 331),
+            (3, Phoenix, AZ, 268, 357), (4, Tucson, AZ, 286, 380), (5, Anaheim, CA, 175, 349)]
+
+            and self.first_city_id = 1  and self.second_city_id = 4
+
+            and you were given a path:
+            path = [(1, 3, 2845, 294533), (3, 5, 1670, 259455), (2, 5, 3895, 395542), (0, 2, 2895, 249543),
+            (0, 4, 1845, 342980)]
+
+            These edges are talking about the following city connections:
+            Montgomery, AL <-> Phoenix, AZ
+            Phoenix, AZ <-> Anaheim, CA
+            Little Rock, AR <-> Anaheim, CA
+            Birmingham, AL <-> Little Rock, AR
+            Birmingham, AL <-> Tucson, AZ
+            (Note that the second city of one edge _sometimes_ matches the first city of the next edge, but not always,
+                 because these are undirected edges. But consecutive edges always DO have a city in common.)
+
+            Then the output should be a string that says...
+            • Montgomery, AL
+            • Phoenix, AZ
+            • Anaheim, CA
+            • Little Rock, AR
+            • Birmingham, AL
+            • Tucson, AZ
+            total_distance = 13150.0	total_time = 1542053.0
+
+        :param path: a list of Edges (or a CompactPath) or None, if no path was found
+        :return: a multi-line string describing the path.
+        """
+
+        if path is None or len(path) == 0:
+            return "No path found."
+        start_time = perf_counter() if self.collect_search_stats else 0.0
+
+        # only walk the path for the log if someone will read it.
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("I'm logging the following so you can better understand what the issue is - Mr. Howe")
+            for e in path:
+                c1 = self.vertices[e[0]]
+                c2 = self.vertices[e[1]]
+                logging.debug(f"{c1[1]}, {c1[2]} <--> {c2[1]}, {c2[2]}\t{e[2]}meters\t{e[3]}seconds.")
+
+        if hasattr(path, "cities"):
+            # a CompactPath (see CompactPathFile.py) already has its cities in travel order, and its totals.
+            cities = path.cities
+            total_distance = path.total_distance
+            total_time = path.total_time
+        else:
+            cities = [self.path_start_city(path)]
+            total_distance = 0.0
+            total_time = 0.0
+            for edge in path:
+                # we arrive at whichever end of this edge we are not already standing on.
+                cities.append(edge[1] if edge[0] == cities[-1] else edge[0])
+                total_distance += edge[2]
+                total_time += edge[3]
+
+        # one line per city, joined once at the end (rather than copying the growing string for every city).
+        vertices = self.vertices
+        lines = ["Path found:\n"]
+        lines.extend(f"• {vertices[city][1]}, {vertices[city][2]}\n" for city in cities)
+        lines.append(f"total_distance = {total_distance}\ttotal_time = {total_time}")
+        result = "".join(lines)
+        if self.collect_search_stats:
+            self.finish_phase("describe_path", start_time)
+        return result
+
+    def get_neighbor_edges(self, city: int) -> List[Edge_Data]:
+        """
+        gets a list of all edges that have the given city on one end or the other
+        :param city: the id of the city in question
+        :return: a list of edge_data values
+        """
+        if city < 0 or city + 1 >= len(self.neighbor_offsets):
+            return []
+        edges = self.edges
+        ids = self.neighbor_edge_ids
+        return [edges[ids[slot]] for slot in range(self.neighbor_offsets[city], self.neighbor_offsets[city + 1])]
+
+    def perform_search(self, metric: SearchMetric = SearchMetric.DISTANCE, mode: SearchMode = SearchMode.DIJKSTRA,
+                       progress: Optional[SearchProgress] = None, compact: bool = False) -> Optional[List[Edge_Data]]:
+        """
+        finds the shortest path from self.first_city_id to self.second_city_id.
+        Whether this is the shortest driving distance or the shortest time duration
+        is the programmer's choice. (For testing, use distance.)
+        The number of cities expanded along the way is left in self.cities_expanded.
+        :param metric: whether to minimize distance or time.
+        :param mode: which search strategy to use. All of them find a shortest path; they differ in how much of the
+        map they explore on the way.
+        :param progress: if given, the search reports each city it settles there, as it goes, and gives up (returning
+        None) as soon as progress.cancel() is called - see SearchProgressFile.py.
+        :param compact: if True, give the path as a CompactPath (see CompactPathFile.py), built from the indices of the
+        edges the search used - so it is exact even where two cities have identical parallel connections.
+        :return: a list of EdgeData's (like what you received in describePath) that represents the path,
+        or None, if no such path can be found.
+        """
+        self.cities_expanded = 0
+        self.cities_settled_forward = 0
+        self.cities_settled_backward = 0
+        if not self.collect_search_stats:
+            return self.run_search(metric, mode, None, progress, compact)
+
+        start_time = perf_counter()
+        self.search_stats = SearchStats(metric, mode)
+        path = self.run_search(metric, mode, self.search_stats, progress, compact)
+        self.search_stats.found = path is not None
+        self.search_stats.path_edges = len(path) if path is not None else 0
+        self.finish_phase("search", start_time)
+        return path
+
+    def run_search(self, metric: SearchMetric, mode: SearchMode, stats: Optional[SearchStats],
+                   progress: Optional[SearchProgress] = None, compact: bool = False) -> Optional[List[Edge_Data]]:
+        """
+        the body of perform_search().
+        :param stats: where to count the search's work, or None not to
+        :param progress: where to report the search's progress (and check for cancellation), or None not to
+        :param compact: whether to give the path as a CompactPath rather than a list
+        """
+        start = self.first_city_id
+        goal = self.second_city_id
+        offsets = self.neighbor_offsets
+        if start < 0 or goal < 0 or start + 1 >= len(offsets) or goal + 1 >= len(offsets):
+            return None
+
+        if mode == SearchMode.ALL_PAIRS_TABLE:
+            if self.all_pairs_tables is None:
+                from AllPairsTablesFile import AllPairsTables  # needs numpy, so only imported if this mode is used.
+                self.all_pairs_tables = AllPairsTables.load_or_build(self, progress=progress)
+                if self.all_pairs_tables is None:
+                    return None  # cancelled while the tables were being built.
+            edge_ids = self.all_pairs_tables.path_edge_ids(start, goal, metric)
+            if progress is not None:
+                # nothing is searched, so the only cities "settled" are the ones along the path.
+                if progress.cancelled:
+                    return None
+                city = start
+                progress.settled.append((city, -1))
+                for edge_id in edge_ids or []:
+                    edge = self.edges[edge_id]
+                    city = edge[0] if edge[1] == city else edge[1]
+                    progress.settled.append((city, edge_id))
+            return None if edge_ids is None else self.path_from_edge_ids(start, edge_ids, compact)
+        if mode == SearchMode.BIDIRECTIONAL:
+            return self.bidirectional_search(start, goal, metric, stats, progress, compact)
+
+        # Dijkstra's algorithm or A*, which differ only in the estimate of the remaining cost that is added to each
+        # city's priority. Neighbors come straight out of the adjacency index.
+        neighbor_cities = self.neighbor_cities
+        neighbor_edge_ids = self.neighbor_edge_ids
+        neighbor_costs = self.neighbor_distances if metric == SearchMetric.DISTANCE else self.neighbor_times
+        if mode == SearchMode.A_STAR:
+            estimate = self.make_heuristic(goal, metric)
+        elif mode == SearchMode.LANDMARKS:
+            if self.landmark_tables is None:
+                from LandmarksFile import LandmarkTables  # needs numpy, so only imported if this mode is used.
+                self.landmark_tables = LandmarkTables.load_or_build(self, progress=progress)
+                if self.landmark_tables is None:
+                    return None  # cancelled while the tables were being built.
+            estimate = self.landmark_tables.make_heuristic(start, goal, metric)
+        else:
+            estimate = None
+
+        best_cost = {start: 0.0}
+        arrived_by = {start: -1}  # city id -> index (in self.edges) of the edge we used to get there.
+        finished = set()
+        frontier = [(estimate(start) if estimate else 0.0, 0.0, start)]
+        found = False
+        if progress is not None:
+            progress.frontiers = (frontier,)
+        while frontier:
+            if stats is not None:
+                # the queue only grows between pops, so its size just before each pop covers its peak.
+                stats.pops += 1
+                stats.peak_frontier = max(stats.peak_frontier, len(frontier))
+            priority, cost, city = heapq.heappop(frontier)
+            if city in finished:
+                continue  # a stale entry - we already found a better way here.
+            if city == goal:
+                found = True
+                break
+            finished.add(city)
+            self.cities_expanded += 1
+            if progress is not None:
+                if progress.cancelled:
+                    return None
+                progress.settled.append((city, arrived_by[city]))
+            for slot in range(offsets[city], offsets[city + 1]):
+                neighbor = neighbor_cities[slot]
+                new_cost = cost + neighbor_costs[slot]
+                if neighbor not in finished and new_cost < best_cost.get(neighbor, math.inf):
+                    best_cost[neighbor] = new_cost
+                    arrived_by[neighbor] = neighbor_edge_ids[slot]
+                    heapq.heappush(frontier, (new_cost + estimate(neighbor) if estimate else new_cost,
+                                              new_cost, neighbor))
+
+        if stats is not None:
+            self.tally_search(stats, len(frontier), len(best_cost), (finished,), found)
+        if not found:
+            return None
+        return self.trace_compact_path(arrived_by, start, goal) if compact else self.trace_path(arrived_by, start, goal)
+
+    def bidirectional_search(self, start: int, goal: int, metric: SearchMetric, stats: Optional[SearchStats] = None,
+                             progress: Optional[SearchProgress] = None, compact: bool = False) \
+            -> Optional[List[Edge_Data]]:
+        """
+        Dijkstra's algorithm run from both ends at once, always advancing whichever side has the cheaper frontier.
+        Every time one side looks along an edge to a city the other side has reached, that gives a complete path; we
+        stop once the cheapest frontier costs of the two sides add up to at least the best such path, since no path
+        found after that could be cheaper. Counts of the cities settled by each side are left in
+        self.cities_settled_forward and self.cities_settled_backward.
+        :param start: the city to travel from
+        :param goal: the city to travel to
+        :param metric: whether to minimize distance or time
+        :param stats: where to count the search's work, or None not to
+        :param progress: where to report the search's progress (and check for cancellation), or None not to
+        :param compact: whether to give the path as a CompactPath rather than a list
+        :return: the edges from start to goal in travel order, or None if there is no path.
+        """
+        if start == goal:
+            return self.path_from_edge_ids(start, [], compact)
+        offsets = self.neighbor_offsets
+        neighbor_cities = self.neighbor_cities
+        neighbor_edge_ids = self.neighbor_edge_ids
+        neighbor_costs = self.neighbor_distances if metric == SearchMetric.DISTANCE else self.neighbor_times
+
+        # index 0 is the search from the start, index 1 the search from the goal.
+        best_cost = ({start: 0.0}, {goal: 0.0})
+        arrived_by = ({start: -1}, {goal: -1})
+        finished = (set(), set())
+        frontiers = ([(0.0, start)], [(0.0, goal)])
+        settled = [0, 0]
+        shortest = math.inf
+        meeting = None  # (city reached from the start, index of the edge joining them, city reached from the goal)
+        if progress is not None:
+            progress.frontiers = frontiers
+        while frontiers[0] and frontiers[1]:
+            if frontiers[0][0][0] + frontiers[1][0][0] >= shortest:
+                break
+            side = 0 if frontiers[0][0][0] <= frontiers[1][0][0] else 1
+            if stats is not None:
+                stats.pops += 1
+                stats.peak_frontier = max(stats.peak_frontier, len(frontiers[0]) + len(frontiers[1]))
+            cost, city = heapq.heappop(frontiers[side])
+            if city in finished[side]:
+                continue
+            finished[side].add(city)
+            settled[side] += 1
+            if progress is not None:
+                if progress.cancelled:
+                    return None
+                progress.settled.append((city, arrived_by[side][city]))
+            other_best_cost = best_cost[1 - side]
+            for slot in range(offsets[city], offsets[city + 1]):
+                neighbor = neighbor_cities[slot]
+                new_cost = cost + neighbor_costs[slot]
+                if neighbor not in finished[side] and new_cost < best_cost[side].get(neighbor, math.inf):
+                    best_cost[side][neighbor] = new_cost
+                    arrived_by[side][neighbor] = neighbor_edge_ids[slot]
+                    heapq.heappush(frontiers[side], (new_cost, neighbor))
+                if neighbor in other_best_cost and new_cost + other_best_cost[neighbor] < shortest:
+                    shortest = new_cost + other_best_cost[neighbor]
+                    if side == 0:
+                        meeting = (city, neighbor_edge_ids[slot], neighbor)
+                    else:
+                        meeting = (neighbor, neighbor_edge_ids[slot], city)
+
+        self.cities_settled_forward, self.cities_settled_backward = settled
+        self.cities_expanded = settled[0] + settled[1]
+        if stats is not None:
+            self.tally_search(stats, len(frontiers[0]) + len(frontiers[1]), len(best_cost[0]) + len(best_cost[1]),
+                              finished, False)
+        if meeting is None:
+            return None
+        forward_city, edge_id, backward_city = meeting
+        edge_ids = self.trace_edge_ids(arrived_by[0], start, forward_city)
+        edge_ids.append(edge_id)
+        back_half = self.trace_edge_ids(arrived_by[1], goal, backward_city)
+        back_half.reverse()
+        return self.path_from_edge_ids(start, edge_ids + back_half, compact)
+
+    def pareto_search(self) -> List[List[Edge_Data]]:
+        """
+        finds every "best trade-off" path from self.first_city_id to self.second_city_id in one pass: each path in the
+        result is shorter than every faster one and faster than every shorter one, and no other path beats any of them
+        on both distance and time at once. (The first one is the shortest path; the last one is the fastest.)
+        This is a label-setting search: a city may be reached several times, by paths that trade distance against
+        time, and labels are taken off the queue in order of (distance, time). So a new label at a city is dominated
+        exactly when some label already settled there - which is no longer - is at least as fast. Labels that are no
+        faster than the best path already found to the goal are dropped as well, which keeps the search bounded.
+        :return: the list of paths (each a list of edges in travel order), in order of increasing distance and
+        decreasing time; empty if there is no path at all.
+        """
+        start = self.first_city_id
+        goal = self.second_city_id
+        offsets = self.neighbor_offsets
+        if start < 0 or goal < 0 or start + 1 >= len(offsets) or goal + 1 >= len(offsets):
+            return []
+        neighbor_cities = self.neighbor_cities
+        neighbor_edge_ids = self.neighbor_edge_ids
+        neighbor_distances = self.neighbor_distances
+        neighbor_times = self.neighbor_times
+
+        labels: List[Tuple[int, int, int]] = [(-1, -1, start)]  # (parent label, edge index, city) for each label
+        fastest_settled: Dict[int, float] = {}  # city id -> the least time of any label settled there so far
+        frontier = [(0.0, 0.0, 0)]  # (distance, time, label number)
+        goal_labels = []
+        while frontier:
+            distance, time, label = heapq.heappop(frontier)
+            city = labels[label][2]
+            if time >= fastest_settled.get(city, math.inf) or time >= fastest_settled.get(goal, math.inf):
+                continue  # dominated by a label that is at least as short and at least as fast.
+            fastest_settled[city] = time
+            if city == goal:
+                goal_labels.append(label)
+                continue
+            for slot in range(offsets[city], offsets[city + 1]):
+                neighbor = neighbor_cities[slot]
+                new_time = time + neighbor_times[slot]
+                if new_time < fastest_settled.get(neighbor, math.inf) and new_time < fastest_settled.get(goal, math.inf):
+                    labels.append((label, neighbor_edge_ids[slot], neighbor))
+                    heapq.heappush(frontier, (distance + neighbor_distances[slot], new_time, len(labels) - 1))
+
+        result = []
+        for label in goal_labels:
+            path: List[Edge_Data] = []
+            while labels[label][0] >= 0:
+                path.append(self.edges[labels[label][1]])
+                label = labels[label][0]
+            path.reverse()
+            result.append(path)
+        return result
+
+    def alternative_routes(self, k: int = 3, metric: SearchMetric = SearchMetric.DISTANCE,
+                           max_overlap: Optional[float] = None, max_detour: Optional[float] = None) \
+            -> List[List[Edge_Data]]:
+        """
+        finds up to k different loopless paths from self.first_city_id to self.second_city_id, cheapest first - the
+        shortest path, then the best alternatives to it. See AlternativeRoutesFile.py.
+        :param k: how many paths to find
+        :param metric: whether to minimize distance or time
+        :param max_overlap: if given, leave out paths that spend more than this fraction of their cost on roads
+        an earlier path in the result uses
+        :param max_detour: if given, leave out paths that cost more than this multiple of the cheapest
+        :return: the list of paths (each a list of edges in travel order); empty if there is no path at all.
+        """
+        from AlternativeRoutesFile import AlternativeRoutes
+        return AlternativeRoutes(self, self.first_city_id, self.second_city_id, metric).find(k, max_overlap,
+                                                                                              max_detour)
+
+    def shortest_path_tree(self, source: int, metric: SearchMetric = SearchMetric.DISTANCE,
+                           targets: Optional[Iterable[int]] = None) -> Tuple[Dict[int, float], Dict[int, int]]:
+        """
+        runs Dijkstra's algorithm outward from one city, without touching self.first_city_id, self.second_city_id or
+        any other state - so it is safe to call for many sources at once.
+        :param source: the city to start from
+        :param metric: whether to minimize distance or time
+        :param targets: if given, stop as soon as all of these cities have been settled; otherwise explore everything
+        reachable.
+        :return: two dictionaries covering (at least) every settled city: city id -> cheapest cost from the source, and
+        city id -> index (in self.edges) of the edge used to reach it (-1 for the source). Feed the second one to
+        trace_path() to get a path.
+        """
+        offsets = self.neighbor_offsets
+        if source < 0 or source + 1 >= len(offsets):
+            return {}, {}
+        remaining = None if targets is None else set(targets)
+        neighbor_cities = self.neighbor_cities
+        neighbor_edge_ids = self.neighbor_edge_ids
+        neighbor_costs = self.neighbor_distances if metric == SearchMetric.DISTANCE else self.neighbor_times
+
+        best_cost = {source: 0.0}
+        arrived_by = {source: -1}
+        finished = set()
+        frontier = [(0.0, source)]
+        while frontier:
+            cost, city = heapq.heappop(frontier)
+            if city in finished:
+                continue
+            finished.add(city)
+            if remaining is not None:
+                remaining.discard(city)
+                if not remaining:
+                    break
+            for slot in range(offsets[city], offsets[city + 1]):
+                neighbor = neighbor_cities[slot]
+                new_cost = cost + neighbor_costs[slot]
+                if neighbor not in finished and new_cost < best_cost.get(neighbor, math.inf):
+                    best_cost[neighbor] = new_cost
+                    arrived_by[neighbor] = neighbor_edge_ids[slot]
+                    heapq.heappush(frontier, (new_cost, neighbor))
+        return best_cost, arrived_by
+
+    def reachable_within(self, origins: Iterable[int], budget: float, metric: SearchMetric = SearchMetric.TIME) \
+            -> Tuple[Dict[int, float], Dict[int, int]]:
+        """
+        finds everything within budget of any of the origins ("where can we get to in 30 minutes from either depot?")
+        with a single Dijkstra search seeded from all of them at once. The search never expands past the budget, so
+        it costs about as much as the area it covers, not the whole map.
+        :param origins: the cities to start from
+        :param budget: the most it may cost (in meters or seconds, depending on metric) to reach a city
+        :param metric: whether the budget is a distance or a time
+        :return: two dictionaries covering exactly the cities within budget: city id -> cheapest cost from any origin,
+        and city id -> the origin that reaches it that cheaply.
+        """
+        offsets = self.neighbor_offsets
+        neighbor_cities = self.neighbor_cities
+        neighbor_costs = self.neighbor_distances if metric == SearchMetric.DISTANCE else self.neighbor_times
+
+        best_cost: Dict[int, float] = {}
+        served_by: Dict[int, int] = {}
+        frontier = []
+        for origin in origins:
+            if 0 <= origin and origin + 1 < len(offsets) and budget >= 0 and origin not in best_cost:
+                best_cost[origin] = 0.0
+                served_by[origin] = origin
+                frontier.append((0.0, origin, origin))
+        heapq.heapify(frontier)
+        finished = set()
+        while frontier:
+            cost, city, origin = heapq.heappop(frontier)
+            if city in finished:
+                continue
+            finished.add(city)
+            for slot in range(offsets[city], offsets[city + 1]):
+                neighbor = neighbor_cities[slot]
+                new_cost = cost + neighbor_costs[slot]
+                if new_cost <= budget and neighbor not in finished and new_cost < best_cost.get(neighbor, math.inf):
+                    best_cost[neighbor] = new_cost
+                    served_by[neighbor] = origin
+                    heapq.heappush(frontier, (new_cost, neighbor, origin))
+        return best_cost, served_by
+
+    def make_heuristic(self, goal: int, metric: SearchMetric):
+        """
+        builds the A* estimate for the given goal: the straight-line pixel distance from a city to the goal, times
+        the calibrated scale for the metric (see calibrate_heuristic()).
+        :param goal: the id of the city we are heading for
+        :param metric: distance or time
+        :return: a function that takes a city id and returns a lower bound on the cost from there to the goal.
+        """
+        scale = self.heuristic_scales[metric]
+        vertices = self.vertices
+        if scale == 0 or goal >= len(vertices):
+            return lambda city: 0.0
+        goal_x = vertices[goal][3]
+        goal_y = vertices[goal][4]
+
+        if hasattr(vertices, "xs"):
+            # array-backed cities: read the coordinates directly, rather than building a City_Data for every lookup.
+            xs = vertices.xs
+            ys = vertices.ys
+            num_cities = len(xs)
+
+            def estimate_from_arrays(city: int) -> float:
+                if city >= num_cities:
+                    return 0.0
+                return scale * math.hypot(xs[city] - goal_x, ys[city] - goal_y)
+            return estimate_from_arrays
+
+        def estimate(city: int) -> float:
+            if city >= len(vertices):
+                return 0.0
+            return scale * math.hypot(vertices[city][3] - goal_x, vertices[city][4] - goal_y)
+        return estimate
+
+    def trace_compact_path(self, arrived_by: dict, start: int, goal: int):
+        """
+        like trace_path(), but gives a CompactPath (see CompactPathFile.py): the cities and edge indices as integer
+        arrays, with the totals, instead of a list of tuples.
+        """
+        from CompactPathFile import CompactPath
+        return CompactPath.from_arrived_by(self, arrived_by, start, goal)
+
+    def trace_path(self, arrived_by: dict, start: int, goal: int) -> List[Edge_Data]:
+        """
+        walks back from the goal to the start, following the edge each city was reached by.
+        :param arrived_by: city id -> index (in self.edges) of the edge the search used to reach that city
+        :param start: the city the search began at
+        :param goal: the city the search ended at
+        :return: the edges from start to goal, in travel order.
+        """
+        return [self.edges[edge_id] for edge_id in self.trace_edge_ids(arrived_by, start, goal)]
+
+    def trace_edge_ids(self, arrived_by: dict, start: int, goal: int) -> List[int]:
+        """
+        like trace_path(), but gives the indices (in self.edges) of the edges, rather than the edges themselves.
+        """
+        edge_ids: List[int] = []
+        city = goal
+        while city != start:
+            edge_id = arrived_by[city]
+            edge = self.edges[edge_id]
+            edge_ids.append(edge_id)
+            city = edge[0] if edge[1] == city else edge[1]
+        edge_ids.reverse()
+        return edge_ids
+
+    def path_from_edge_ids(self, start: int, edge_ids: List[int], compact: bool = False):
+        """
+        :param start: the city the path begins at
+        :param edge_ids: the indices (in self.edges) of the path's edges, in travel order
+        :param compact: whether to give a CompactPath rather than a list of Edge_Data
+        :return: the path, in the form asked for.
+        """
+        if compact:
+            from CompactPathFile import CompactPath
+            return CompactPath.from_edge_ids(self, start, edge_ids)
+        return [self.edges[edge_id] for edge_id in edge_ids]
+    # =========================================================================================
+
+    def find_closest_city(self, pos: Tuple[int, int]) -> int:
+        """
+        identifies which city is closest to the coordinate given.
+        :param pos: the coordinate of interest (x,y)
+        :return: the index of the closest city.
+        """
+        if self.city_tree is None:
+            self.build_spatial_index()
+        return self.city_tree.nearest(pos[0], pos[1])
+
+    def snap_points(self, points):
+        """
+        identifies the closest city to each of a whole batch of points at once.
+        :param points: an N x 2 numpy array of (x, y) coordinates
+        :return: a numpy array of the N indices of the closest cities.
+        """
+        if self.city_tree is None:
+            self.build_spatial_index()
+        if self.city_grid is None:
+            from PointSnappingFile import CityGrid  # needs numpy, so only imported if this is used.
+            self.city_grid = CityGrid(self.vertices, self.city_tree)
+        return self.city_grid.snap(points)
@@ -0,0 +1,127 @@
+from typing import List, Optional, Tuple
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+from RoutingServiceFile import RoutingService, DEFAULT_HOST, DEFAULT_PORT
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    :param sorted_values: the values, in increasing order
+    :param fraction: which percentile, as a fraction (0.99 for p99)
+    :return: the smallest value that at least that fraction of the values are no bigger than.
+    """
+    if not sorted_values:
+        return 0.0
+    position = max(0, min(len(sorted_values) - 1, int(-(-fraction * len(sorted_values) // 1)) - 1))
+    return sorted_values[position]
+
+
+async def fetch_json(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target: str) -> Tuple[int, dict]:
+    """
+    sends one GET request over an open keep-alive connection and reads the JSON response.
+    :return: (the HTTP status, the response)
+    """
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def run_level(host: str, port: int, targets: List[str], concurrency: int) -> List[float]:
+    """
+    sends every request in targets, from `concurrency` clients at once, each with its own connection and each sending
+    its next request as soon as the last one is answered.
+    :return: the latency of each request, in seconds
+    """
+    queue = list(reversed(targets))
+    latencies: List[float] = []
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while queue:
+                target = queue.pop()
+                start_time = time.perf_counter()
+                status, _ = await fetch_json(reader, writer, target)
+                latencies.append(time.perf_counter() - start_time)
+                if status != 200:
+                    raise RuntimeError(f"{target} failed with status {status}.")
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies
+
+
+async def run_load_test(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                        concurrency_levels: Tuple[int, ...] = (1, 4, 16, 64), requests_per_level: int = 2000,
+                        repeat_fraction: float = 0.25, seed: int = 0):
+    """
+    fires a mix of route and closest-city requests at a running RoutingService at each concurrency level in turn, and
+    prints the median and 99th-percentile latency and the overall requests per second.
+    :param host: where the service is listening
+    :param port: the service's port
+    :param concurrency_levels: how many clients to run at once, for each round
+    :param requests_per_level: how many requests to send in each round
+    :param repeat_fraction: about what fraction of route requests repeat a popular route (which is what lets the
+    service coalesce requests)
+    :param seed: the random seed, so that runs are comparable
+    :return: None
+    """
+    generator = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    _, health = await fetch_json(reader, writer, "/health")
+    writer.close()
+    num_cities = health["cities"]
+    popular = [(generator.randrange(num_cities), generator.randrange(num_cities)) for _ in range(5)]
+
+    print(f"{'clients':>8} {'requests':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'req/s':>9}")
+    for concurrency in concurrency_levels:
+        targets = []
+        for _ in range(requests_per_level):
+            if generator.random() < 0.1:
+                targets.append(f"/closest?x={generator.randrange(1200)}&y={generator.randrange(800)}")
+                continue
+            if generator.random() < repeat_fraction:
+                first, second = generator.choice(popular)
+            else:
+                first, second = generator.randrange(num_cities), generator.randrange(num_cities)
+            metric = generator.choice(("distance", "time"))
+            targets.append(f"/route?from={first}&to={second}&metric={metric}")
+
+        start_time = time.perf_counter()
+        latencies = sorted(await run_level(host, port, targets, concurrency))
+        elapsed = time.perf_counter() - start_time
+        print(f"{concurrency:>8} {len(latencies):>9} {1000 * statistics.median(latencies):>9.2f} "
+              f"{1000 * percentile(latencies, 0.99):>9.2f} {len(latencies) / elapsed:>9.0f}")
+
+
+async def main(port: Optional[int]):
+    # with no port given, start a service of our own on a free port for the length of the test.
+    if port is not None:
+        await run_load_test(DEFAULT_HOST, port)
+        return
+    service = RoutingService()
+    host, port = await service.start(DEFAULT_HOST, 0)
+    try:
+        await run_load_test(host, port)
+        print(f"{service.searches_run} searches run; {service.coalesced} requests shared a search already under way.")
+    finally:
+        await service.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else None))
@@ -0,0 +1,291 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+import asyncio
+import json
+import os
+import sys
+
+from RoutingEngineFile import RoutingEngine, Edge_Data, SearchMetric, SearchMode
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 64 * 1024
+
+Route_Key = Tuple[int, int, SearchMetric, SearchMode]  # (first city id, second city id, metric, mode)
+
+# the engine each worker process searches in, set once by _start_worker() rather than sent along with every request.
+_worker_engine: Optional[RoutingEngine] = None
+
+
+def _start_worker(engine: RoutingEngine):
+    """
+    runs once in each worker process of the pool to give it the engine.
+    :param engine: the engine to search in
+    :return: None
+    """
+    global _worker_engine
+    _worker_engine = engine
+
+
+def _route_in_worker(key: Route_Key) -> Tuple[Optional[List[Edge_Data]], str]:
+    # each worker process handles one request at a time, so it may use its own engine's selected cities freely.
+    first_city_id, second_city_id, metric, mode = key
+    _worker_engine.first_city_id = first_city_id
+    _worker_engine.second_city_id = second_city_id
+    path = _worker_engine.perform_search(metric, mode)
+    return path, _worker_engine.describe_path(path)
+
+
+class RequestError(Exception):
+    """
+    a request the service can't answer, along with the HTTP status to answer it with.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class RoutingService:
+    """
+    A small HTTP/JSON front end to RoutingEngine, for reaching perform_search(), describe_path() and
+    find_closest_city() from other programs instead of by clicking on the map. It only listens on localhost.
+
+        GET /route?from=21&to=93&metric=distance&mode=a_star  ->  {"found", "path", "cities", "description", ...}
+        GET /closest?x=300&y=200                              ->  {"city_id", "name", "state", "x", "y"}
+        GET /health                                           ->  {"status": "ok", ...}
+
+    (The same parameters may also be POSTed as a JSON object.) The graph is loaded once, at startup. Searches run in a
+    pool of worker processes, each with its own copy of the engine, so the event loop is never blocked by one; and
+    identical route requests that arrive while the first of them is still being searched all wait for that one search
+    instead of starting their own. Closest-city lookups are quick enough to answer on the event loop directly.
+    """
+
+    def __init__(self, engine: Optional[RoutingEngine] = None, processes: Optional[int] = None):
+        """
+        :param engine: the engine to answer from; by default, one loaded from the usual data files.
+        :param processes: how many worker processes to search in; defaults to the number of CPUs.
+        """
+        self.engine = engine if engine is not None else RoutingEngine()
+        self.processes = processes if processes is not None else (os.cpu_count() or 1)
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.in_flight: Dict[Route_Key, asyncio.Future] = {}  # searches that have started, but not yet finished
+        self.connections: Dict[asyncio.StreamWriter, asyncio.Task] = {}  # open client connections -> their handlers
+
+        self.requests_served = 0
+        self.searches_run = 0
+        self.coalesced = 0  # route requests answered by a search that was already under way
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> Tuple[str, int]:
+        """
+        starts the worker pool and begins listening.
+        :param host: the address to listen on
+        :param port: the port to listen on; 0 picks any free port.
+        :return: the (host, port) actually being listened on.
+        """
+        self.pool = ProcessPoolExecutor(max_workers=self.processes, initializer=_start_worker,
+                                        initargs=(self.engine,))
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        """
+        stops listening and shuts the worker pool down.
+        :return: None
+        """
+        if self.server is not None:
+            self.server.close()
+            # closing the connections lets their handlers see the end of the stream and finish normally.
+            handlers = list(self.connections.values())
+            for writer in list(self.connections):
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    async def serve_forever(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """
+        runs the service until the task is cancelled (for instance, by Ctrl-C under asyncio.run()).
+        :return: None
+        """
+        host, port = await self.start(host, port)
+        print(f"Routing service listening on http://{host}:{port}/")
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    # ============================================================================ QUERIES
+    async def find_route(self, first_city_id: int, second_city_id: int, metric: SearchMetric = SearchMetric.DISTANCE,
+                         mode: SearchMode = SearchMode.DIJKSTRA) -> Tuple[Optional[List[Edge_Data]], str]:
+        """
+        finds the shortest path between two cities in the worker pool, sharing the search with any identical request
+        that is already waiting on one.
+        :return: (the path, as perform_search() would return it; its describe_path() description)
+        """
+        key = (first_city_id, second_city_id, metric, mode)
+        if key in self.in_flight:
+            self.coalesced += 1
+            return await asyncio.shield(self.in_flight[key])
+
+        future = asyncio.get_running_loop().run_in_executor(self.pool, _route_in_worker, key)
+        self.in_flight[key] = future
+        self.searches_run += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self.in_flight.get(key) is future:
+                del self.in_flight[key]
+
+    def route_parameters(self, parameters: Dict[str, str]) -> Route_Key:
+        """
+        checks the parameters of a /route request.
+        :return: the search they ask for, as (first city id, second city id, metric, mode)
+        """
+        first_city_id = self.city_parameter(parameters, "from")
+        second_city_id = self.city_parameter(parameters, "to")
+        metric_name = parameters.get("metric", "distance").upper()
+        mode_name = parameters.get("mode", "dijkstra").upper()
+        if metric_name not in SearchMetric.__members__:
+            raise RequestError(400, f"Unknown metric '{parameters['metric']}'.")
+        if mode_name not in SearchMode.__members__:
+            raise RequestError(400, f"Unknown mode '{parameters['mode']}'.")
+        return first_city_id, second_city_id, SearchMetric[metric_name], SearchMode[mode_name]
+
+    def city_parameter(self, parameters: Dict[str, str], name: str) -> int:
+        try:
+            city_id = int(parameters[name])
+        except KeyError:
+            raise RequestError(400, f"Missing parameter '{name}'.")
+        except ValueError:
+            raise RequestError(400, f"Parameter '{name}' should be a city id.")
+        if not 0 <= city_id < len(self.engine.vertices):
+            raise RequestError(404, f"There is no city {city_id}.")
+        return city_id
+
+    async def answer(self, method: str, target: str, body: bytes) -> dict:
+        """
+        works out the JSON response to one HTTP request.
+        :param method: "GET" or "POST"
+        :param target: the path and query string, e.g. "/route?from=21&to=93"
+        :param body: the request body (a JSON object of parameters, for POST)
+        :return: the response, as a dictionary to send as JSON
+        """
+        url = urlsplit(target)
+        parameters = dict(parse_qsl(url.query))
+        if method == "POST" and body:
+            try:
+                posted = json.loads(body)
+            except ValueError:
+                raise RequestError(400, "The body should be a JSON object.")
+            if not isinstance(posted, dict):
+                raise RequestError(400, "The body should be a JSON object.")
+            parameters.update({name: str(value) for name, value in posted.items()})
+        elif method not in ("GET", "POST"):
+            raise RequestError(405, f"Method {method} is not supported.")
+
+        if url.path == "/route":
+            key = self.route_parameters(parameters)
+            path, description = await self.find_route(*key)
+            cities = [key[0]]
+            for edge in path or []:
+                cities.append(edge[1] if edge[0] == cities[-1] else edge[0])
+            return {"found": path is not None,
+                    "path": [list(edge) for edge in path] if path is not None else None,
+                    "cities": cities if path is not None else None,
+                    "total_distance": sum(edge[2] for edge in path) if path is not None else None,
+                    "total_time": sum(edge[3] for edge in path) if path is not None else None,
+                    "description": description}
+        if url.path == "/closest":
+            try:
+                x, y = float(parameters["x"]), float(parameters["y"])
+            except (KeyError, ValueError):
+                raise RequestError(400, "Parameters 'x' and 'y' should be numbers.")
+            city_id = self.engine.find_closest_city((x, y))
+            city = self.engine.vertices[city_id]
+            return {"city_id": city_id, "name": city[1], "state": city[2], "x": city[3], "y": city[4]}
+        if url.path == "/health":
+            return {"status": "ok", "cities": len(self.engine.vertices), "connections": len(self.engine.edges),
+                    "requests_served": self.requests_served, "searches_run": self.searches_run,
+                    "coalesced": self.coalesced}
+        raise RequestError(404, f"Nothing at {url.path}.")
+    # =========================================================================================
+
+    # ============================================================================ HTTP
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        reads requests from one client connection and answers them in turn, until the client closes it (or asks to,
+        with "Connection: close").
+        """
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.send(writer, 400, {"error": "Malformed request line."}, keep_alive=False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.send(writer, 400, {"error": "Malformed Content-Length."}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.send(writer, 413, {"error": "The body is too large."}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length > 0 else b""
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+                try:
+                    status, response = 200, await self.answer(method.upper(), target, body)
+                except RequestError as err:
+                    status, response = err.status, {"error": str(err)}
+                except Exception as err:  # a search that failed shouldn't take the connection down with it.
+                    status, response = 500, {"error": f"{type(err).__name__}: {err}"}
+                self.requests_served += 1
+                await self.send(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.pop(writer, None)
+            writer.close()
+
+    @staticmethod
+    async def send(writer: asyncio.StreamWriter, status: int, response: dict, keep_alive: bool):
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                   413: "Payload Too Large", 500: "Internal Server Error"}
+        body = json.dumps(response).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {reasons.get(status, 'Error')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+    # =========================================================================================
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    try:
+        asyncio.run(RoutingService().serve_forever(DEFAULT_HOST, port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from RoutingLoadTestFile import fetch_json, percentile
+from RoutingServiceFile import RoutingService
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
+
+
+class RoutingServiceTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # a copy of the data files in a folder of its own, so that the precomputed tables the workers save (next to
+        # the connection file) start out missing every time, and are never left in the repository.
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        for name in ("City Data with coords.txt", "connections.txt"):
+            shutil.copy(name, self.folder)
+        self.engine = RoutingEngine(os.path.join(self.folder, "City Data with coords.txt"),
+                                    os.path.join(self.folder, "connections.txt"))
+
+    def fresh_route(self, first, second, metric=SearchMetric.DISTANCE):
+        self.engine.first_city_id = first
+        self.engine.second_city_id = second
+        path = self.engine.perform_search(metric)
+        description = self.engine.describe_path(path)
+        self.engine.first_city_id = -1
+        self.engine.second_city_id = -1
+        return path, description
+
+    def run_with_service(self, test):
+        async def run():
+            service = RoutingService(self.engine, processes=2)
+            host, port = await service.start("127.0.0.1", 0)
+            try:
+                await test(service, host, port)
+            finally:
+                await service.stop()
+        asyncio.run(run())
+
+    def test_0_http_queries(self):
+        async def test(service, host, port):
+            reader, writer = await asyncio.open_connection(host, port)
+            status, response = await fetch_json(reader, writer, "/route?from=21&to=93&metric=time")
+            path, description = self.fresh_route(21, 93, SearchMetric.TIME)
+            self.assertEqual(200, status, "The route request should succeed.")
+            self.assertEqual([list(edge) for edge in path], response["path"], "The path should match a fresh search.")
+            self.assertEqual(description, response["description"], "The description should match describe_path().")
+            self.assertEqual(21, response["cities"][0], "The cities should start at the first city.")
+            self.assertEqual(93, response["cities"][-1], "The cities should end at the second city.")
+
+            # the same connection stays open for more requests.
+            status, response = await fetch_json(reader, writer, "/closest?x=300&y=200")
+            self.assertEqual(self.engine.find_closest_city((300, 200)), response["city_id"],
+                             "The closest city should match find_closest_city().")
+            status, response = await fetch_json(reader, writer, "/route?from=21&to=9999")
+            self.assertEqual(404, status, "An unknown city should be a 404.")
+            status, response = await fetch_json(reader, writer, "/route?from=21&to=93&metric=speed")
+            self.assertEqual(400, status, "An unknown metric should be a 400.")
+            writer.close()
+
+            reader, writer = await asyncio.open_connection(host, port)
+            body = json.dumps({"from": 53, "to": 79}).encode("utf-8")
+            writer.write(f"POST /route HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode("latin-1") + body)
+            response = json.loads((await reader.read()).split(b"\r\n\r\n", 1)[1])
+            self.assertEqual([list(edge) for edge in self.fresh_route(53, 79)[0]], response["path"],
+                             "A POSTed request should match a fresh search.")
+            writer.close()
+
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b"POST /route HTTP/1.1\r\nContent-Length: lots\r\n\r\n")
+            self.assertTrue((await reader.read()).startswith(b"HTTP/1.1 400 "), "A bad Content-Length should be a 400.")
+            writer.close()
+            reader, writer = await asyncio.open_connection(host, port)
+            status, response = await fetch_json(reader, writer, "/health")
+            self.assertEqual(200, status, "The service should still be answering.")
+            writer.close()
+        self.run_with_service(test)
+
+    def test_1_coalescing(self):
+        async def test(service, host, port):
+            results = await asyncio.gather(*(service.find_route(21, 93, SearchMetric.DISTANCE, SearchMode.A_STAR)
+                                             for _ in range(5)),
+                                           service.find_route(93, 21))
+            for result in results[:5]:
+                self.assertEqual(self.fresh_route(21, 93), result, "Every coalesced request should get the answer.")
+            self.assertEqual((2, 4), (service.searches_run, service.coalesced),
+                             "Identical requests in flight should share one search.")
+            self.assertEqual({}, service.in_flight, "Finished searches should be forgotten.")
+            await service.find_route(21, 93, SearchMetric.DISTANCE, SearchMode.A_STAR)
+            self.assertEqual(3, service.searches_run, "A request after the search finished should search again.")
+
+            # every worker builds and saves the precomputed tables for itself, all at the same time.
+            for mode, file_name in ((SearchMode.ALL_PAIRS_TABLE, "all_pairs_tables.npz"),
+                                    (SearchMode.LANDMARKS, "landmarks.npz")):
+                self.assertFalse(os.path.exists(os.path.join(self.folder, file_name)), "No tables should be saved yet.")
+                results = await asyncio.gather(*(service.find_route(first, 93, SearchMetric.TIME, mode)
+                                                 for first in (21, 53, 95, 4)))
+                for first, result in zip((21, 53, 95, 4), results):
+                    self.assertEqual(self.fresh_route(first, 93, SearchMetric.TIME), result,
+                                     f"{mode.name} in the workers should match a fresh search.")
+                self.assertTrue(os.path.exists(os.path.join(self.folder, file_name)), "The tables should be saved.")
+        self.run_with_service(test)
+
+    def test_2_percentile(self):
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual(50.0, percentile(values, 0.5))
+        self.assertEqual(99.0, percentile(values, 0.99))
+        self.assertEqual(100.0, percentile(values, 1.0))
+        self.assertEqual(1.0, percentile([1.0], 0.99))
+
+
+if __name__ == '__main__':
+    unittest.main()
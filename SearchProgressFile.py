@@ -0,0 +1,96 @@
+from threading import Event, Thread
+from typing import List, Optional, Sequence, Tuple
+
+
+class SearchProgress:
+    """
+    A window into a search while it runs, usually on another thread (see BackgroundSearch). The search appends each
+    city it settles to `settled`, along with the index of the edge it arrived by, and points `frontiers` at its live
+    priority queue(s) - so another thread can draw the search as it spreads. Setting `cancelled` (with cancel()) makes
+    the search give up at the next city it settles.
+
+    Only the search writes to this object (apart from cancel()); readers should treat settled as append-only and take
+    list(...) copies of the frontiers rather than iterating over them while the search changes them.
+    """
+
+    def __init__(self):
+        self.settled: List[Tuple[int, int]] = []  # (city id, index of the edge it was reached by, or -1), in order
+        self.frontiers: Sequence[list] = ()  # the search's heap(s); the last item of each entry is a city id
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        asks the search to stop as soon as possible.
+        :return: None
+        """
+        self.cancelled = True
+
+    def frontier_cities(self) -> List[int]:
+        """
+        :return: the cities currently waiting in the search's priority queue(s) (possibly with repeats).
+        """
+        return [entry[-1] for frontier in self.frontiers for entry in list(frontier)]
+
+
+class BackgroundSearch:
+    """
+    runs one perform_search() (and describe_path() of the result) on a worker thread, so that whoever started it -
+    typically the UI loop - can keep drawing progress and handling clicks in the meantime.
+    """
+
+    def __init__(self, engine, metric, mode):
+        """
+        :param engine: the RoutingEngine to search in; its first_city_id and second_city_id should be set, and left
+        alone until the search is done (or cancelled).
+        :param metric: the SearchMetric to minimize
+        :param mode: the SearchMode to use
+        """
+        self.engine = engine
+        self.metric = metric
+        self.mode = mode
+        self.progress = SearchProgress()
+        self.path = None
+        self.description: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.finished = Event()
+        self.thread = Thread(target=self._run, name="search", daemon=True)
+
+    def start(self) -> "BackgroundSearch":
+        self.thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.path = self.engine.perform_search(self.metric, self.mode, self.progress)
+            if not self.progress.cancelled:
+                self.description = self.engine.describe_path(self.path)
+        except BaseException as err:  # handed to whoever collects the result, rather than lost with the thread.
+            self.error = err
+        finally:
+            self.finished.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.progress.cancelled
+
+    def is_done(self) -> bool:
+        return self.finished.is_set()
+
+    def cancel(self, timeout: Optional[float] = 1.0):
+        """
+        stops the search and waits (up to timeout seconds) for the worker thread to notice, so that the engine's
+        selected cities can safely be changed afterwards.
+        :return: None
+        """
+        self.progress.cancel()
+        self.finished.wait(timeout)
+
+    def result(self, timeout: Optional[float] = None) -> Tuple[Optional[list], Optional[str]]:
+        """
+        waits for the search to finish.
+        :return: (the path, or None; its description, or None if the search was cancelled)
+        """
+        self.finished.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.path, self.description
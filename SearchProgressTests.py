@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from AllPairsTablesFile import AllPairsTables
+from LandmarksFile import LandmarkTables
+from MapConnectorFile import ClickHandlerMode, MapConnector
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
+from SearchProgressFile import BackgroundSearch, SearchProgress
+
+
+class SearchProgressTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # the data files are copied to a folder of their own, so that the tables the precomputed modes save next to
+        # them are built afresh by every run, and never left in the repository.
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        for name in ("City Data with coords.txt", "connections.txt"):
+            shutil.copy(name, folder.name)
+        self.engine = RoutingEngine(os.path.join(folder.name, "City Data with coords.txt"),
+                                    os.path.join(folder.name, "connections.txt"))
+        self.engine.first_city_id = 21  # Miami
+        self.engine.second_city_id = 93  # Montpelier
+
+    def test_0_progress_reports_settled_cities(self):
+        for mode in (SearchMode.DIJKSTRA, SearchMode.A_STAR, SearchMode.BIDIRECTIONAL):
+            expected = self.engine.perform_search(SearchMetric.TIME, mode)
+            progress = SearchProgress()
+            self.assertEqual(expected, self.engine.perform_search(SearchMetric.TIME, mode, progress),
+                             f"{mode.name}: watching the search shouldn't change its answer.")
+            self.assertEqual(self.engine.cities_expanded, len(progress.settled),
+                             f"{mode.name}: every settled city should be reported.")
+            self.assertEqual(len(progress.settled), len({city for city, _ in progress.settled}),
+                             f"{mode.name}: no city should be settled twice by the same side.")
+            for city, edge_id in progress.settled:
+                if edge_id >= 0:
+                    self.assertIn(city, self.engine.edges[edge_id][:2],
+                                  f"{mode.name}: each city should be reported with an edge that reaches it.")
+            self.assertGreater(len(progress.frontier_cities()), 0, f"{mode.name}: expected a frontier left over.")
+
+    def test_1_cancel(self):
+        progress = SearchProgress()
+        progress.cancel()
+        self.assertIsNone(self.engine.perform_search(progress=progress), "A cancelled search should give up.")
+        self.assertEqual(0, len(progress.settled), "A search cancelled up front should settle nothing.")
+
+        # cancel partway through (as another thread would), once five cities have been settled.
+        class CancelAfter(list):
+            def append(inner_self, item):
+                super().append(item)
+                if len(inner_self) == 5:
+                    progress.cancel()
+        progress = SearchProgress()
+        progress.settled = CancelAfter()
+        self.assertIsNone(self.engine.perform_search(progress=progress), "A cancelled search should give up.")
+        self.assertEqual(5, len(progress.settled), "The search should stop at the next city after cancelling.")
+
+    def test_2_background_search(self):
+        expected = self.engine.perform_search(SearchMetric.DISTANCE, SearchMode.A_STAR)
+        search = BackgroundSearch(self.engine, SearchMetric.DISTANCE, SearchMode.A_STAR).start()
+        path, description = search.result(timeout=10)
+        self.assertTrue(search.is_done())
+        self.assertEqual(expected, path, "The background search should find the same path.")
+        self.assertEqual(self.engine.describe_path(expected), description, "It should describe the path too.")
+        self.assertIsNot(threading.current_thread(), search.thread)
+
+        search = BackgroundSearch(self.engine, SearchMetric.DISTANCE, SearchMode.DIJKSTRA)
+        search.progress.cancel()
+        search.start().cancel(timeout=10)
+        self.assertTrue(search.is_done() and search.cancelled)
+        self.assertEqual((None, None), search.result(), "A cancelled search has no path or description.")
+
+    def test_3_precomputed_modes(self):
+        for mode in (SearchMode.ALL_PAIRS_TABLE, SearchMode.LANDMARKS):
+            expected = self.engine.perform_search(SearchMetric.TIME)
+            progress = SearchProgress()
+            self.assertEqual(expected, self.engine.perform_search(SearchMetric.TIME, mode, progress),
+                             f"{mode.name}: watching the search shouldn't change its answer.")
+            self.assertGreater(len(progress.settled), 0, f"{mode.name}: the settled cities should be reported.")
+            for city, edge_id in progress.settled:
+                if edge_id >= 0:
+                    self.assertIn(city, self.engine.edges[edge_id][:2],
+                                  f"{mode.name}: each city should be reported with an edge that reaches it.")
+            if mode == SearchMode.ALL_PAIRS_TABLE:
+                self.assertEqual([self.engine.edges[edge_id] for _, edge_id in progress.settled[1:]], expected,
+                                 "A table lookup settles just the cities along the path.")
+
+            progress = SearchProgress()
+            progress.cancel()
+            self.assertIsNone(self.engine.perform_search(SearchMetric.TIME, mode, progress),
+                              f"{mode.name}: a cancelled search should give up.")
+
+        # building the tables (which can take a while) stops for a cancellation too.
+        progress = SearchProgress()
+        progress.cancel()
+        self.assertIsNone(AllPairsTables.build(self.engine, progress), "Cancelled tables shouldn't be built.")
+        self.assertIsNone(LandmarkTables.build(self.engine, progress=progress), "Cancelled tables shouldn't be built.")
+
+    def test_4_cancel_while_waiting_for_click(self):
+        connector = MapConnector(show_window=False)
+        connector.click_mode = ClickHandlerMode.SEARCHING
+        connector.perform_search = lambda metric, mode, progress: connector.wait_for_click()
+        connector.start_search()
+        while not connector.waiting_for_click:
+            time.sleep(0.001)
+        search = connector.current_search
+        start_time = time.perf_counter()
+        connector.cancel_search()
+        self.assertLess(time.perf_counter() - start_time, 0.5, "Cancelling shouldn't wait for the paused search.")
+        self.assertTrue(search.is_done(), "The search should have stopped before cancel_search() returned.")
+
+        # a search that steps by clicks pauses again as soon as it is woken, whether or not it checks for cancelling.
+        connector.click_mode = ClickHandlerMode.SEARCHING
+        connector.perform_search = lambda metric, mode, progress: [connector.wait_for_click() for _ in range(100)]
+        connector.start_search()
+        while not connector.waiting_for_click:
+            time.sleep(0.001)
+        search = connector.current_search
+        connector.cancel_search()
+        self.assertTrue(search.is_done(), "A cancelled search shouldn't pause for clicks any more.")
+        self.assertFalse(connector.waiting_for_click, "Nothing should be left waiting for a click.")
+
+
+if __name__ == '__main__':
+    unittest.main()
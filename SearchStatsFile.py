@@ -0,0 +1,65 @@
+from typing import Dict, Optional
+
+
+class SearchStats:
+    """
+    What one route query cost: how much work the search did, and how long each phase of the query took. Filled in by
+    RoutingEngine (and MapConnector, for drawing) when instrumentation is switched on with enable_search_stats().
+
+    The searches use a binary heap with "lazy deletion" rather than a true decrease-key: a city whose cost improves is
+    simply pushed again, and the older, costlier entry is skipped when it is eventually popped. So decrease_keys counts
+    those repeat pushes, and stale_pops the skipped entries.
+    """
+
+    def __init__(self, metric=None, mode=None):
+        """
+        :param metric: the SearchMetric the search minimized
+        :param mode: the SearchMode the search used
+        """
+        self.metric = metric
+        self.mode = mode
+        self.found: Optional[bool] = None  # whether a path was found (None until the search has run)
+        self.path_edges = 0  # how many edges are in the path found
+
+        self.cities_settled = 0  # cities whose cheapest cost became final and whose neighbors were looked at
+        self.edges_relaxed = 0  # edges looked along from settled cities
+        self.pushes = 0  # entries added to the priority queue(s)
+        self.pops = 0  # entries taken off the priority queue(s)
+        self.stale_pops = 0  # entries taken off for cities that had already been settled
+        self.decrease_keys = 0  # pushes for cities that were already in the queue, at a higher cost
+        self.peak_frontier = 0  # the most entries the priority queue(s) held at once
+
+        self.phase_times: Dict[str, float] = {}  # phase name ("search", "describe_path", "render"...) -> seconds
+
+    def add_phase_time(self, phase: str, seconds: float):
+        """
+        records time spent in a phase; repeated phases (drawing twice, say) add up.
+        :return: None
+        """
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + seconds
+
+    def as_dict(self) -> dict:
+        """
+        :return: everything recorded, as a dictionary of plain values (suitable for JSON).
+        """
+        return {"metric": self.metric.name if self.metric is not None else None,
+                "mode": self.mode.name if self.mode is not None else None,
+                "found": self.found,
+                "path_edges": self.path_edges,
+                "cities_settled": self.cities_settled,
+                "edges_relaxed": self.edges_relaxed,
+                "pushes": self.pushes,
+                "pops": self.pops,
+                "stale_pops": self.stale_pops,
+                "decrease_keys": self.decrease_keys,
+                "peak_frontier": self.peak_frontier,
+                "phase_times": dict(self.phase_times)}
+
+    def __str__(self) -> str:
+        phases = ", ".join(f"{phase} {1000 * seconds:.3f} ms" for phase, seconds in self.phase_times.items())
+        return (f"{self.mode.name if self.mode is not None else 'search'} by "
+                f"{self.metric.name.lower() if self.metric is not None else '?'}: "
+                f"{'found' if self.found else 'no path'}, settled {self.cities_settled}, "
+                f"relaxed {self.edges_relaxed}, pushes {self.pushes}, pops {self.pops} ({self.stale_pops} stale), "
+                f"decrease-keys {self.decrease_keys}, peak frontier {self.peak_frontier}"
+                f"{'; ' + phases if phases else ''}")
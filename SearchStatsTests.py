@@ -0,0 +1,69 @@
+import logging
+import unittest
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
+
+
+class SearchStatsTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = RoutingEngine()
+        self.engine.first_city_id = 21  # Miami
+        self.engine.second_city_id = 93  # Montpelier
+
+    def test_0_off_by_default(self):
+        self.engine.perform_search()
+        self.engine.describe_path(self.engine.perform_search())
+        self.assertIsNone(self.engine.search_stats, "Nothing should be recorded unless instrumentation is on.")
+
+    def test_1_counts(self):
+        self.engine.enable_search_stats()
+        for mode in (SearchMode.DIJKSTRA, SearchMode.A_STAR, SearchMode.BIDIRECTIONAL):
+            for metric in SearchMetric:
+                path = self.engine.perform_search(metric, mode)
+                stats = self.engine.search_stats
+                label = f"{mode.name} by {metric.name}"
+                self.assertEqual((metric, mode, True, len(path)),
+                                 (stats.metric, stats.mode, stats.found, stats.path_edges), f"{label}: wrong summary.")
+                self.assertEqual(self.engine.cities_expanded, stats.cities_settled, f"{label}: wrong settled count.")
+                goal_pops = 0 if mode == SearchMode.BIDIRECTIONAL else 1
+                self.assertEqual(stats.pops, stats.cities_settled + stats.stale_pops + goal_pops,
+                                 f"{label}: every pop settles a city, is stale or is the goal.")
+                self.assertGreaterEqual(stats.pushes, stats.pops, f"{label}: more pops than pushes.")
+                self.assertGreaterEqual(stats.decrease_keys, stats.stale_pops,
+                                        f"{label}: each stale pop comes from a decrease-key.")
+                self.assertGreaterEqual(stats.edges_relaxed, stats.cities_settled,
+                                        f"{label}: every settled city here has a connection.")
+                self.assertTrue(0 < stats.peak_frontier <= stats.pushes, f"{label}: impossible peak frontier.")
+                self.assertIn("search", stats.phase_times, f"{label}: the search should be timed.")
+
+        self.engine.disable_search_stats()
+        previous = self.engine.search_stats
+        self.engine.perform_search()
+        self.assertIs(previous, self.engine.search_stats, "Switching off should leave the last stats alone.")
+
+    def test_2_callback(self):
+        calls = []
+        self.engine.enable_search_stats(lambda phase, stats: calls.append((phase, stats)))
+        self.engine.describe_path(self.engine.perform_search(SearchMetric.TIME))
+        self.assertEqual(["search", "describe_path"], [phase for phase, _ in calls],
+                         "The callback should hear about each phase as it finishes.")
+        self.assertIs(calls[0][1], calls[1][1], "Both phases belong to the same query's stats.")
+        self.assertEqual({"search", "describe_path"}, set(self.engine.search_stats.as_dict()["phase_times"]))
+
+    def test_3_describe_path_logging(self):
+        path = self.engine.perform_search()
+        with self.assertNoLogs(level=logging.INFO):
+            self.engine.describe_path(path)
+        root = logging.getLogger()
+        old_level = root.level
+        root.setLevel(logging.DEBUG)
+        try:
+            with self.assertLogs(level=logging.DEBUG) as logs:
+                self.engine.describe_path(path)
+        finally:
+            root.setLevel(old_level)
+        self.assertEqual(len(path) + 1, len(logs.records), "With debug logging on, every edge should be logged.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+from typing import List, Optional, Tuple
+import math
+
+
+class CityKDTree:
+    """
+    A 2-d tree over the (x, y) positions of the cities, so that the city closest to a point can be found in about
+    O(log V) steps instead of by checking every city. The tree is "implicit": the cities are stored in one list,
+    arranged so that the middle of any range splits that range in half along alternating axes.
+    """
+
+    def __init__(self, positions: List[Tuple[int, float, float]]):
+        """
+        :param positions: a list of (city id, x, y) for every city to include.
+        """
+        self.order: List[Tuple[int, float, float]] = list(positions)
+        self._arrange(0, len(self.order), 1)
+
+    @classmethod
+    def from_vertices(cls, vertices: list) -> "CityKDTree":
+        """
+        :param vertices: a list of City_Data, like RoutingEngine.vertices
+        :return: a tree over those cities, identified by their position in the list.
+        """
+        if hasattr(vertices, "xs"):  # array-backed cities (see GraphArraysFile.CityTable): skip building tuples.
+            return cls(list(zip(range(len(vertices)), vertices.xs.tolist(), vertices.ys.tolist())))
+        return cls([(index, city[3], city[4]) for index, city in enumerate(vertices)])
+
+    def _arrange(self, low: int, high: int, axis: int):
+        """
+        sorts self.order[low:high] by the given axis (1 = x, 2 = y), then does the same for each half, on the other
+        axis.
+        """
+        pending = [(low, high, axis)]
+        while pending:
+            low, high, axis = pending.pop()
+            if high - low <= 1:
+                continue
+            self.order[low:high] = sorted(self.order[low:high], key=lambda entry: entry[axis])
+            middle = (low + high) // 2
+            pending.append((low, middle, 3 - axis))
+            pending.append((middle + 1, high, 3 - axis))
+
+    def nearest(self, x: float, y: float) -> Optional[int]:
+        """
+        finds the city closest to (x, y). If several are equally close, the one with the smallest id wins, just as it
+        would with a simple scan through the list.
+        :return: the id of the closest city, or None if there are no cities.
+        """
+        best_d_squared = math.inf
+        best_id = None
+        order = self.order
+        pending = [(0, len(order), 1, 0.0)]  # (low, high, axis, how close anything in that range could possibly be)
+        while pending:
+            low, high, axis, bound = pending.pop()
+            if low >= high or bound > best_d_squared:
+                continue
+            middle = (low + high) // 2
+            city_id, city_x, city_y = order[middle]
+            d_squared = (x - city_x) ** 2 + (y - city_y) ** 2
+            if d_squared < best_d_squared or (d_squared == best_d_squared and city_id < best_id):
+                best_d_squared = d_squared
+                best_id = city_id
+
+            offset = (x if axis == 1 else y) - order[middle][axis]
+            near, far = ((low, middle), (middle + 1, high)) if offset < 0 else ((middle + 1, high), (low, middle))
+            # nothing in the far half can be closer than the splitting line. It is pushed first so that the near half
+            # is searched first - by the time the far half comes up, best_d_squared has often shrunk enough to skip it.
+            pending.append((far[0], far[1], 3 - axis, max(bound, offset ** 2)))
+            pending.append((near[0], near[1], 3 - axis, bound))
+        return best_id
@@ -0,0 +1,58 @@
+import unittest
+from RoutingEngineFile import RoutingEngine
+from SpatialIndexFile import CityKDTree
+
+
+class SpatialIndexTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.engine = RoutingEngine()
+
+    def closest_by_scan(self, pos):
+        dist = float("inf")
+        which_city = None
+        for counter, city in enumerate(self.engine.vertices):
+            d_squared = (pos[0] - city[3]) ** 2 + (pos[1] - city[4]) ** 2
+            if d_squared < dist:
+                dist = d_squared
+                which_city = counter
+        return which_city
+
+    def test_0_find_closest_city(self):
+        for x in range(-40, 1000, 13):
+            for y in range(-40, 560, 11):
+                self.assertEqual(self.closest_by_scan((x, y)), self.engine.find_closest_city((x, y)),
+                                 f"Wrong closest city for ({x}, {y}).")
+
+    def test_1_ties_go_to_smaller_id(self):
+        tree = CityKDTree([(3, 0, 0), (1, 2, 0), (2, 0, 2), (0, 2, 2)])
+        self.assertEqual(0, tree.nearest(1, 1), "Four cities are equally close; the smallest id should win.")
+        self.assertEqual(1, tree.nearest(1, 0), "Two cities are equally close; the smaller id should win.")
+        self.assertIsNone(CityKDTree([]).nearest(5, 5), "With no cities, there is no closest city.")
+
+    def test_2_snap_points(self):
+        import numpy
+        generator = numpy.random.default_rng(0)
+        points = numpy.concatenate((generator.uniform(-100, 1100, size=(5000, 2)),
+                                    generator.integers(0, 500, size=(5000, 2))))
+        snapped = self.engine.snap_points(points)
+        expected = [self.closest_by_scan((x, y)) for x, y in points]
+        self.assertEqual(expected, snapped.tolist(), "Batch snapping should match the closest city for every point.")
+
+    def test_3_snap_points_to_clustered_cities(self):
+        import numpy
+        from PointSnappingFile import CityGrid
+        generator = numpy.random.default_rng(1)
+        # a "metro area" of 3000 cities a few pixels across, plus 40 spread over the map.
+        positions = numpy.concatenate((generator.integers(500, 506, size=(3000, 2)),
+                                       generator.integers(0, 1000, size=(40, 2))))
+        vertices = [(city, "", "", int(x), int(y)) for city, (x, y) in enumerate(positions)]
+        grid = CityGrid(vertices)
+        self.assertEqual((len(vertices), grid.rows * grid.columns + 1), (len(grid.cell_cities), len(grid.cell_offsets)),
+                         "The grid should hold each city once, however crowded its cell.")
+
+        points = numpy.concatenate((generator.uniform(-50, 1050, size=(2000, 2)),
+                                    generator.integers(495, 511, size=(500, 2))))
+        d_squared = ((positions[None, :, :] - points[:, None, :]) ** 2).sum(axis=2)
+        self.assertEqual(d_squared.argmin(axis=1).tolist(), grid.snap(points, chunk_size=300).tolist(),
+                         "Batch snapping should match the closest city for every point.")
@@ -0,0 +1,229 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+
+import numpy
+
+from GraphArraysFile import EdgeTable
+from RoutingEngineFile import SearchMetric
+
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+
+Chunk = Tuple[int, int, int, int]  # (byte offset, byte length, number of the first line in it, lines in it)
+Parsed_Chunk = Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]  # (N x 2 endpoints, distances, times)
+
+
+def split_into_chunks(path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> List[Chunk]:
+    """
+    divides a file into pieces of about chunk_bytes each, ending at line breaks, and counts the lines in each. (This is
+    a quick pass - it only looks for line breaks - that lets the real arrays be allocated once, at their final size.)
+    :return: the list of chunks, in order
+    """
+    chunks: List[Chunk] = []
+    offset = 0
+    line_number = 0
+    carry = b""
+    with open(path, "rb") as data_file:
+        while True:
+            block = data_file.read(chunk_bytes)
+            data = carry + block
+            if not block:
+                if data:
+                    chunks.append((offset, len(data), line_number, data.count(b"\n") + 1))
+                return chunks
+            end = data.rfind(b"\n") + 1
+            if end == 0:
+                carry = data  # a single line longer than chunk_bytes; keep reading until it ends.
+                continue
+            lines = data.count(b"\n", 0, end)
+            chunks.append((offset, end, line_number, lines))
+            offset += end
+            line_number += lines
+            carry = data[end:]
+
+
+def parse_chunk(data: bytes, first_line: int, num_cities: int, path: str = "connections") -> Parsed_Chunk:
+    """
+    parses one chunk of a connection file (tab-delimited: edge id (unused), city1, city2, distance, time) into arrays,
+    checking that every city id is one of the num_cities loaded cities.
+    Well-formed chunks - every line with exactly five fields, or blank - are parsed in a few vectorized passes; any
+    other chunk is parsed line by line, skipping short lines and ignoring extra fields, as load_connection_data() does.
+    :param data: whole lines of the file
+    :param first_line: the (0-based) line number of the first line, for error messages
+    :param num_cities: how many cities there are (ids must be 0 up to num_cities - 1)
+    :param path: the file's name, for error messages
+    :return: (an N x 2 int64 array of city ids, N distances, N times)
+    :raises ValueError: if a city id is out of range, or a field isn't a number
+    """
+    raw = numpy.frombuffer(data, dtype=numpy.uint8)
+    line_ends = numpy.flatnonzero(raw == ord("\n"))
+    if len(raw) > 0 and raw[-1] != ord("\n"):
+        line_ends = numpy.append(line_ends, len(raw))
+    tabs = numpy.flatnonzero(raw == ord("\t"))
+    tabs_per_line = numpy.diff(numpy.searchsorted(tabs, line_ends), prepend=0)
+    line_lengths = numpy.diff(line_ends, prepend=-1) - 1
+    blank = (tabs_per_line == 0) & (line_lengths <= 1)  # (allowing for a stray "\r")
+    del raw, tabs
+
+    values = None
+    if numpy.all((tabs_per_line == 4) | blank):
+        row_lines = numpy.flatnonzero(~blank)  # the line (within the chunk) each row comes from
+        if len(row_lines) == 0:
+            values = numpy.empty((0, 5), dtype=numpy.float64)
+        else:
+            try:
+                # (numpy's C parser, which skips blank lines and raises ValueError at anything that isn't a number.)
+                values = numpy.loadtxt(data.splitlines(), dtype=numpy.float64, delimiter="\t", comments=None, ndmin=2)
+            except ValueError:
+                values = None
+            if values is not None and values.shape != (len(row_lines), 5):
+                values = None
+    if values is None:
+        values, row_lines = _parse_lines(data, first_line, path)
+
+    endpoints = values[:, 1:3]
+    bad = (endpoints < 0) | (endpoints >= num_cities) | (endpoints != numpy.floor(endpoints))
+    if numpy.any(bad):
+        row = int(numpy.flatnonzero(bad.any(axis=1))[0])
+        raise ValueError(f"{path}, line {first_line + int(row_lines[row]) + 1}: connection between cities "
+                         f"{endpoints[row, 0]:g} and {endpoints[row, 1]:g}, but the city ids only go from 0 to "
+                         f"{num_cities - 1}.")
+    return endpoints.astype(numpy.int64), values[:, 3].copy(), values[:, 4].copy()
+
+
+def _parse_lines(data: bytes, first_line: int, path: str) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    # the slow path, for chunks with short, long or unreadable lines: returns the rows and the line each came from.
+    rows = []
+    row_lines = []
+    for line_number, line in enumerate(data.decode("utf-8").split("\n")):
+        parts = line.split("\t")
+        if len(parts) < 5:
+            continue  # skip blank lines, such as a trailing newline at the end of the file.
+        try:
+            rows.append((0.0, float(int(parts[1])), float(int(parts[2])), float(parts[3]), float(parts[4])))
+        except ValueError as err:
+            raise ValueError(f"{path}, line {first_line + line_number + 1}: {err}") from None
+        row_lines.append(line_number)
+    return numpy.array(rows, dtype=numpy.float64).reshape(-1, 5), numpy.array(row_lines, dtype=numpy.int64)
+
+
+def _parse_range(task: Tuple[str, Chunk, int]) -> Parsed_Chunk:
+    path, (offset, length, first_line, _), num_cities = task
+    with open(path, "rb") as data_file:
+        data_file.seek(offset)
+        data = data_file.read(length)
+    return parse_chunk(data, first_line, num_cities, os.path.basename(path))
+
+
+def load_connection_table(path: str, num_cities: int, chunk_bytes: int = DEFAULT_CHUNK_BYTES, processes: int = 1,
+                          progress: Optional[Callable[[int, int], None]] = None) -> EdgeTable:
+    """
+    reads a connection file in chunks, straight into three preallocated arrays, so that the memory used stays close
+    to the size of those arrays (32 bytes per connection) plus a chunk or two, however big the file.
+    :param path: the tab-delimited connection file
+    :param num_cities: how many cities are loaded; every connection must be between two of them.
+    :param chunk_bytes: roughly how much of the file to parse at once
+    :param processes: how many worker processes to parse chunks in (1 parses them here)
+    :param progress: if given, called as progress(bytes done, total bytes) after each chunk
+    :return: the connections, as an EdgeTable (a list-like view handing out Edge_Data tuples)
+    :raises ValueError: if a line can't be parsed, or connects a city that doesn't exist
+    """
+    chunks = split_into_chunks(path, chunk_bytes)
+    total_bytes = sum(chunk[1] for chunk in chunks)
+    capacity = sum(chunk[3] for chunk in chunks)  # blank lines make this a little more than needed, at most.
+    endpoints = numpy.empty((capacity, 2), dtype=numpy.int64)
+    distances = numpy.empty(capacity, dtype=numpy.float64)
+    times = numpy.empty(capacity, dtype=numpy.float64)
+
+    filled = 0
+    done_bytes = 0
+
+    def store(chunk: Chunk, parsed: Parsed_Chunk):
+        nonlocal filled, done_bytes
+        count = len(parsed[1])
+        endpoints[filled:filled + count] = parsed[0]
+        distances[filled:filled + count] = parsed[1]
+        times[filled:filled + count] = parsed[2]
+        filled += count
+        done_bytes += chunk[1]
+        if progress is not None:
+            progress(done_bytes, total_bytes)
+
+    tasks = [(path, chunk, num_cities) for chunk in chunks]
+    if processes <= 1 or len(chunks) <= 1:
+        for task in tasks:
+            store(task[1], _parse_range(task))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            # only a couple of chunks per worker are in flight at once, so parsed chunks don't pile up in memory.
+            window = 2 * processes
+            pending = [pool.submit(_parse_range, task) for task in tasks[:window]]
+            for position, task in enumerate(tasks):
+                parsed = pending[position].result()
+                pending[position] = None
+                if position + window < len(tasks):
+                    pending.append(pool.submit(_parse_range, tasks[position + window]))
+                store(task[1], parsed)
+
+    return EdgeTable(endpoints[:filled], distances[:filled], times[:filled])
+
+
+def build_adjacency_arrays(edges: EdgeTable, num_cities: int, closed_edges=()) -> Dict[str, numpy.ndarray]:
+    """
+    builds the same CSR adjacency index as RoutingEngine.build_adjacency_index() - including the order of each city's
+    neighbors - from array-backed connections, with a sort instead of a Python loop.
+    :param edges: the connections
+    :param num_cities: the number of cities (it is raised if a connection names a bigger id)
+    :param closed_edges: indices of connections that should cost infinitely much
+    :return: the arrays, by the name of the RoutingEngine attribute they belong in
+    """
+    first = numpy.asarray(edges.endpoints[:, 0])
+    second = numpy.asarray(edges.endpoints[:, 1])
+    if len(first) > 0:
+        num_cities = max(num_cities, int(first.max()) + 1, int(second.max()) + 1)
+    edge_ids = numpy.arange(len(first), dtype=numpy.int64)
+    not_loop = first != second  # a loop only gets one entry.
+    here = numpy.concatenate((first, second[not_loop]))
+    there = numpy.concatenate((second, first[not_loop]))
+    slot_edge_ids = numpy.concatenate((edge_ids, edge_ids[not_loop]))
+    order = numpy.argsort(here * max(len(first), 1) + slot_edge_ids, kind="stable")
+
+    offsets = numpy.zeros(num_cities + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(here, minlength=num_cities), out=offsets[1:])
+    slot_edge_ids = slot_edge_ids[order]
+    distances = numpy.asarray(edges.distances, dtype=numpy.float64)[slot_edge_ids]
+    times = numpy.asarray(edges.times, dtype=numpy.float64)[slot_edge_ids]
+    if len(closed_edges) > 0:
+        closed = numpy.isin(slot_edge_ids, numpy.fromiter(closed_edges, dtype=numpy.int64))
+        distances[closed] = numpy.inf
+        times[closed] = numpy.inf
+    return {"neighbor_offsets": offsets,
+            "neighbor_cities": there[order],
+            "neighbor_edge_ids": slot_edge_ids,
+            "neighbor_distances": distances,
+            "neighbor_times": times}
+
+
+def calibrate_scales(vertices, edges: EdgeTable) -> Dict[SearchMetric, float]:
+    """
+    the vectorized equivalent of RoutingEngine.calibrate_heuristic(), for array-backed connections.
+    :return: SearchMetric -> the A* scale for that metric
+    """
+    if hasattr(vertices, "xs"):
+        xs = numpy.asarray(vertices.xs, dtype=numpy.float64)
+        ys = numpy.asarray(vertices.ys, dtype=numpy.float64)
+    else:
+        xs = numpy.array([city[3] for city in vertices], dtype=numpy.float64)
+        ys = numpy.array([city[4] for city in vertices], dtype=numpy.float64)
+    first = numpy.asarray(edges.endpoints[:, 0])
+    second = numpy.asarray(edges.endpoints[:, 1])
+    usable = (first < len(xs)) & (second < len(xs))
+    first, second = first[usable], second[usable]
+    pixels = numpy.hypot(xs[first] - xs[second], ys[first] - ys[second])
+    nonzero = pixels > 0  # no information about the scale from the others.
+    scales = {}
+    for metric, costs in ((SearchMetric.DISTANCE, edges.distances), (SearchMetric.TIME, edges.times)):
+        ratios = numpy.asarray(costs)[usable][nonzero] / pixels[nonzero]
+        scale = float(ratios.min()) if len(ratios) > 0 else 0.0
+        scales[metric] = scale if numpy.isfinite(scale) and scale >= 0 else 0.0
+    return scales
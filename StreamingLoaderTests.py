@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+from RoutingEngineFile import RoutingEngine, SearchMetric, SearchMode
+from StreamingLoaderFile import load_connection_table, parse_chunk, split_into_chunks
+
+
+class StreamingLoaderTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.folder = tempfile.mkdtemp()
+        self.city_path = os.path.join(self.folder, "cities.txt")
+        self.connection_path = os.path.join(self.folder, "connections.txt")
+        shutil.copy("City Data with coords.txt", self.city_path)
+        shutil.copy("connections.txt", self.connection_path)
+        self.text_engine = RoutingEngine(self.city_path, self.connection_path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.folder)
+
+    def write_connections(self, text: str):
+        with open(self.connection_path, "w", newline="") as connection_file:
+            connection_file.write(text)
+
+    def test_0_same_data_as_list_loader(self):
+        engine = RoutingEngine(self.city_path, self.connection_path, stream_connections=True)
+        self.assertIsNot(list, type(engine.edges), "The connections should be held in arrays.")
+        self.assertEqual(self.text_engine.edges, list(engine.edges), "Connections differ from the list loader.")
+        self.assertEqual(self.text_engine.edges[17], engine.edges[17], "Edge 17 differs from the list loader.")
+        for name in ("neighbor_offsets", "neighbor_cities", "neighbor_edge_ids", "neighbor_distances",
+                     "neighbor_times"):
+            self.assertEqual(list(getattr(self.text_engine, name)), [value.item() for value in getattr(engine, name)],
+                             f"{name} differs from the list loader's.")
+        self.assertEqual(self.text_engine.heuristic_scales, engine.heuristic_scales, "The A* scales differ.")
+        for mode in (SearchMode.DIJKSTRA, SearchMode.A_STAR, SearchMode.BIDIRECTIONAL):
+            for first, second in ((21, 93), (53, 79), (4, 95)):
+                for search_engine in (self.text_engine, engine):
+                    search_engine.first_city_id = first
+                    search_engine.second_city_id = second
+                self.assertEqual(self.text_engine.perform_search(SearchMetric.TIME, mode),
+                                 engine.perform_search(SearchMetric.TIME, mode), f"{mode.name} paths differ.")
+
+    def test_1_small_chunks_and_processes(self):
+        chunks = split_into_chunks(self.connection_path, 300)
+        self.assertGreater(len(chunks), 10, "Expected many chunks.")
+        self.assertEqual(len(self.text_engine.edges), sum(chunk[3] for chunk in chunks), "Every line should count.")
+        reports = []
+        for processes in (1, 3):
+            reports.clear()
+            table = load_connection_table(self.connection_path, 100, chunk_bytes=300, processes=processes,
+                                          progress=lambda done, total: reports.append((done, total)))
+            self.assertEqual(self.text_engine.edges, list(table), f"Chunked loading differs ({processes} processes).")
+            self.assertEqual(len(chunks), len(reports), "Progress should be reported once per chunk.")
+            self.assertEqual(sorted(reports), reports, "Progress should only go up.")
+            self.assertEqual(reports[-1][1], reports[-1][0], "Progress should end at 100%.")
+
+    def test_2_irregular_lines(self):
+        # blank lines, Windows line endings, a short line and an extra field are handled as the list loader does.
+        self.write_connections("0\t1\t2\t10\t20\r\n\n1\t2\t3\t30\t40\n2\t3\n3\t4\t5\t50\t60\textra\n")
+        engine = RoutingEngine(self.city_path, self.connection_path, stream_connections=True)
+        self.assertEqual(RoutingEngine(self.city_path, self.connection_path).edges, list(engine.edges))
+        self.assertEqual([(1, 2, 10.0, 20.0), (2, 3, 30.0, 40.0), (4, 5, 50.0, 60.0)], list(engine.edges))
+
+    def test_3_invalid_endpoints(self):
+        self.write_connections("0\t1\t2\t10\t20\n1\t2\t100\t30\t40")
+        with self.assertRaises(ValueError) as context:
+            load_connection_table(self.connection_path, 100)
+        self.assertIn("line 2", str(context.exception), "The error should say which line is wrong.")
+        engine = RoutingEngine(self.city_path, self.connection_path, stream_connections=True)
+        self.assertEqual(0, len(engine.edges), "Invalid connections should not be loaded.")
+        self.assertEqual(101, len(engine.neighbor_offsets), "The adjacency index should still cover every city.")
+
+
+    def test_4_well_formed_chunks_parse_quietly(self):
+        data = b"0\t1\t2\t3.5\t4\r\n\r\n1\t2\t3\t4\t5e2\n"
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")  # (no deprecated parsers, and nothing hidden.)
+            endpoints, distances, times = parse_chunk(data, 0, 100)
+            empty = parse_chunk(b"\n\n", 0, 100)
+        self.assertEqual([[1, 2], [2, 3]], endpoints.tolist(), "The endpoints weren't read correctly.")
+        self.assertEqual(([3.5, 4.0], [4.0, 500.0]), (distances.tolist(), times.tolist()), "Costs weren't read.")
+        self.assertEqual((0, 2), empty[0].shape, "A chunk of blank lines has no connections.")
+
+
+if __name__ == '__main__':
+    unittest.main()